@@ -1,15 +1,20 @@
-import openai
 import json
 import os
 from typing import List, Dict, Any, Optional
 
-from ..core.config import OPENAI_API_KEY
 from ..models.agent_models import AgentType, AgentResponse
+from ..llm.llm_manager import llm_manager
+from ..llm.base_provider import LLMMessage
+from ..core.serialization import dumps_pretty
 
 PROMPTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'prompts')
 
+# Agents share the async providers owned by llm_manager, so an agent call
+# awaits the network instead of blocking the event loop for every session.
+DEFAULT_AGENT_MODEL = "gpt-4o"
+
 class DesignAgent:
-    def __init__(self, agent_type: AgentType, model: str = "gpt-5"):
+    def __init__(self, agent_type: AgentType, model: str = DEFAULT_AGENT_MODEL):
         self.agent_type = agent_type
         self.model = model
         self.instructions = self._get_instructions()
@@ -28,13 +33,11 @@ class DesignAgent:
     async def process(self, user_input: str, current_prototype: Dict[str, Any], context: str) -> AgentResponse:
         """Process user input and current prototype through this agent's lens"""
         try:
-            client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             prompt = f"""
 AGENT ROLE: {self.instructions}
 
 CURRENT PROTOTYPE:
-{json.dumps(current_prototype, indent=2) if current_prototype else "No prototype yet"}
+{dumps_pretty(current_prototype) if current_prototype else "No prototype yet"}
 
 CONTEXT:
 {context}
@@ -59,36 +62,35 @@ IMPORTANT:
 - Use null for handoff_to (don't handoff in tests)
 - Provide 3-5 specific suggestions as strings in the suggestions array."""
 
+            messages = [
+                LLMMessage(role="system", content=f"You are a {self.agent_type.value} providing expert analysis. Return valid JSON only."),
+                LLMMessage(role="user", content=prompt)
+            ]
+            
             try:
-                # Try GPT-5 Responses API first
-                response = client.responses.create(
+                # Ask for a JSON object directly when the model supports it
+                response = await llm_manager.generate(
+                    messages=messages,
                     model=self.model,
-                    instructions=f"You are a {self.agent_type.value} providing expert analysis. Return valid JSON only.",
-                    input=prompt,
-                    text={"format": {"type": "json_schema", "json_schema": {"schema": AgentResponse.model_json_schema(), "strict": True}}},
-                    temperature=0.3
+                    temperature=0.3,
+                    response_format={"type": "json_object"}
                 )
-                result = json.loads(response.output_text)
-            except Exception as responses_error:
-                print(f"Responses API failed, falling back to Chat Completions: {responses_error}")
-                # Fallback to Chat Completions API
-                response = client.chat.completions.create(
-                    model="gpt-4o-2024-08-06",
-                    messages=[
-                        {"role": "system", "content": f"You are a {self.agent_type.value} providing expert analysis. Return valid JSON only."},
-                        {"role": "user", "content": prompt}
-                    ],
+            except Exception as json_mode_error:
+                print(f"JSON mode failed, retrying as plain completion: {json_mode_error}")
+                response = await llm_manager.generate(
+                    messages=messages,
+                    model=self.model,
                     temperature=0.3
                 )
-                
-                content = response.choices[0].message.content
-                # Clean up response
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0]
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0]
-                
-                result = json.loads(content.strip())
+            
+            content = response.content
+            # Clean up response
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0]
+            elif "```" in content:
+                content = content.split("```")[1].split("```")[0]
+            
+            result = json.loads(content.strip())
             
             return AgentResponse(**result)
             
@@ -119,8 +121,6 @@ IMPORTANT:
     async def direct_chat(self, user_message: str, context_str: str) -> str:
         """Direct chat method for agent communication"""
         try:
-            client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             prompt = f"""
 AGENT ROLE: {self.instructions}
 
@@ -135,16 +135,16 @@ Provide helpful, specific advice based on your expertise.
 
 Respond naturally and conversationally."""
 
-            response = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
+            response = await llm_manager.generate(
                 messages=[
-                    {"role": "system", "content": f"You are a {self.agent_type.value.replace('_', ' ').title()} assistant. Be helpful and specific."},
-                    {"role": "user", "content": prompt}
+                    LLMMessage(role="system", content=f"You are a {self.agent_type.value.replace('_', ' ').title()} assistant. Be helpful and specific."),
+                    LLMMessage(role="user", content=prompt)
                 ],
+                model=self.model,
                 temperature=0.3
             )
             
-            return response.choices[0].message.content
+            return response.content
             
         except Exception as e:
             print(f"Agent {self.agent_type} direct chat failed: {e}")
@@ -154,7 +154,7 @@ Respond naturally and conversationally."""
 class StoriesAndQAAgent:
     """Agent for Stories & QA Planning workflows"""
     
-    def __init__(self, agent_type: AgentType, model: str = "gpt-5"):
+    def __init__(self, agent_type: AgentType, model: str = DEFAULT_AGENT_MODEL):
         self.agent_type = agent_type
         self.model = model
         self.instructions = self._get_instructions()
@@ -172,8 +172,6 @@ class StoriesAndQAAgent:
     async def process_request(self, user_input: str, context: str, prd_content: str) -> Dict[str, Any]:
         """Process Stories & QA requests"""
         try:
-            client = openai.OpenAI(api_key=OPENAI_API_KEY)
-            
             prompt = f"""
 AGENT ROLE: {self.instructions}
 
@@ -194,16 +192,16 @@ TASK: Based on your role as a {self.agent_type.value.replace('_', ' ').title()},
 
 Respond as a helpful analysis from your perspective."""
 
-            response = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
+            response = await llm_manager.generate(
                 messages=[
-                    {"role": "system", "content": f"You are a {self.agent_type.value.replace('_', ' ').title()} providing expert analysis."},
-                    {"role": "user", "content": prompt}
+                    LLMMessage(role="system", content=f"You are a {self.agent_type.value.replace('_', ' ').title()} providing expert analysis."),
+                    LLMMessage(role="user", content=prompt)
                 ],
+                model=self.model,
                 temperature=0.3
             )
             
-            content = response.choices[0].message.content
+            content = response.content
             
             # Parse structured data based on agent type
             result = {
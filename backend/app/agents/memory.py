@@ -10,6 +10,25 @@ class SessionMemory:
         self.corrections = []
         self.preferences = {}
         self.component_history = []
+        # Bumped whenever learned state changes, so rendered summaries can be cached
+        self.version = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize learned state for persistence"""
+        return {
+            "corrections": self.corrections,
+            "preferences": self.preferences,
+            "component_history": self.component_history
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionMemory":
+        """Rebuild a SessionMemory from to_dict output"""
+        memory = cls()
+        memory.corrections = data.get("corrections", [])
+        memory.preferences = data.get("preferences", {})
+        memory.component_history = data.get("component_history", [])
+        return memory
     
     def learn_from_change(self, before: Dict[str, Any], after: Dict[str, Any], user_input: str):
         """Track what changed to learn patterns"""
@@ -27,6 +46,7 @@ class SessionMemory:
             self.preferences["button_style"] = self._extract_button_style(after)
         
         self.corrections.append(change)
+        self.version += 1
     
     def _extract_color(self, prototype: Dict[str, Any]) -> Optional[str]:
         """Extract color information from prototype"""
@@ -1,9 +1,12 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from pydantic import BaseModel
 
 from ..llm.llm_manager import llm_manager
-from ..llm.base_provider import LLMProvider, LLMMessage
+from ..llm.base_provider import LLMProvider, LLMMessage, LLMResponse
+from ..core.serialization import dumps
 
 router = APIRouter(prefix="/api/llm", tags=["LLM Providers"])
 
@@ -14,6 +17,8 @@ class ChatRequest(BaseModel):
     temperature: float = 0.7
     max_tokens: Optional[int] = None
     stream: bool = False
+    use_cache: bool = True
+    routing: Optional[Dict[str, Any]] = None  # e.g. {"objective": "cost", "max_p95": 3.0} for model "auto"
 
 class ChatResponse(BaseModel):
     content: str
@@ -21,6 +26,7 @@ class ChatResponse(BaseModel):
     provider: str
     tokens_used: Optional[int] = None
     response_time: Optional[float] = None
+    cached: bool = False
 
 @router.get("/providers")
 async def get_available_providers():
@@ -69,7 +75,11 @@ async def chat_completion(request: ChatRequest):
                 raise HTTPException(status_code=400, detail=f"Invalid provider: {request.provider}")
         
         if request.stream:
-            raise HTTPException(status_code=400, detail="Streaming not supported in this endpoint. Use WebSocket for streaming.")
+            return StreamingResponse(
+                _chat_event_stream(request, messages, provider_enum),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
         # Generate response
         response = await llm_manager.generate(
@@ -77,7 +87,9 @@ async def chat_completion(request: ChatRequest):
             model=request.model,
             provider=provider_enum,
             temperature=request.temperature,
-            max_tokens=request.max_tokens
+            max_tokens=request.max_tokens,
+            use_cache=request.use_cache,
+            routing_policy=llm_manager.routing_policy(request.routing)
         )
         
         return ChatResponse(
@@ -85,7 +97,8 @@ async def chat_completion(request: ChatRequest):
             model_used=response.model_used,
             provider=response.provider.value,
             tokens_used=response.tokens_used,
-            response_time=response.response_time
+            response_time=response.response_time,
+            cached=response.cached
         )
         
     except ValueError as e:
@@ -93,6 +106,88 @@ async def chat_completion(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat completion failed: {str(e)}")
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+async def _chat_event_stream(
+    request: ChatRequest,
+    messages: List[LLMMessage],
+    provider: Optional[LLMProvider]
+) -> AsyncGenerator[str, None]:
+    """Server-sent events for a streamed chat: token deltas, then the full result"""
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def on_token(delta: str):
+        await queue.put(_sse_event("token", {"delta": delta}))
+    
+    async def run() -> LLMResponse:
+        try:
+            return await llm_manager.generate_streaming(
+                messages=messages,
+                model=request.model,
+                on_token=on_token,
+                provider=provider,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                use_cache=request.use_cache,
+                routing_policy=llm_manager.routing_policy(request.routing)
+            )
+        finally:
+            await queue.put(None)
+    
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+        
+        try:
+            response = task.result()
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        
+        yield _sse_event("done", ChatResponse(
+            content=response.content,
+            model_used=response.model_used,
+            provider=response.provider.value,
+            tokens_used=response.tokens_used,
+            response_time=response.response_time,
+            cached=response.cached
+        ).model_dump())
+    finally:
+        # Client went away mid-stream: stop paying for tokens nobody reads
+        if not task.done():
+            task.cancel()
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get response cache hit/miss counters and tier sizes"""
+    return llm_manager.get_cache_stats()
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop every cached LLM response"""
+    llm_manager.clear_cache()
+    return {"cleared": True}
+
+@router.get("/scheduler")
+async def get_scheduler_stats():
+    """Get per-provider queue depth, in-flight requests and wait times"""
+    return {"schedulers": llm_manager.get_scheduler_stats()}
+
+@router.get("/resilience")
+async def get_resilience_status():
+    """Get circuit breaker states, fallback chain and rolling latency/error stats"""
+    return llm_manager.get_resilience_status()
+
+@router.get("/routing")
+async def get_routing_status():
+    """Get routing groups, the default policy and where routed requests went"""
+    return llm_manager.router.get_stats()
+
 @router.get("/test")
 async def test_providers():
     """Test all available providers with a simple message"""
@@ -116,7 +211,8 @@ async def test_providers():
                         model=test_model,
                         provider=provider,
                         temperature=0.7,
-                        max_tokens=50
+                        max_tokens=50,
+                        use_cache=False
                     )
                     results[provider.value] = {
                         "status": "success",
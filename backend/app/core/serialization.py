@@ -0,0 +1,85 @@
+"""
+JSON encoding shared by WebSocket frames, REST responses and prompt context.
+
+Uses orjson when it is installed and the standard library otherwise; both
+paths accept pydantic models, dataclasses, enums, datetimes, UUIDs, paths and
+sets directly, so callers can hand over models without dumping them to dicts
+first. Any other type raises TypeError, as it does with json.dumps.
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime
+from enum import Enum
+from pathlib import PurePath
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Convert the non-JSON types our payloads carry; used as the encoder default"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (UUID, PurePath)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=to_jsonable, option=_OPTIONS)
+        except TypeError:
+            # orjson rejects integers wider than 64 bits; the stdlib does not
+            return json.dumps(obj, default=to_jsonable, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_pretty(obj: Any) -> str:
+        try:
+            return orjson.dumps(obj, default=to_jsonable, option=_OPTIONS | orjson.OPT_INDENT_2).decode("utf-8")
+        except TypeError:
+            return json.dumps(obj, default=to_jsonable, ensure_ascii=False, indent=2)
+
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, default=to_jsonable, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_pretty(obj: Any) -> str:
+        return json.dumps(obj, default=to_jsonable, ensure_ascii=False, indent=2)
+
+    def loads(data: Any) -> Any:
+        return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text"""
+    return dumps_bytes(obj).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the shared encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any, AsyncGenerator, List, Optional
 from enum import Enum
@@ -28,10 +29,28 @@ class LLMResponse(BaseModel):
     tokens_used: Optional[int] = None
     cost: Optional[float] = None
     response_time: Optional[float] = None
+    cached: bool = False
+
+# Status codes worth retrying: timeouts, rate limits and server-side failures
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+class LLMProviderError(Exception):
+    """Error raised by a provider call, tagged with whether a retry can help"""
+    
+    def __init__(self, message: str, provider: Optional[str] = None, status_code: Optional[int] = None, retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        if retryable is None:
+            retryable = status_code is None or status_code in RETRYABLE_STATUS_CODES
+        self.retryable = retryable
 
 class BaseLLMProvider(ABC):
     """Abstract base class for all LLM providers"""
     
+    # True when generate_n returns every candidate from a single request
+    supports_multiple_candidates = False
+    
     def __init__(self, api_key: str, **kwargs):
         self.api_key = api_key
         self.config = kwargs
@@ -48,6 +67,24 @@ class BaseLLMProvider(ABC):
         """Generate a single response"""
         pass
     
+    async def generate_n(
+        self,
+        messages: List[LLMMessage],
+        model: str,
+        n: int,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> List[LLMResponse]:
+        """Generate n independent responses to the same messages.
+
+        Falls back to n parallel generate() calls; providers whose API can
+        sample several choices per request override this.
+        """
+        return list(await asyncio.gather(*[
+            self.generate(messages, model, temperature, max_tokens, **kwargs) for _ in range(n)
+        ]))
+    
     @abstractmethod
     async def stream_generate(
         self,
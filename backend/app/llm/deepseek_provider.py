@@ -2,7 +2,7 @@ import httpx
 import json
 import time
 from typing import List, Optional, AsyncGenerator
-from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse
+from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse, LLMProviderError
 
 class DeepSeekProvider(BaseLLMProvider):
     """DeepSeek AI provider"""
@@ -16,7 +16,10 @@ class DeepSeekProvider(BaseLLMProvider):
                 "Content-Type": "application/json"
             },
             timeout=120.0,  # Increased timeout for parallel requests
-            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            limits=httpx.Limits(
+                max_connections=kwargs.get("max_connections", 10),
+                max_keepalive_connections=kwargs.get("max_keepalive_connections", 5)
+            )
         )
     
     async def generate(
@@ -67,12 +70,20 @@ class DeepSeekProvider(BaseLLMProvider):
                 error_detail = e.response.text
             except:
                 error_detail = str(e)
-            raise Exception(f"DeepSeek API error: {e.response.status_code} - {error_detail}")
+            raise LLMProviderError(
+                f"DeepSeek API error: {e.response.status_code} - {error_detail}",
+                provider="deepseek",
+                status_code=e.response.status_code
+            )
         except Exception as e:
             import traceback
             full_error = traceback.format_exc()
             print(f"[DeepSeek Debug] Full error: {full_error}")
-            raise Exception(f"DeepSeek error: {str(e)} (Type: {type(e).__name__})")
+            raise LLMProviderError(
+                f"DeepSeek error: {str(e)} (Type: {type(e).__name__})",
+                provider="deepseek",
+                retryable=isinstance(e, httpx.TransportError)
+            )
     
     async def stream_generate(
         self,
@@ -117,9 +128,17 @@ class DeepSeekProvider(BaseLLMProvider):
                             continue
                             
         except httpx.HTTPStatusError as e:
-            raise Exception(f"DeepSeek streaming error: {e.response.status_code} - {e.response.text}")
+            raise LLMProviderError(
+                f"DeepSeek streaming error: {e.response.status_code}",
+                provider="deepseek",
+                status_code=e.response.status_code
+            )
         except Exception as e:
-            raise Exception(f"DeepSeek streaming error: {str(e)}")
+            raise LLMProviderError(
+                f"DeepSeek streaming error: {str(e)}",
+                provider="deepseek",
+                retryable=isinstance(e, httpx.TransportError)
+            )
     
     def get_available_models(self) -> List[LLMModel]:
         """Get available DeepSeek models"""
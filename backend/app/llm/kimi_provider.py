@@ -2,7 +2,7 @@ import httpx
 import json
 import time
 from typing import List, Optional, AsyncGenerator
-from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse
+from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse, LLMProviderError
 
 class KimiProvider(BaseLLMProvider):
     """Kimi (Moonshot AI) provider"""
@@ -16,7 +16,10 @@ class KimiProvider(BaseLLMProvider):
                 "Content-Type": "application/json"
             },
             timeout=120.0,  # Increased timeout for parallel requests
-            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            limits=httpx.Limits(
+                max_connections=kwargs.get("max_connections", 10),
+                max_keepalive_connections=kwargs.get("max_keepalive_connections", 5)
+            )
         )
     
     async def generate(
@@ -62,9 +65,17 @@ class KimiProvider(BaseLLMProvider):
             )
             
         except httpx.HTTPStatusError as e:
-            raise Exception(f"Kimi API error: {e.response.status_code} - {e.response.text}")
+            raise LLMProviderError(
+                f"Kimi API error: {e.response.status_code} - {e.response.text}",
+                provider="kimi",
+                status_code=e.response.status_code
+            )
         except Exception as e:
-            raise Exception(f"Kimi error: {str(e)}")
+            raise LLMProviderError(
+                f"Kimi error: {str(e)}",
+                provider="kimi",
+                retryable=isinstance(e, httpx.TransportError)
+            )
     
     async def stream_generate(
         self,
@@ -109,9 +120,17 @@ class KimiProvider(BaseLLMProvider):
                             continue
                             
         except httpx.HTTPStatusError as e:
-            raise Exception(f"Kimi streaming error: {e.response.status_code} - {e.response.text}")
+            raise LLMProviderError(
+                f"Kimi streaming error: {e.response.status_code}",
+                provider="kimi",
+                status_code=e.response.status_code
+            )
         except Exception as e:
-            raise Exception(f"Kimi streaming error: {str(e)}")
+            raise LLMProviderError(
+                f"Kimi streaming error: {str(e)}",
+                provider="kimi",
+                retryable=isinstance(e, httpx.TransportError)
+            )
     
     def get_available_models(self) -> List[LLMModel]:
         """Get available Kimi models"""
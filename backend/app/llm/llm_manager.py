@@ -1,17 +1,68 @@
+import asyncio
 import os
-from typing import Dict, List, Optional, AsyncGenerator
-from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, AsyncGenerator, Tuple
+from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse, LLMProviderError
 from .openai_provider import OpenAIProvider
 from .deepseek_provider import DeepSeekProvider
 from .kimi_provider import KimiProvider
+from .response_cache import ResponseCache, create_response_cache_from_env
+from .single_flight import SingleFlight
+from .scheduler import ProviderScheduler, create_scheduler_from_env, current_session_id, estimate_request_tokens
+from .metrics import LLMMetrics
+from .router import ModelRouter, RouteLease, RoutingPolicy, create_model_router_from_env
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    call_with_resilience,
+    create_circuit_breaker_from_env,
+    create_hedge_policy_from_env,
+    create_retry_policy_from_env
+)
+
+# Assumed for models no provider describes, and for completions without max_tokens
+DEFAULT_CONTEXT_LENGTH = 8192
+DEFAULT_COMPLETION_TOKENS = 1024
+
+def _falls_back(error: LLMProviderError) -> bool:
+    """Whether the next candidate may serve a call that failed with error"""
+    # An outage or an open breaker is the provider's; a rejected request would fail anywhere
+    return error.retryable or isinstance(error, CircuitOpenError)
 
 class LLMManager:
     """Central manager for all LLM providers"""
     
     def __init__(self):
         self.providers: Dict[LLMProvider, BaseLLMProvider] = {}
+        self.response_cache: Optional[ResponseCache] = create_response_cache_from_env()
+        self.single_flight = SingleFlight()
+        self.schedulers: Dict[LLMProvider, ProviderScheduler] = {}
+        self.breakers: Dict[LLMProvider, CircuitBreaker] = {}
+        self.metrics = LLMMetrics()
+        self.retry_policy = create_retry_policy_from_env()
+        self.hedge_policy = create_hedge_policy_from_env()
+        self.router: ModelRouter = create_model_router_from_env()
+        max_input_tokens = os.getenv("LLM_MAX_INPUT_TOKENS")
+        self.max_input_tokens: Optional[int] = int(max_input_tokens) if max_input_tokens else None
+        self.fallback_chain: List[Tuple[LLMProvider, str]] = self._parse_fallback_chain(
+            os.getenv("LLM_FALLBACK_CHAIN", "openai:gpt-4o-mini")
+        )
         self._initialize_providers()
     
+    @staticmethod
+    def _parse_fallback_chain(chain: str) -> List[Tuple[LLMProvider, str]]:
+        """Parse 'provider:model,provider:model' into (provider, model) pairs"""
+        entries = []
+        for entry in chain.split(","):
+            if ":" not in entry:
+                continue
+            provider_name, model = entry.strip().split(":", 1)
+            try:
+                entries.append((LLMProvider(provider_name.strip()), model.strip()))
+            except ValueError:
+                print(f"[WARNING] Ignoring unknown provider in LLM_FALLBACK_CHAIN: {provider_name}")
+        return entries
+    
     def _initialize_providers(self):
         """Initialize all available LLM providers based on environment variables"""
         
@@ -19,6 +70,7 @@ class LLMManager:
         openai_key = os.getenv("OPENAI_API_KEY")
         if openai_key and openai_key != "your_openai_api_key_here":
             try:
+                self.schedulers[LLMProvider.OPENAI] = create_scheduler_from_env("openai")
                 self.providers[LLMProvider.OPENAI] = OpenAIProvider(openai_key)
                 print(f"[OK] OpenAI provider initialized")
             except Exception as e:
@@ -28,7 +80,11 @@ class LLMManager:
         deepseek_key = os.getenv("DEEPSEEK_API_KEY")
         if deepseek_key and deepseek_key != "your_deepseek_api_key_here":
             try:
-                self.providers[LLMProvider.DEEPSEEK] = DeepSeekProvider(deepseek_key)
+                scheduler = create_scheduler_from_env("deepseek")
+                self.schedulers[LLMProvider.DEEPSEEK] = scheduler
+                self.providers[LLMProvider.DEEPSEEK] = DeepSeekProvider(
+                    deepseek_key, max_connections=scheduler.max_in_flight
+                )
                 print(f"[OK] DeepSeek provider initialized")
             except Exception as e:
                 print(f"[ERROR] Failed to initialize DeepSeek: {e}")
@@ -37,7 +93,11 @@ class LLMManager:
         kimi_key = os.getenv("KIMI_API_KEY") or os.getenv("MOONSHOT_API_KEY")
         if kimi_key and kimi_key != "your_kimi_api_key_here":
             try:
-                self.providers[LLMProvider.KIMI] = KimiProvider(kimi_key)
+                scheduler = create_scheduler_from_env("kimi")
+                self.schedulers[LLMProvider.KIMI] = scheduler
+                self.providers[LLMProvider.KIMI] = KimiProvider(
+                    kimi_key, max_connections=scheduler.max_in_flight
+                )
                 print(f"[OK] Kimi provider initialized")
             except Exception as e:
                 print(f"[ERROR] Failed to initialize Kimi: {e}")
@@ -62,6 +122,32 @@ class LLMManager:
         
         return models
     
+    def get_model(self, model_id: str) -> Optional[LLMModel]:
+        """Metadata for a concrete model id, if any provider offers it"""
+        for model in self.get_available_models():
+            if model.id == model_id:
+                return model
+        return None
+    
+    def context_length(self, model: str) -> int:
+        """Context window of a model; for a routing alias, the smallest in its group"""
+        model_ids = [model]
+        if self.router.is_route(model):
+            try:
+                model_ids = self.router.groups[self.router.group_for(model)]
+            except ValueError:
+                model_ids = []
+        lengths = [info.context_length for info in map(self.get_model, model_ids) if info]
+        return min(lengths) if lengths else DEFAULT_CONTEXT_LENGTH
+    
+    def input_token_budget(self, model: str, max_tokens: Optional[int] = None, cap: Optional[int] = None) -> int:
+        """Prompt tokens that fit next to the completion, limited by cap or LLM_MAX_INPUT_TOKENS"""
+        budget = self.context_length(model) - (max_tokens or DEFAULT_COMPLETION_TOKENS)
+        cap = cap or self.max_input_tokens
+        if cap:
+            budget = min(budget, cap)
+        return max(0, budget)
+    
     def get_provider_for_model(self, model_id: str) -> Optional[LLMProvider]:
         """Find which provider supports a given model"""
         for provider_type, provider in self.providers.items():
@@ -76,32 +162,223 @@ class LLMManager:
         provider: Optional[LLMProvider] = None,
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        session_id: Optional[str] = None,
+        fallback: bool = True,
+        routing_policy: Optional[RoutingPolicy] = None,
         **kwargs
     ) -> LLMResponse:
-        """Generate a response using specified model and provider"""
+        """Generate a response using specified model and provider.
+
+        Identical requests are served from the response cache, and identical
+        requests already in flight are awaited instead of sent again, unless
+        use_cache is False; a bypassed request still refreshes the cache.
+        Provider calls wait for admission by the provider's scheduler, queued
+        under session_id (or the session of the current WebSocket message).
+        Retryable failures are retried with backoff; if the provider still
+        fails, or its circuit breaker is open, the fallback chain is tried.
+        A model that cannot be served raises ValueError, and a request the
+        provider rejects (4xx) raises its LLMProviderError, without fallback.
+        A routing alias such as "auto" or "auto:smart" as model picks the best
+        member of that model group under routing_policy (see ModelRouter).
+        """
         
-        # Auto-detect provider if not specified
-        if not provider:
-            provider = self.get_provider_for_model(model)
-            if not provider:
-                raise ValueError(f"No provider found for model: {model}")
+        candidates = self._resolve_candidates(model, provider, fallback, routing_policy)
+        lease = self._lease(model, candidates)
+        try:
+            return await self._generate(
+                candidates, messages, temperature, max_tokens, use_cache, session_id, lease=lease, **kwargs
+            )
+        finally:
+            if lease:
+                lease.release()
+    
+    async def _generate(
+        self,
+        candidates: List[Tuple[LLMProvider, str]],
+        messages: List[LLMMessage],
+        temperature: float,
+        max_tokens: Optional[int],
+        use_cache: bool,
+        session_id: Optional[str],
+        lease: Optional[RouteLease] = None,
+        **kwargs
+    ) -> LLMResponse:
+        provider, model = candidates[0]
+        
+        request_key = ResponseCache.make_key(provider.value, model, messages, temperature, max_tokens, **kwargs)
+        if self.response_cache and use_cache:
+            cached_response = await self.response_cache.get(request_key)
+            if cached_response:
+                return cached_response
+        if lease and use_cache and request_key in self.single_flight:
+            # Waiting for an identical call already counted
+            lease.release()
+        
+        queue_key = session_id or current_session_id.get()
+        
+        async def call_provider() -> LLMResponse:
+            last_error: Optional[LLMProviderError] = None
+            for candidate_provider, candidate_model in candidates:
+                if lease:
+                    lease.move((candidate_provider, candidate_model))
+                try:
+                    response = await self._call_with_resilience(
+                        candidate_provider, candidate_model, messages, temperature, max_tokens, queue_key, **kwargs
+                    )
+                except LLMProviderError as e:
+                    print(f"[LLM] {candidate_provider.value}:{candidate_model} failed: {e}")
+                    if not _falls_back(e):
+                        raise
+                    last_error = e
+                    continue
+                # Only cache answers from the model that was actually asked for
+                if self.response_cache and (candidate_provider, candidate_model) == (provider, model):
+                    await self.response_cache.set(request_key, response)
+                return response
+            raise last_error
         
-        if provider not in self.providers:
-            raise ValueError(f"Provider {provider} is not available")
+        if not use_cache:
+            return await call_provider()
         
+        # Concurrent identical requests share a single provider call
+        response = await self.single_flight.do(request_key, call_provider)
+        return response.model_copy()
+    
+    async def generate_n(
+        self,
+        messages: List[LLMMessage],
+        model: str,
+        n: int,
+        provider: Optional[LLMProvider] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        session_id: Optional[str] = None,
+        fallback: bool = True,
+        routing_policy: Optional[RoutingPolicy] = None,
+        **kwargs
+    ) -> List[LLMResponse]:
+        """Generate n independent responses to the same messages.
+
+        Providers that can sample several choices per request (see
+        BaseLLMProvider.supports_multiple_candidates) return all n from one
+        call, so the prompt is sent, queued and billed once; other providers
+        get n parallel calls. Retries, breakers and the fallback chain apply
+        as in generate(); candidates are never cached.
+        """
+        candidates = self._resolve_candidates(model, provider, fallback, routing_policy)
+        queue_key = session_id or current_session_id.get()
+        lease = self._lease(model, candidates)
+        try:
+            last_error: Optional[LLMProviderError] = None
+            for candidate_provider, candidate_model in candidates:
+                if lease:
+                    lease.move((candidate_provider, candidate_model))
+                try:
+                    return await self._generate_candidates(
+                        candidate_provider, candidate_model, messages, n, temperature, max_tokens, queue_key, **kwargs
+                    )
+                except LLMProviderError as e:
+                    print(f"[LLM] {candidate_provider.value}:{candidate_model} failed: {e}")
+                    if not _falls_back(e):
+                        raise
+                    last_error = e
+            raise last_error
+        finally:
+            if lease:
+                lease.release()
+    
+    async def _generate_candidates(
+        self,
+        provider: LLMProvider,
+        model: str,
+        messages: List[LLMMessage],
+        n: int,
+        temperature: float,
+        max_tokens: Optional[int],
+        queue_key: Optional[str],
+        **kwargs
+    ) -> List[LLMResponse]:
+        """n candidates from one provider: in one request if it supports that, else n parallel calls"""
+        if self.providers[provider].supports_multiple_candidates:
+            return await self._call_with_resilience(
+                provider, model, messages, temperature, max_tokens, queue_key, n=n, **kwargs
+            )
+        calls = [
+            asyncio.ensure_future(self._call_with_resilience(
+                provider, model, messages, temperature, max_tokens, queue_key, **kwargs
+            ))
+            for _ in range(n)
+        ]
+        try:
+            return list(await asyncio.gather(*calls))
+        except BaseException:
+            # One failure fails the set; stop paying for the rest before falling back
+            for call in calls:
+                call.cancel()
+            await asyncio.gather(*calls, return_exceptions=True)
+            raise
+    
+    async def _call_with_resilience(
+        self,
+        provider: LLMProvider,
+        model: str,
+        messages: List[LLMMessage],
+        temperature: float,
+        max_tokens: Optional[int],
+        queue_key: Optional[str],
+        n: Optional[int] = None,
+        **kwargs
+    ):
+        """Call one provider with admission control, retries, hedging and its breaker.
+
+        With n, returns the list of candidates from the provider's generate_n.
+        Such a call is neither hedged nor recorded in the latency metrics:
+        it is not comparable to a single completion, and a duplicate would
+        repeat all n candidates.
+        """
         provider_instance = self.providers[provider]
+        scheduler = self._get_scheduler(provider)
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        if n is not None:
+            estimated_tokens += (n - 1) * (max_tokens or 512)
         
-        if not provider_instance.validate_model(model):
-            available_models = [m.id for m in provider_instance.get_available_models()]
-            raise ValueError(f"Model {model} not available for {provider}. Available: {available_models}")
+        async def attempt():
+            async with scheduler.slot(queue_key, estimated_tokens):
+                started = time.monotonic()
+                try:
+                    if n is None:
+                        response = await provider_instance.generate(
+                            messages=messages,
+                            model=model,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            **kwargs
+                        )
+                    else:
+                        response = await provider_instance.generate_n(
+                            messages=messages,
+                            model=model,
+                            n=n,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            **kwargs
+                        )
+                except LLMProviderError:
+                    if n is None:
+                        self.metrics.record(provider.value, model, time.monotonic() - started, False)
+                    raise
+                if n is None:
+                    self.metrics.record(provider.value, model, time.monotonic() - started, True)
+            if n is None:
+                scheduler.settle(estimated_tokens, response.tokens_used)
+            else:
+                reported = [candidate.tokens_used for candidate in response if candidate.tokens_used is not None]
+                scheduler.settle(estimated_tokens, sum(reported) if reported else None)
+            return response
         
-        return await provider_instance.generate(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            **kwargs
-        )
+        hedge_delay = self.hedge_policy.delay_for(self.metrics.get(provider.value, model)) if n is None else None
+        return await call_with_resilience(attempt, self.retry_policy, self._get_breaker(provider), hedge_delay)
     
     async def stream_generate(
         self,
@@ -110,33 +387,258 @@ class LLMManager:
         provider: Optional[LLMProvider] = None,
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
+        session_id: Optional[str] = None,
+        fallback: bool = True,
+        routing_policy: Optional[RoutingPolicy] = None,
         **kwargs
     ) -> AsyncGenerator[str, None]:
-        """Generate a streaming response using specified model and provider"""
+        """Generate a streaming response using specified model and provider.
+
+        Retries and fallbacks only happen before the first chunk is yielded;
+        a stream that fails midway raises to the caller.
+        """
+        
+        candidates = self._resolve_candidates(model, provider, fallback, routing_policy)
+        lease = self._lease(model, candidates)
+        try:
+            async for chunk in self._stream_generate(
+                candidates, messages, temperature, max_tokens, session_id, lease=lease, **kwargs
+            ):
+                yield chunk
+        finally:
+            if lease:
+                lease.release()
+    
+    async def generate_streaming(
+        self,
+        messages: List[LLMMessage],
+        model: str,
+        on_token: Callable[[str], Awaitable[None]],
+        provider: Optional[LLMProvider] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        session_id: Optional[str] = None,
+        fallback: bool = True,
+        routing_policy: Optional[RoutingPolicy] = None,
+        **kwargs
+    ) -> LLMResponse:
+        """Stream a completion through on_token and return the assembled response.
+
+        A drop-in for generate() when the caller wants to forward deltas as
+        they arrive. A cached answer is delivered to on_token in one piece;
+        a completed stream from the requested model refreshes the cache.
+        An exception raised by on_token stops the generation and propagates.
+        """
+        
+        candidates = self._resolve_candidates(model, provider, fallback, routing_policy)
+        lease = self._lease(model, candidates)
+        provider, model = candidates[0]
+        
+        request_key = ResponseCache.make_key(provider.value, model, messages, temperature, max_tokens, **kwargs)
+        if self.response_cache and use_cache:
+            cached_response = await self.response_cache.get(request_key)
+            if cached_response:
+                if lease:
+                    lease.release()
+                await on_token(cached_response.content)
+                return cached_response
+        
+        started = time.time()
+        served: Dict[str, Any] = {}
+        parts: List[str] = []
+        stream = self._stream_generate(
+            candidates, messages, temperature, max_tokens, session_id, served=served, lease=lease, **kwargs
+        )
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                await on_token(chunk)
+        finally:
+            # If on_token raised (e.g. to abort on bad output), close the
+            # provider stream now rather than when it is garbage collected
+            await stream.aclose()
+            if lease:
+                lease.release()
+        
+        response = LLMResponse(
+            content="".join(parts),
+            model_used=served["model"],
+            provider=served["provider"],
+            response_time=time.time() - started
+        )
+        if self.response_cache and (served["provider"], served["model"]) == (provider, model):
+            await self.response_cache.set(request_key, response)
+        return response
+    
+    async def _stream_generate(
+        self,
+        candidates: List[Tuple[LLMProvider, str]],
+        messages: List[LLMMessage],
+        temperature: float,
+        max_tokens: Optional[int],
+        session_id: Optional[str],
+        served: Optional[Dict[str, Any]] = None,
+        lease: Optional[RouteLease] = None,
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        queue_key = session_id or current_session_id.get()
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        last_error: Optional[LLMProviderError] = None
+        
+        for candidate_provider, candidate_model in candidates:
+            if lease:
+                lease.move((candidate_provider, candidate_model))
+            candidate_instance = self.providers[candidate_provider]
+            scheduler = self._get_scheduler(candidate_provider)
+            breaker = self._get_breaker(candidate_provider)
+            
+            for attempt in range(self.retry_policy.max_attempts):
+                if not breaker.allow_request():
+                    last_error = CircuitOpenError(candidate_provider.value)
+                    break
+                
+                streamed_any = False
+                started = None
+                try:
+                    async with scheduler.slot(queue_key, estimated_tokens):
+                        started = time.monotonic()
+                        async for chunk in candidate_instance.stream_generate(
+                            messages=messages,
+                            model=candidate_model,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            **kwargs
+                        ):
+                            streamed_any = True
+                            yield chunk
+                except LLMProviderError as e:
+                    if started is not None:
+                        self.metrics.record(candidate_provider.value, candidate_model, time.monotonic() - started, False)
+                    if e.retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    if streamed_any:
+                        raise
+                    print(f"[LLM] Stream from {candidate_provider.value}:{candidate_model} failed: {e}")
+                    if not e.retryable:
+                        raise
+                    last_error = e
+                    if attempt < self.retry_policy.max_attempts - 1:
+                        await asyncio.sleep(self.retry_policy.delay(attempt))
+                    continue
+                except BaseException:
+                    breaker.abandon_trial()
+                    raise
+                
+                # Like a completion, a stream's latency runs until its last chunk
+                self.metrics.record(candidate_provider.value, candidate_model, time.monotonic() - started, True)
+                breaker.record_success()
+                if served is not None:
+                    served.update(provider=candidate_provider, model=candidate_model)
+                return
+        
+        raise last_error
+    
+    def _resolve_candidates(
+        self,
+        model: str,
+        provider: Optional[LLMProvider],
+        fallback: bool,
+        routing_policy: Optional[RoutingPolicy] = None
+    ) -> List[Tuple[LLMProvider, str]]:
+        """The requested (provider, model) followed by the usable fallback chain.
+
+        Raises ValueError if the requested model cannot be served here; the
+        fallback chain stands in for failing providers, not for bad requests.
+        A routing alias resolves to its whole model group, best member first,
+        and the provider argument is ignored.
+        """
+        error = None
+        
+        if self.router.is_route(model):
+            candidates = self._route_candidates(model, routing_policy)
+            return self._fallback_candidates(candidates) if fallback else candidates
         
         # Auto-detect provider if not specified
         if not provider:
             provider = self.get_provider_for_model(model)
             if not provider:
-                raise ValueError(f"No provider found for model: {model}")
+                error = ValueError(f"No provider found for model: {model}")
         
-        if provider not in self.providers:
-            raise ValueError(f"Provider {provider} is not available")
+        if not error and provider not in self.providers:
+            error = ValueError(f"Provider {provider} is not available")
         
-        provider_instance = self.providers[provider]
+        if not error and not self.providers[provider].validate_model(model):
+            available_models = [m.id for m in self.providers[provider].get_available_models()]
+            error = ValueError(f"Model {model} not available for {provider}. Available: {available_models}")
+        
+        if error:
+            raise error
+        candidates = [(provider, model)]
+        return self._fallback_candidates(candidates) if fallback else candidates
+    
+    def _route_candidates(self, model: str, routing_policy: Optional[RoutingPolicy]) -> List[Tuple[LLMProvider, str]]:
+        """Rank the models behind a routing alias by live latency, errors, load and cost"""
+        
+        def stats_for(candidate: LLMModel):
+            return self.metrics.get(candidate.provider.value, candidate.id)
         
-        if not provider_instance.validate_model(model):
-            available_models = [m.id for m in provider_instance.get_available_models()]
-            raise ValueError(f"Model {model} not available for {provider}. Available: {available_models}")
+        def load_for(candidate: LLMModel) -> float:
+            scheduler = self.schedulers.get(candidate.provider)
+            max_in_flight = scheduler.max_in_flight if scheduler else 10
+            outstanding = self.router.outstanding((candidate.provider, candidate.id))
+            if scheduler:
+                outstanding = max(outstanding, scheduler.pending())
+            # Requests beyond the free slots wait roughly one call per slot each
+            return max(0, outstanding - max_in_flight + 1) / max_in_flight
         
-        async for chunk in provider_instance.stream_generate(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            **kwargs
-        ):
-            yield chunk
+        def is_healthy(candidate: LLMModel) -> bool:
+            breaker = self.breakers.get(candidate.provider)
+            return not (breaker and breaker.is_open())
+        
+        return self.router.rank(
+            model, self.get_available_models(), stats_for, load_for, is_healthy, routing_policy
+        )
+    
+    def routing_policy(self, settings: Optional[Dict[str, Any]]) -> RoutingPolicy:
+        """Routing policy for a request's llm_settings["routing"], else the default"""
+        return RoutingPolicy.from_settings(settings, self.router.policy)
+    
+    def _fallback_candidates(self, candidates: List[Tuple[LLMProvider, str]]) -> List[Tuple[LLMProvider, str]]:
+        """Append the available entries of the fallback chain to candidates"""
+        candidates = list(candidates)
+        for fallback_provider, fallback_model in self.fallback_chain:
+            if (fallback_provider, fallback_model) in candidates:
+                continue
+            if fallback_provider in self.providers and self.providers[fallback_provider].validate_model(fallback_model):
+                candidates.append((fallback_provider, fallback_model))
+        return candidates
+    
+    def _lease(self, model: str, candidates: List[Tuple[LLMProvider, str]]) -> Optional[RouteLease]:
+        """For a routed request, count it against its first candidate from the moment it was picked"""
+        return self.router.lease(candidates[0]) if self.router.is_route(model) else None
+    
+    def _get_breaker(self, provider: LLMProvider) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = create_circuit_breaker_from_env(provider.value)
+        return self.breakers[provider]
+    
+    def get_resilience_status(self) -> Dict[str, Any]:
+        """Get circuit breaker states, the fallback chain and rolling call stats"""
+        return {
+            "circuit_breakers": {provider.value: breaker.get_stats() for provider, breaker in self.breakers.items()},
+            "fallback_chain": [f"{provider.value}:{model}" for provider, model in self.fallback_chain],
+            "retry": {
+                "max_attempts": self.retry_policy.max_attempts,
+                "base_delay": self.retry_policy.base_delay,
+                "max_delay": self.retry_policy.max_delay
+            },
+            "hedging_enabled": self.hedge_policy.enabled,
+            "routing": self.router.get_stats(),
+            "models": self.metrics.to_dict()
+        }
     
     def get_provider_status(self) -> Dict[str, Dict]:
         """Get status information for all providers"""
@@ -157,6 +659,30 @@ class LLMManager:
                 }
         
         return status
+    
+    def _get_scheduler(self, provider: LLMProvider) -> ProviderScheduler:
+        if provider not in self.schedulers:
+            self.schedulers[provider] = create_scheduler_from_env(provider.value)
+        return self.schedulers[provider]
+    
+    def get_scheduler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get queue depth, in-flight count and wait times per provider"""
+        return {provider.value: scheduler.get_stats() for provider, scheduler in self.schedulers.items()}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and tier sizes of the response cache"""
+        if not self.response_cache:
+            return {"enabled": False, "single_flight": self.single_flight.get_stats()}
+        return {
+            "enabled": True,
+            **self.response_cache.get_stats(),
+            "single_flight": self.single_flight.get_stats()
+        }
+    
+    def clear_cache(self):
+        """Drop every cached response"""
+        if self.response_cache:
+            self.response_cache.clear()
 
 # Global LLM manager instance
 llm_manager = LLMManager()
\ No newline at end of file
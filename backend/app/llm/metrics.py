@@ -0,0 +1,66 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class RollingStats:
+    """Latency and error rate over the most recent calls to one model"""
+
+    def __init__(self, window_size: int = 100, max_age: float = 600.0):
+        self.window_size = window_size
+        self.max_age = max_age
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=window_size)
+
+    def record(self, latency: float, success: bool):
+        self._samples.append((time.monotonic(), latency, success))
+
+    def _recent(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return self._samples
+
+    def sample_count(self) -> int:
+        return len(self._recent())
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency percentile of successful calls, None without samples"""
+        latencies = sorted(latency for _, latency, success in self._recent() if success)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, max(0, int(round(fraction * len(latencies))) - 1))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        samples = self._recent()
+        if not samples:
+            return 0.0
+        return sum(1 for _, _, success in samples if not success) / len(samples)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "samples": self.sample_count(),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate()
+        }
+
+
+class LLMMetrics:
+    """Rolling per provider/model call statistics shared by the LLM layer"""
+
+    def __init__(self, window_size: int = 100):
+        self.window_size = window_size
+        self._stats: Dict[Tuple[str, str], RollingStats] = {}
+
+    def get(self, provider: str, model: str) -> RollingStats:
+        key = (provider, model)
+        if key not in self._stats:
+            self._stats[key] = RollingStats(self.window_size)
+        return self._stats[key]
+
+    def record(self, provider: str, model: str, latency: float, success: bool):
+        self.get(provider, model).record(latency, success)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{provider}:{model}": stats.to_dict() for (provider, model), stats in self._stats.items()}
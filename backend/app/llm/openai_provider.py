@@ -1,14 +1,22 @@
 import openai
 import time
 from typing import List, Optional, AsyncGenerator
-from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse
+from .base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse, LLMProviderError
 
 class OpenAIProvider(BaseLLMProvider):
     """OpenAI GPT provider"""
     
+    supports_multiple_candidates = True
+    
     def __init__(self, api_key: str, **kwargs):
         super().__init__(api_key, **kwargs)
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        # Retries are handled by LLMManager's resilience layer
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+    
+    def _provider_error(self, error: Exception, prefix: str) -> LLMProviderError:
+        status_code = getattr(error, "status_code", None)
+        retryable = None if status_code else isinstance(error, openai.APIConnectionError)
+        return LLMProviderError(f"{prefix}: {str(error)}", provider="openai", status_code=status_code, retryable=retryable)
     
     async def generate(
         self,
@@ -45,7 +53,46 @@ class OpenAIProvider(BaseLLMProvider):
             )
             
         except Exception as e:
-            raise Exception(f"OpenAI API error: {str(e)}")
+            raise self._provider_error(e, "OpenAI API error")
+    
+    async def generate_n(
+        self,
+        messages: List[LLMMessage],
+        model: str = "gpt-4o-mini",
+        n: int = 1,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> List[LLMResponse]:
+        """Generate n choices in one request; the request's token usage is reported on the first"""
+        start_time = time.time()
+        
+        openai_messages = [{"role": msg.role, "content": msg.content} for msg in messages]
+        
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=openai_messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                n=n,
+                **kwargs
+            )
+        except Exception as e:
+            raise self._provider_error(e, "OpenAI API error")
+        
+        response_time = time.time() - start_time
+        tokens_used = response.usage.total_tokens if response.usage else None
+        return [
+            LLMResponse(
+                content=choice.message.content,
+                model_used=model,
+                provider=LLMProvider.OPENAI,
+                tokens_used=tokens_used if index == 0 else None,
+                response_time=response_time
+            )
+            for index, choice in enumerate(response.choices)
+        ]
     
     async def stream_generate(
         self,
@@ -73,7 +120,7 @@ class OpenAIProvider(BaseLLMProvider):
                     yield chunk.choices[0].delta.content
                     
         except Exception as e:
-            raise Exception(f"OpenAI streaming error: {str(e)}")
+            raise self._provider_error(e, "OpenAI streaming error")
     
     def get_available_models(self) -> List[LLMModel]:
         """Get available OpenAI models"""
@@ -0,0 +1,196 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .base_provider import LLMProviderError
+
+
+class CircuitOpenError(LLMProviderError):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit breaker open for {provider}", provider=provider, retryable=False)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable provider errors"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Stops sending traffic to a provider after repeated failures.
+
+    closed -> open after failure_threshold consecutive failures; open ->
+    half_open after recovery_timeout, where a single trial request decides
+    whether to close again or re-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def is_open(self) -> bool:
+        """True while requests are being rejected outright"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.recovery_timeout
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"[LLM] Circuit breaker opened for {self.name}")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def abandon_trial(self):
+        """Forget a half-open trial that ended without a provider verdict"""
+        self._trial_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout
+        }
+
+
+class HedgePolicy:
+    """Decides when a duplicate request should race a slow one"""
+
+    def __init__(self, enabled: bool = False, percentile: float = 0.95, min_samples: int = 20, min_delay: float = 1.0):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+
+    def delay_for(self, stats) -> Optional[float]:
+        """Seconds to wait before hedging, None when hedging should not happen"""
+        if not self.enabled or stats.sample_count() < self.min_samples:
+            return None
+        threshold = stats.percentile(self.percentile)
+        if threshold is None:
+            return None
+        return max(self.min_delay, threshold)
+
+
+async def hedged_call(call: Callable[[], Awaitable[Any]], hedge_delay: Optional[float]) -> Any:
+    """Run call; if it is still pending after hedge_delay, race a duplicate.
+
+    The first successful result wins and the other request is cancelled. If
+    one request fails the other is still awaited.
+    """
+    if hedge_delay is None:
+        return await call()
+
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+        if not done:
+            tasks.append(asyncio.ensure_future(call()))
+
+        pending = set(tasks)
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def call_with_resilience(
+    call: Callable[[], Awaitable[Any]],
+    retry_policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    hedge_delay: Optional[float] = None
+) -> Any:
+    """Run a provider call behind a circuit breaker with jittered retries"""
+    for attempt in range(retry_policy.max_attempts):
+        if not breaker.allow_request():
+            raise CircuitOpenError(breaker.name)
+        try:
+            result = await hedged_call(call, hedge_delay)
+        except LLMProviderError as e:
+            if e.retryable:
+                breaker.record_failure()
+            else:
+                # The provider answered; the request itself was bad
+                breaker.record_success()
+            if not e.retryable or attempt == retry_policy.max_attempts - 1:
+                raise
+            delay = retry_policy.delay(attempt)
+            print(f"[LLM] {breaker.name} attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.abandon_trial()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+def create_retry_policy_from_env() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+    )
+
+
+def create_hedge_policy_from_env() -> HedgePolicy:
+    return HedgePolicy(
+        enabled=os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes"),
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+        min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+    )
+
+
+def create_circuit_breaker_from_env(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name=name,
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5")),
+        recovery_timeout=float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", "30"))
+    )
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .base_provider import LLMMessage, LLMResponse
+
+
+class CacheTier(ABC):
+    """A storage level of the response cache"""
+
+    name: str = "tier"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored response payload, or None if missing or expired"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        """Store a response payload for ttl seconds"""
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """Remove every entry"""
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Number of stored entries"""
+        pass
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() for callers on the event loop"""
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any], ttl: float):
+        """set() for callers on the event loop"""
+        self.set(key, value, ttl)
+
+
+class MemoryCacheTier(CacheTier):
+    """In-process LRU tier bounded by entry count"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheTier(CacheTier):
+    """JSON-file tier that survives restarts, bounded by entry count.
+
+    The entry count is kept in memory, so the directory is only scanned when
+    it overflows; eviction then removes the least recently used files down to
+    90% of `max_entries`. aget/aset do their file I/O in a worker thread.
+    """
+
+    name = "disk"
+
+    def __init__(self, cache_dir: Path, max_entries: int = 5000):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._count = len(list(self.cache_dir.glob("*.json")))
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            self._remove(path)
+            return None
+        # Touch the file so eviction keeps recently used entries
+        os.utime(path, None)
+        return entry.get("value")
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        entry = {"expires_at": time.time() + ttl, "value": value}
+        path = self._path(key)
+        existed = path.exists()
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"[LLM-CACHE] Failed to write disk cache entry: {e}")
+            return
+        with self._lock:
+            if not existed:
+                self._count += 1
+            overflowing = self._count > self.max_entries
+        if overflowing:
+            self._evict()
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any], ttl: float):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._count -= 1
+
+    def _evict(self):
+        files = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        files.sort()
+        with self._lock:
+            self._count = len(files)
+        for _, path in files[:max(0, len(files) - self.max_entries * 9 // 10)]:
+            self._remove(path)
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._count = 0
+
+    def size(self) -> int:
+        return self._count
+
+
+class ResponseCache:
+    """Content-addressed cache of LLM responses with layered storage tiers.
+
+    Lookups walk the tiers in order and copy a lower-tier hit into the faster
+    tiers above it.
+    """
+
+    def __init__(self, tiers: List[CacheTier], ttl: float = 3600.0):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits: Dict[str, int] = {tier.name: 0 for tier in tiers}
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        messages: List[LLMMessage],
+        temperature: float,
+        max_tokens: Optional[int],
+        **kwargs
+    ) -> str:
+        """Hash everything that influences the completion into a cache key"""
+        payload = {
+            "provider": provider,
+            "model": model,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "options": kwargs,
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[LLMResponse]:
+        for index, tier in enumerate(self.tiers):
+            value = await tier.aget(key)
+            if value is None:
+                continue
+            for upper in self.tiers[:index]:
+                await upper.aset(key, value, self.ttl)
+            self.hits += 1
+            self.tier_hits[tier.name] += 1
+            return LLMResponse(**{**value, "cached": True})
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, response: LLMResponse):
+        value = response.model_dump(mode="json")
+        value["cached"] = False
+        for tier in self.tiers:
+            await tier.aset(key, value, self.ttl)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "ttl": self.ttl,
+            "tiers": {
+                tier.name: {"entries": tier.size(), "hits": self.tier_hits[tier.name]}
+                for tier in self.tiers
+            }
+        }
+
+
+def create_response_cache_from_env() -> Optional[ResponseCache]:
+    """Build the response cache configured by LLM_CACHE_* environment variables"""
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    tiers: List[CacheTier] = [MemoryCacheTier(int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")))]
+
+    if os.getenv("LLM_CACHE_DISK", "false").lower() in ("1", "true", "yes"):
+        default_dir = Path(__file__).parent.parent.parent / "data" / "llm_cache"
+        cache_dir = Path(os.getenv("LLM_CACHE_DIR", str(default_dir)))
+        tiers.append(DiskCacheTier(cache_dir, int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "5000"))))
+
+    return ResponseCache(tiers, ttl=ttl)
@@ -0,0 +1,211 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .base_provider import LLMModel, LLMProvider
+from .metrics import RollingStats
+
+# Models that can stand in for each other, cheapest tier first. A request for
+# model "auto:<group>" (or just "auto" for the default group) is routed to
+# whichever member currently best satisfies the routing policy.
+DEFAULT_ROUTE_GROUPS = {
+    "fast": ["deepseek-chat", "gpt-4o-mini", "moonshot-v1-8k", "gpt-3.5-turbo"],
+    "smart": ["gpt-4o", "gpt-4-turbo", "moonshot-v1-32k"],
+    "long": ["moonshot-v1-128k", "gpt-4o", "gpt-4-turbo"]
+}
+
+ROUTE_PREFIX = "auto"
+
+
+class RoutingPolicy:
+    """What "best" means when picking among equivalent models.
+
+    Candidates whose p95 latency or error rate exceed the limits are skipped
+    (models without samples yet are given the benefit of the doubt). The
+    survivors are ordered by cost ("cheapest under 3s p95") or by latency.
+    """
+
+    def __init__(
+        self,
+        objective: str = "cost",
+        max_p95: Optional[float] = None,
+        max_error_rate: float = 0.5,
+        min_samples: int = 5
+    ):
+        if objective not in ("cost", "latency"):
+            raise ValueError(f"Unknown routing objective: {objective}")
+        self.objective = objective
+        self.max_p95 = max_p95
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]], default: "RoutingPolicy") -> "RoutingPolicy":
+        """Override the default policy with a client's llm_settings["routing"]"""
+        if not settings:
+            return default
+        return cls(
+            objective=settings.get("objective", default.objective),
+            max_p95=settings.get("max_p95", default.max_p95),
+            max_error_rate=settings.get("max_error_rate", default.max_error_rate),
+            min_samples=settings.get("min_samples", default.min_samples)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "objective": self.objective,
+            "max_p95": self.max_p95,
+            "max_error_rate": self.max_error_rate,
+            "min_samples": self.min_samples
+        }
+
+
+class ModelRouter:
+    """Chooses a concrete (provider, model) for a routing alias"""
+
+    def __init__(self, groups: Dict[str, List[str]], default_group: str = "fast", policy: Optional[RoutingPolicy] = None):
+        self.groups = groups
+        self.default_group = default_group
+        self.policy = policy or RoutingPolicy()
+        self.routed: Dict[str, int] = {}
+        self._outstanding: Dict[Tuple[LLMProvider, str], int] = {}
+
+    def is_route(self, model: str) -> bool:
+        return model == ROUTE_PREFIX or model.startswith(f"{ROUTE_PREFIX}:")
+
+    def group_for(self, model: str) -> str:
+        group = model.split(":", 1)[1] if ":" in model else self.default_group
+        if group not in self.groups:
+            raise ValueError(f"Unknown routing group '{group}'. Available: {list(self.groups)}")
+        return group
+
+    def rank(
+        self,
+        model: str,
+        models: List[LLMModel],
+        stats_for: Callable[[LLMModel], RollingStats],
+        load_for: Callable[[LLMModel], float],
+        is_healthy: Callable[[LLMModel], bool],
+        policy: Optional[RoutingPolicy] = None
+    ) -> List[Tuple[LLMProvider, str]]:
+        """Order the available members of the alias' group, best first.
+
+        load_for returns how many requests are already queued per provider
+        slot, so a burst of fan-out calls spreads across backends instead of
+        piling onto the one that looked fastest a moment ago.
+        """
+        policy = policy or self.policy
+        members = self.groups[self.group_for(model)]
+        available = [m for m in models if m.id in members]
+        if not available:
+            raise ValueError(f"No available models for route '{model}'. Group members: {members}")
+
+        scored = []
+        for candidate in available:
+            stats = stats_for(candidate)
+            known = stats.sample_count() >= policy.min_samples
+            p95 = stats.percentile(0.95) if known else None
+            expected_latency = p95 * (1 + load_for(candidate)) if p95 is not None else None
+
+            eligible = is_healthy(candidate)
+            if known and stats.error_rate() > policy.max_error_rate:
+                eligible = False
+            if policy.max_p95 is not None and expected_latency is not None and expected_latency > policy.max_p95:
+                eligible = False
+
+            # Unmeasured models sort as if they were as fast as the limit allows
+            latency_key = expected_latency if expected_latency is not None else (policy.max_p95 or 0.0)
+            if policy.objective == "cost":
+                key = (candidate.cost_per_token, latency_key, members.index(candidate.id))
+            else:
+                key = (latency_key, candidate.cost_per_token, members.index(candidate.id))
+            scored.append((not eligible, key, candidate))
+
+        scored.sort(key=lambda item: (item[0], item[1]))
+        ranked = [(candidate.provider, candidate.id) for _, _, candidate in scored]
+
+        choice = f"{ranked[0][0].value}:{ranked[0][1]}"
+        self.routed[choice] = self.routed.get(choice, 0) + 1
+        return ranked
+
+    def begin(self, target: Tuple[LLMProvider, str]):
+        """Count a routed request until it finishes, so concurrent routing sees it"""
+        self._outstanding[target] = self._outstanding.get(target, 0) + 1
+
+    def end(self, target: Tuple[LLMProvider, str]):
+        remaining = self._outstanding.get(target, 0) - 1
+        if remaining > 0:
+            self._outstanding[target] = remaining
+        else:
+            self._outstanding.pop(target, None)
+
+    def lease(self, target: Tuple[LLMProvider, str]) -> "RouteLease":
+        """Count a routed request against target until the lease moves or is released"""
+        return RouteLease(self, target)
+
+    def outstanding(self, target: Tuple[LLMProvider, str]) -> int:
+        return self._outstanding.get(target, 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "groups": self.groups,
+            "default_group": self.default_group,
+            "policy": self.policy.to_dict(),
+            "routed": dict(self.routed),
+            "outstanding": {f"{provider.value}:{model}": count for (provider, model), count in self._outstanding.items()}
+        }
+
+
+class RouteLease:
+    """Keeps one routed request counted against the candidate currently serving it.
+
+    A request moves to the next candidate when one fails, and a cached
+    answer needs none, so the count follows the request instead of staying
+    on the model it was first routed to.
+    """
+
+    def __init__(self, router: ModelRouter, target: Optional[Tuple[LLMProvider, str]]):
+        self.router = router
+        self.target = None
+        self.move(target)
+
+    def move(self, target: Optional[Tuple[LLMProvider, str]]):
+        if target == self.target:
+            return
+        if self.target:
+            self.router.end(self.target)
+        self.target = target
+        if target:
+            self.router.begin(target)
+
+    def release(self):
+        self.move(None)
+
+
+def _parse_groups(spec: str) -> Dict[str, List[str]]:
+    """Parse 'fast=a,b;smart=c,d' into {group: [models]}"""
+    groups = {}
+    for entry in spec.split(";"):
+        if "=" not in entry:
+            continue
+        name, models = entry.split("=", 1)
+        members = [m.strip() for m in models.split(",") if m.strip()]
+        if members:
+            groups[name.strip()] = members
+    return groups
+
+
+def create_model_router_from_env() -> ModelRouter:
+    """Build the router configured by LLM_ROUTE_* environment variables"""
+    groups_spec = os.getenv("LLM_ROUTE_GROUPS")
+    groups = _parse_groups(groups_spec) if groups_spec else dict(DEFAULT_ROUTE_GROUPS)
+    max_p95 = os.getenv("LLM_ROUTE_MAX_P95")
+    policy = RoutingPolicy(
+        objective=os.getenv("LLM_ROUTE_OBJECTIVE", "cost"),
+        max_p95=float(max_p95) if max_p95 else None,
+        max_error_rate=float(os.getenv("LLM_ROUTE_MAX_ERROR_RATE", "0.5")),
+        min_samples=int(os.getenv("LLM_ROUTE_MIN_SAMPLES", "5"))
+    )
+    default_group = os.getenv("LLM_ROUTE_DEFAULT_GROUP", "fast")
+    if default_group not in groups:
+        default_group = next(iter(groups), "fast")
+    return ModelRouter(groups, default_group, policy)
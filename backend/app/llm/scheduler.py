@@ -0,0 +1,209 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional
+
+from .tokens import estimate_tokens
+
+# Session the current request is being processed for. The WebSocket loop
+# sets it so provider calls deep inside agents are queued fairly per session.
+current_session_id: ContextVar[Optional[str]] = ContextVar("current_session_id", default=None)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate_per_second)
+        self._last_refill = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be consumed (0 if available now)"""
+        self._refill()
+        # A request larger than the bucket only needs a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Charge (or refund) the difference between estimated and real usage"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _Waiter:
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class ProviderScheduler:
+    """Admission control for one LLM provider.
+
+    Bounds the number of in-flight requests, enforces requests-per-minute and
+    tokens-per-minute budgets, and hands out free slots round-robin across
+    sessions so one large fan-out cannot starve everyone else.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int = 10,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._in_flight = 0
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+
+        self.total_requests = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=200)
+
+    @asynccontextmanager
+    async def slot(self, session_id: Optional[str] = None, tokens: int = 0):
+        """Wait for admission, hold a slot for the duration of the block"""
+        waiter = _Waiter(tokens)
+        self._queues.setdefault(session_id or "_anonymous", deque()).append(waiter)
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted right as we were cancelled; give the slot back
+                self._release()
+            else:
+                self._remove(session_id or "_anonymous", waiter)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token budget once the provider reports real usage"""
+        if self.token_bucket and actual_tokens is not None:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def _remove(self, key: str, waiter: _Waiter):
+        queue = self._queues.get(key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[key]
+        self._dispatch()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _budget_wait(self, tokens: int) -> float:
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.wait_time(1))
+        if self.token_bucket and tokens:
+            wait = max(wait, self.token_bucket.wait_time(tokens))
+        return wait
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+
+            wait = self._budget_wait(waiter.tokens)
+            if wait > 0:
+                if self._retry_handle is None:
+                    loop = asyncio.get_running_loop()
+                    self._retry_handle = loop.call_later(wait, self._retry_dispatch)
+                return
+
+            queue.popleft()
+            # Round-robin: this session goes to the back of the line
+            del self._queues[key]
+            if queue:
+                self._queues[key] = queue
+
+            if waiter.future.done():
+                continue
+
+            if self.request_bucket:
+                self.request_bucket.consume(1)
+            if self.token_bucket and waiter.tokens:
+                self.token_bucket.consume(waiter.tokens)
+
+            waited = time.monotonic() - waiter.enqueued_at
+            self.total_requests += 1
+            self.total_wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+            self._recent_waits.append(waited)
+
+            self._in_flight += 1
+            waiter.future.set_result(None)
+
+    def _retry_dispatch(self):
+        self._retry_handle = None
+        self._dispatch()
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def pending(self) -> int:
+        """Requests holding a slot plus requests waiting for one"""
+        return self._in_flight + self.queue_depth()
+
+    def get_stats(self) -> Dict[str, Any]:
+        recent = sorted(self._recent_waits)
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth(),
+            "sessions_waiting": len(self._queues),
+            "total_requests": self.total_requests,
+            "avg_wait_time": self.total_wait_time / self.total_requests if self.total_requests else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "p95_wait_time": recent[int(len(recent) * 0.95) - 1] if recent else 0.0,
+            "requests_per_minute_available": self.request_bucket.tokens if self.request_bucket else None,
+            "tokens_per_minute_available": self.token_bucket.tokens if self.token_bucket else None
+        }
+
+
+def estimate_request_tokens(messages, max_tokens: Optional[int]) -> int:
+    """Rough prompt + completion token estimate (about 4 characters per token)"""
+    return sum(estimate_tokens(message.content) for message in messages) + (max_tokens or 512)
+
+
+def create_scheduler_from_env(provider_name: str, default_max_in_flight: int = 10) -> ProviderScheduler:
+    """Build a scheduler configured by LLM_<PROVIDER>_* environment variables"""
+    prefix = f"LLM_{provider_name.upper()}_"
+    rpm = os.getenv(f"{prefix}REQUESTS_PER_MINUTE")
+    tpm = os.getenv(f"{prefix}TOKENS_PER_MINUTE")
+    return ProviderScheduler(
+        name=provider_name,
+        max_in_flight=int(os.getenv(f"{prefix}MAX_IN_FLIGHT", str(default_max_in_flight))),
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None
+    )
@@ -0,0 +1,25 @@
+"""
+Token estimates for budgeting prompts before they are sent
+"""
+
+# A rough average across the providers' tokenizers for English text and JSON
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "...[truncated]..."
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a piece of text"""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """Cut text to about max_tokens, keeping its start ("head") or its end ("tail")"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER) - 1
+    if max_chars <= 0:
+        return ""
+    if keep == "tail":
+        return f"{TRUNCATION_MARKER}\n{text[-max_chars:]}"
+    return f"{text[:max_chars]}\n{TRUNCATION_MARKER}"
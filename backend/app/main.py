@@ -1,6 +1,7 @@
 # GLOBAL UTF-8 ENCODING FIX - Must be at the top
 import os
 import sys
+import asyncio
 if sys.platform == "win32":
     os.environ["PYTHONIOENCODING"] = "utf-8"
     os.environ["PYTHONUTF8"] = "1"
@@ -10,13 +11,19 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .state import sessions
 from .websocket.connection import router as websocket_router
+from .websocket.manager import manager
+from .core.serialization import FastJSONResponse
 from .api.agent_templates import router as agent_templates_router
 from .api.llm_providers import router as llm_providers_router
 from .api.health import router as health_router
 from .api.users import router as users_router
 from .api.development_pipeline import router as development_pipeline_router
 
-app = FastAPI(title="AI Multi-Agent Prototyper API", version="2.0.0")
+app = FastAPI(
+    title="AI Multi-Agent Prototyper API",
+    version="2.0.0",
+    default_response_class=FastJSONResponse
+)
 
 # Allow frontend to connect
 app.add_middleware(
@@ -34,6 +41,22 @@ app.include_router(health_router)
 app.include_router(users_router)
 app.include_router(development_pipeline_router, prefix="/api")
 
+@app.on_event("startup")
+async def start_session_sweeper():
+    # Evict idle WebSocket sessions in the background
+    app.state.session_sweeper = asyncio.create_task(
+        sessions.run_sweeper(float(os.getenv("SESSION_SWEEP_INTERVAL", "60")))
+    )
+
+@app.on_event("startup")
+async def start_message_bus():
+    # Lets any worker push messages to sockets held by another worker
+    await manager.start()
+
+@app.on_event("shutdown")
+async def stop_message_bus():
+    await manager.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "ProtoBuild Backend is running"}
@@ -42,3 +65,13 @@ def read_root():
 def health_check():
     from .state import sessions
     return {"status": "healthy", "sessions": len(sessions)}
+
+@app.get("/health/sessions")
+def session_stats():
+    """Session count, pins, evictions and the largest sessions by estimated size"""
+    return sessions.get_stats()
+
+@app.get("/health/websockets")
+def websocket_stats():
+    """Outbound queue depth, merged, superseded and dropped frames, and stalled clients"""
+    return manager.get_stats()
@@ -45,4 +45,8 @@ class SharedAgentMemory(BaseModel):
     session_id: str
     conversation_context: ConversationContext
     cross_agent_insights: List[Dict[str, Any]] = []
-    synthesis_results: List[Dict[str, Any]] = []
\ No newline at end of file
+    synthesis_results: List[Dict[str, Any]] = []
+    # Rolling summary of the requests and agent responses folded out of the session
+    conversation_summary: str = ""
+    summarized_turns: int = 0
+    summarized_responses: int = 0
\ No newline at end of file
@@ -49,6 +49,7 @@ class AgentTemplate(BaseModel):
     icon: str = "🤖"  # Emoji icon for the agent
     is_active: bool = True
     is_custom: bool = False  # True if user-created, False for pre-defined
+    depends_on: List[str] = Field(default_factory=list)  # Templates whose results this one builds on
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
@@ -65,6 +66,7 @@ class CreateAgentTemplateRequest(BaseModel):
     prompt: str
     color: str = "#007bff"
     icon: str = "🤖"
+    depends_on: List[str] = Field(default_factory=list)
 
 class UpdateAgentTemplateRequest(BaseModel):
     """Request to update an existing agent template"""
@@ -74,6 +76,7 @@ class UpdateAgentTemplateRequest(BaseModel):
     color: Optional[str] = None
     icon: Optional[str] = None
     is_active: Optional[bool] = None
+    depends_on: Optional[List[str]] = None
 
 class AgentExecutionRequest(BaseModel):
     """Request for agent execution with template"""
@@ -91,6 +94,9 @@ class AgentExecutionResult(BaseModel):
     critique: Optional[str] = None
     confidence_level: float = 0.0
     execution_time: float = 0.0
+    input_tokens_estimate: Optional[int] = None  # Prompt tokens estimated before the call
+    error: Optional[str] = None  # Set when the agent failed, timed out or was skipped
+    memoized: bool = False  # Reused from an earlier run with the same inputs
     
     # Special fields for specific agent types
     alternative_ideas: List[str] = Field(default_factory=list)  # For coach agent
@@ -518,6 +524,10 @@ Focus on comprehensive testing and quality assurance."""
         "description": "🧬 Fuses all agent insights into unified strategic intelligence",
         "color": "#e91e63",
         "icon": "🧬",
+        "depends_on": [
+            "ui_designer_default", "ux_researcher_default", "developer_default",
+            "product_manager_default", "stakeholder_default"
+        ],
         "prompt": """You are the NEURAL SYNTHESIZER - the ultimate intelligence fusion agent that combines all specialist insights into cohesive strategic intelligence.
 
 🧬 **SYNTHESIS PROTOCOL ACTIVATED** 🧬
@@ -571,6 +581,7 @@ Transform the collective agent intelligence into SINGULAR STRATEGIC POWER! 🚀"
         "description": "📋 Creates comprehensive Product Requirements Documents from agent analysis",
         "color": "#673ab7",
         "icon": "📋",
+        "depends_on": ["synthesizer_default"],
         "prompt": """You are the PRD ARCHITECT - the master document creator that transforms multi-agent intelligence into production-ready Product Requirements Documents.
 
 📋 **PRD CONSTRUCTION PROTOCOL** 📋
@@ -652,6 +663,7 @@ Transform agent intelligence into PRODUCTION-READY SPECIFICATIONS! 🚀"""
         "description": "🏗️ Creates comprehensive development plans with epics, stories, and tasks",
         "color": "#795548",
         "icon": "🏗️",
+        "depends_on": ["prd_creator_default"],
         "prompt": """You are the DEVELOPMENT PLANNER - the master architect of comprehensive development roadmaps that transforms requirements into structured epic-story-task hierarchies.
 
 🏗️ **DEVELOPMENT PLANNING PROTOCOL** 🏗️
@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ..core.serialization import dumps_bytes
+
+
+class PatchError(ValueError):
+    """A patch does not apply to the document it was given"""
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """JSON Patch (RFC 6902) operations that turn `old` into `new`.
+
+    Objects are compared key by key and lists element by element after
+    trimming their common prefix and suffix, so editing one screen of a large
+    prototype produces operations for that screen only.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key in old:
+                ops.extend(diff(old[key], value, child))
+            else:
+                ops.append({"op": "add", "path": child, "value": value})
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        return _diff_lists(old, new, path)
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _diff_lists(old: List[Any], new: List[Any], path: str) -> List[Dict[str, Any]]:
+    start = 0
+    while start < len(old) and start < len(new) and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+
+    ops = []
+    changed = min(old_end, new_end) - start
+    for offset in range(changed):
+        ops.extend(diff(old[start + offset], new[start + offset], f"{path}/{start + offset}"))
+    # Surplus old items are removed from the back so earlier indexes stay valid
+    for index in range(old_end - 1, start + changed - 1, -1):
+        ops.append({"op": "remove", "path": f"{path}/{index}"})
+    for index in range(start + changed, new_end):
+        ops.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+    return ops
+
+
+def apply_patch(document: Any, ops: List[Dict[str, Any]]) -> Any:
+    """Apply add/remove/replace operations; returns the patched document.
+
+    Containers along each patched path are copied, so `document` itself is
+    left untouched.
+    """
+    for op in ops:
+        tokens = [_unescape(token) for token in op["path"].split("/")[1:]] if op["path"] else []
+        if not tokens:
+            if op["op"] == "remove":
+                raise PatchError("Cannot remove the document root")
+            document = op["value"]
+            continue
+        document = _apply_at(document, tokens, op)
+    return document
+
+
+def _apply_at(container: Any, tokens: List[str], op: Dict[str, Any]) -> Any:
+    token = tokens[0]
+    if isinstance(container, dict):
+        container = dict(container)
+        key: Any = token
+    elif isinstance(container, list):
+        container = list(container)
+        if token == "-" and op["op"] == "add" and len(tokens) == 1:
+            key = len(container)
+        else:
+            try:
+                key = int(token)
+            except ValueError:
+                raise PatchError(f"Invalid list index '{token}' in {op['path']}")
+            limit = len(container) + (1 if op["op"] == "add" and len(tokens) == 1 else 0)
+            if not 0 <= key < limit:
+                raise PatchError(f"List index {key} out of range in {op['path']}")
+    else:
+        raise PatchError(f"Path {op['path']} does not exist")
+
+    if len(tokens) > 1:
+        if isinstance(container, dict) and key not in container:
+            raise PatchError(f"Path {op['path']} does not exist")
+        container[key] = _apply_at(container[key], tokens[1:], op)
+        return container
+
+    if op["op"] == "add":
+        if isinstance(container, list):
+            container.insert(key, op["value"])
+        else:
+            container[key] = op["value"]
+    elif op["op"] in ("replace", "remove"):
+        if isinstance(container, dict) and key not in container:
+            raise PatchError(f"Path {op['path']} does not exist")
+        if op["op"] == "replace":
+            container[key] = op["value"]
+        else:
+            del container[key]
+    else:
+        raise PatchError(f"Unsupported patch operation '{op['op']}'")
+    return container
+
+
+class PrototypeVersions:
+    """Version history of a session's prototype and what its client has acknowledged.
+
+    Every stored prototype gets the next version number. A client that
+    acknowledges versions (prototype_ack) is sent patches against the last
+    version it confirmed; one that never acknowledges, or whose version is no
+    longer in the recent history, is sent the full tree. Stored prototypes are
+    replaced rather than edited in place, so the history keeps references.
+    """
+
+    def __init__(self, prototype: Any = None, version: int = 0, history_size: int = 8):
+        self.version = version
+        self.history_size = history_size
+        self._history: "OrderedDict[int, Any]" = OrderedDict()
+        self._history[version] = prototype if prototype is not None else {}
+        self.acked_version: Optional[int] = None
+        self.patches_sent = 0
+        self.full_sent = 0
+
+    def commit(self, prototype: Any) -> int:
+        self.version += 1
+        self._history[self.version] = prototype
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        return self.version
+
+    def ack(self, version: int) -> bool:
+        """Record the version the client holds; False if it is unknown here"""
+        if version not in self._history:
+            self.acked_version = None
+            return False
+        self.acked_version = version
+        return True
+
+    def reset_client(self):
+        """A new connection holds no version until it acknowledges one"""
+        self.acked_version = None
+
+    @property
+    def client_supports_patches(self) -> bool:
+        return self.acked_version is not None
+
+    def update_message(self) -> Dict[str, Any]:
+        """The frame that brings the client from its acknowledged version to the current one"""
+        prototype = self._history[self.version]
+        base = self._history.get(self.acked_version) if self.acked_version is not None else None
+        if base is not None:
+            ops = diff(base, prototype)
+            # A regenerated tree can diff larger than itself; then the tree is cheaper
+            if len(dumps_bytes(ops)) < len(dumps_bytes(prototype)):
+                self.patches_sent += 1
+                return {
+                    "type": "prototype_patch",
+                    "data": {"base_version": self.acked_version, "version": self.version, "ops": ops}
+                }
+        return self.full_message()
+
+    def full_message(self) -> Dict[str, Any]:
+        self.full_sent += 1
+        return {"type": "prototype", "data": self._history[self.version], "version": self.version}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "acked_version": self.acked_version,
+            "history": list(self._history),
+            "patches_sent": self.patches_sent,
+            "full_sent": self.full_sent
+        }
@@ -0,0 +1,146 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Characters that may appear outside strings in valid JSON (besides
+# structural characters and whitespace): numbers, true, false and null.
+_LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+_WHITESPACE = set(" \t\r\n")
+
+
+class PrototypeStreamError(ValueError):
+    """The streamed prototype cannot become a valid component tree"""
+
+
+class _Frame:
+    def __init__(self, kind: str, start: int, path: Optional[List[int]] = None):
+        self.kind = kind            # "{" or "["
+        self.start = start          # offset of the opening bracket
+        self.path = path            # object: its position in the tree, if it is a node
+                                    # array: the owning node's path, if this is its "children"
+        self.key: Optional[str] = None
+        self.expect_key = kind == "{"
+        self.index = 0
+
+
+class PrototypeStreamParser:
+    """Incrementally parses a streamed {component, props, children, text} tree.
+
+    feed() takes raw completion deltas and returns the component nodes that
+    were completed by them, as {"path": [child indexes from the root], "node":
+    {...}}. Nodes deeper than emit_depth are delivered inside their ancestor
+    rather than separately. Markdown fences and a short preamble before the
+    root object are skipped; anything that cannot be JSON raises
+    PrototypeStreamError as soon as it is seen, so the caller can stop the
+    generation instead of paying for the rest of it.
+    """
+
+    def __init__(self, emit_depth: int = 2, max_preamble: int = 200):
+        self.emit_depth = emit_depth
+        self.max_preamble = max_preamble
+        self._text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    @property
+    def done(self) -> bool:
+        return self._root_end is not None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a delta and return the nodes it completed"""
+        if self.done:
+            return []
+        self._text += chunk
+        events = []
+        text = self._text
+
+        while self._pos < len(text) and not self.done:
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame.kind == "{" and frame.expect_key:
+                        frame.key = json.loads(text[self._string_start:i + 1])
+                        frame.expect_key = False
+                continue
+
+            if self._root_start is None:
+                if c == "{":
+                    self._root_start = i
+                    self._stack.append(_Frame("{", i, path=[]))
+                elif i >= self.max_preamble:
+                    raise PrototypeStreamError("No JSON object found at the start of the response")
+                continue
+
+            if c in _WHITESPACE or c == ":":
+                continue
+            top = self._stack[-1]
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == "{":
+                path = None
+                if top.kind == "[" and top.path is not None:
+                    path = top.path + [top.index]
+                self._stack.append(_Frame("{", i, path=path))
+            elif c == "[":
+                path = top.path if top.kind == "{" and top.key == "children" else None
+                self._stack.append(_Frame("[", i, path=path))
+            elif c == "}":
+                frame = self._close("{", c)
+                if not self._stack:
+                    self._root_end = i
+                elif frame.path is not None and len(frame.path) <= self.emit_depth:
+                    events.append({"path": frame.path, "node": self._node(text[frame.start:i + 1])})
+            elif c == "]":
+                self._close("[", c)
+            elif c == ",":
+                if top.kind == "{":
+                    top.expect_key = True
+                else:
+                    top.index += 1
+            elif c not in _LITERAL_CHARS:
+                raise PrototypeStreamError(f"Unexpected character {c!r} at offset {i}")
+
+        return events
+
+    def close(self) -> Dict[str, Any]:
+        """Return the complete tree once the stream has ended"""
+        if not self.done:
+            raise PrototypeStreamError("Response ended before the component tree was complete")
+        return self._node(self._text[self._root_start:self._root_end + 1])
+
+    def _close(self, kind: str, char: str) -> _Frame:
+        if not self._stack or self._stack[-1].kind != kind:
+            raise PrototypeStreamError(f"Unbalanced {char!r} at offset {self._pos - 1}")
+        return self._stack.pop()
+
+    @staticmethod
+    def _node(source: str) -> Dict[str, Any]:
+        try:
+            node = json.loads(source)
+        except json.JSONDecodeError as e:
+            raise PrototypeStreamError(f"Invalid JSON in component: {e}") from e
+        if not isinstance(node, dict) or not isinstance(node.get("component"), str):
+            raise PrototypeStreamError("Component node is missing its 'component' name")
+        return node
+
+
+def parse_prototype(content: str) -> Dict[str, Any]:
+    """Parse a complete (possibly fenced) prototype response"""
+    parser = PrototypeStreamParser()
+    parser.feed(content)
+    return parser.close()
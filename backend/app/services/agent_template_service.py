@@ -88,6 +88,7 @@ class AgentTemplateService:
             prompt=request.prompt,
             color=request.color,
             icon=request.icon,
+            depends_on=request.depends_on,
             is_active=True,
             is_custom=True,
             created_at=datetime.now().isoformat(),
@@ -118,6 +119,8 @@ class AgentTemplateService:
             template.color = request.color
         if request.icon is not None:
             template.icon = request.icon
+        if request.depends_on is not None:
+            template.depends_on = request.depends_on
         if request.is_active is not None:
             template.is_active = request.is_active
             if request.is_active and template_id not in self.active_templates:
@@ -187,6 +190,7 @@ class AgentTemplateService:
             prompt=original.prompt,
             color=original.color,
             icon=original.icon,
+            depends_on=list(original.depends_on),
             is_active=True,
             is_custom=True,
             created_at=datetime.now().isoformat(),
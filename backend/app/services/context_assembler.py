@@ -0,0 +1,134 @@
+"""
+Packs prompt context sections into a model's input token budget
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..llm.llm_manager import llm_manager
+from ..llm.tokens import estimate_tokens, truncate_to_tokens
+
+
+@dataclass
+class ContextSection:
+    """A titled block of context.
+
+    Lower `priority` values are packed first and are the last to be cut.
+    `keep` says which end of the body survives truncation ("tail" for
+    histories, where the latest entries matter most); a section that would
+    keep fewer than `min_tokens` of its body is dropped instead.
+    """
+    name: str
+    title: str
+    body: str
+    priority: int = 5
+    keep: str = "head"
+    min_tokens: int = 32
+
+    def render(self, body: Optional[str] = None) -> str:
+        return f"{self.title}\n{self.body if body is None else body}\n"
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    tokens: int
+    budget: int
+    sections: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def truncated(self) -> List[str]:
+        return [name for name, report in self.sections.items() if report["status"] == "truncated"]
+
+    @property
+    def dropped(self) -> List[str]:
+        return [name for name, report in self.sections.items() if report["status"] == "dropped"]
+
+    def summary(self) -> str:
+        """One line for the [CONTEXT] logs"""
+        line = f"~{self.tokens} context tokens (budget {self.budget})"
+        if self.truncated:
+            line += f", truncated: {', '.join(self.truncated)}"
+        if self.dropped:
+            line += f", dropped: {', '.join(self.dropped)}"
+        return line
+
+
+class ContextAssembler:
+    """Fits context sections into a token budget.
+
+    Sections are granted budget in priority order: each is kept whole if it
+    fits, truncated to what is left otherwise, or dropped when too little is
+    left. The survivors are emitted in the order they were added, as titled
+    blocks separated by blank lines.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = max(0, budget)
+        self.sections: List[ContextSection] = []
+
+    @classmethod
+    def for_model(
+        cls,
+        model: str,
+        *reserved: str,
+        max_tokens: Optional[int] = None,
+        cap: Optional[int] = None
+    ) -> "ContextAssembler":
+        """An assembler for what `model` has left after the `reserved` prompt text"""
+        budget = llm_manager.input_token_budget(model, max_tokens, cap)
+        return cls(budget - sum(estimate_tokens(text) for text in reserved))
+
+    def add(self, name: str, title: str, body: str, priority: int = 5, keep: str = "head", min_tokens: int = 32):
+        """Add a section; empty bodies are skipped"""
+        if body:
+            self.sections.append(ContextSection(name, title, body, priority, keep, min_tokens))
+        return self
+
+    def extend(self, sections: List[ContextSection]):
+        self.sections.extend(section for section in sections if section.body)
+        return self
+
+    def assemble(self) -> AssembledContext:
+        remaining = self.budget
+        rendered: Dict[int, str] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+
+        order = sorted(range(len(self.sections)), key=lambda index: self.sections[index].priority)
+        for index in order:
+            section = self.sections[index]
+            # One extra token for the blank line between sections
+            full = section.render()
+            tokens = estimate_tokens(full) + 1
+            if tokens <= remaining:
+                rendered[index] = full
+                remaining -= tokens
+                report[section.name] = {"tokens": tokens, "status": "kept"}
+                continue
+
+            available = remaining - estimate_tokens(section.title) - 2
+            if available >= section.min_tokens:
+                text = section.render(truncate_to_tokens(section.body, available, section.keep))
+                used = estimate_tokens(text) + 1
+                rendered[index] = text
+                remaining -= used
+                report[section.name] = {"tokens": used, "status": "truncated", "original_tokens": tokens}
+            else:
+                report[section.name] = {"tokens": 0, "status": "dropped", "original_tokens": tokens}
+
+        text = "\n".join(rendered[index] for index in sorted(rendered))
+        return AssembledContext(text=text, tokens=estimate_tokens(text), budget=self.budget, sections=report)
+
+
+def session_sections(
+    builder,
+    history_line: str = "{n}. {text}",
+    preferences_title: str = "LEARNED USER PREFERENCES:"
+) -> List[ContextSection]:
+    """The builder's session context as sections: prototype first, history cut from the front"""
+    return [
+        ContextSection("summary", "CONVERSATION SUMMARY:", builder.summary(), priority=2),
+        ContextSection("history", "CONVERSATION HISTORY:", builder.history(5, history_line), priority=3, keep="tail"),
+        ContextSection("prototype", "CURRENT PROTOTYPE STATE:", builder.prototype(), priority=1),
+        ContextSection("preferences", preferences_title, builder.preferences(), priority=2)
+    ]
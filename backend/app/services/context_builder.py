@@ -0,0 +1,98 @@
+"""
+Per-session prompt context, rendered once per change of the underlying state
+"""
+
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from ..core.serialization import dumps_pretty
+
+
+class SessionContextBuilder:
+    """Renders a session's context sections and caches them by state version.
+
+    Summary, history, prototype, preferences and documents are each cached
+    together with the version of the state they were rendered from (turns
+    summarized, history length, prototype version, memory version, document
+    count), so an agent fan-out renders the prototype JSON once instead of
+    once per agent.
+    """
+
+    def __init__(self, session: Dict[str, Any]):
+        self.session = session
+        self._cache: Dict[Hashable, Tuple[Hashable, str]] = {}
+        self.renders = 0
+        self.hits = 0
+
+    def _cached(self, name: Hashable, version: Hashable, render: Callable[[], str]) -> str:
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return cached[1]
+        text = render()
+        self._cache[name] = (version, text)
+        self.renders += 1
+        return text
+
+    def _history_version(self) -> Hashable:
+        history = self.session.get("history") or []
+        return (len(history), history[-1] if history else None)
+
+    def _prototype_version(self) -> Hashable:
+        versions = self.session.get("prototype_versions")
+        # The object identity catches prototypes stored without a new version
+        return (versions.version if versions else None, id(self.session.get("current_prototype")))
+
+    def _memory_version(self) -> Hashable:
+        memory = self.session.get("memory")
+        return (id(memory), memory.version if memory else None)
+
+    def _summary_version(self) -> Hashable:
+        shared_memory = self.session.get("shared_memory")
+        if shared_memory is None:
+            return None
+        return (id(shared_memory), shared_memory.summarized_turns, shared_memory.summarized_responses)
+
+    def _documents_version(self) -> Hashable:
+        return len(self.session.get("imported_documents") or [])
+
+    def history(self, limit: int = 5, line: str = "{n}. {text}") -> str:
+        """The last `limit` user messages, one per line"""
+        def render():
+            recent = (self.session.get("history") or [])[-limit:]
+            return "\n".join(line.format(n=n, text=text) for n, text in enumerate(recent, 1))
+        return self._cached(("history", limit, line), self._history_version(), render)
+
+    def summary(self) -> str:
+        """Rolling summary of the turns compacted out of the session, or "" """
+        def render():
+            shared_memory = self.session.get("shared_memory")
+            return shared_memory.conversation_summary if shared_memory else ""
+        return self._cached("summary", self._summary_version(), render)
+
+    def prototype(self) -> str:
+        """The current prototype as indented JSON, or "" if there is none"""
+        def render():
+            prototype = self.session.get("current_prototype")
+            return dumps_pretty(prototype) if prototype else ""
+        return self._cached("prototype", self._prototype_version(), render)
+
+    def preferences(self) -> str:
+        """Learned preferences, or "" if nothing has been learned yet"""
+        def render():
+            memory = self.session.get("memory")
+            summary = memory.get_context_summary() if memory else ""
+            return "" if summary == "No learned preferences yet." else summary
+        return self._cached("preferences", self._memory_version(), render)
+
+    def documents(self, limit: int = 1, preview: int = 200) -> str:
+        """Name, type and opening text of the most recently imported documents"""
+        def render():
+            parts = []
+            for doc in (self.session.get("imported_documents") or [])[-limit:]:
+                parts.append(f"Document: {doc['name']} ({doc['type']})\n")
+                parts.append(f"Brief Summary: {doc['content'][:preview]}...\n\n")
+            return "".join(parts)
+        return self._cached(("documents", limit, preview), self._documents_version(), render)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"renders": self.renders, "hits": self.hits, "sections": len(self._cache)}
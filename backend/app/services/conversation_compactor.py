@@ -0,0 +1,156 @@
+"""
+Background compaction of long sessions into a rolling conversation summary
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, Optional
+
+from ..llm.llm_manager import llm_manager
+from ..llm.base_provider import LLMMessage
+from .context_assembler import ContextAssembler
+
+SUMMARY_INSTRUCTIONS = (
+    "You keep a running summary of a product design conversation between a user and a team of "
+    "design agents. Be concise and factual."
+)
+
+
+class ConversationCompactor:
+    """Folds a session's older requests and agent responses into a summary.
+
+    Once a session holds more than `max_history` requests or `max_responses`
+    agent responses, everything but the most recent ones is summarized,
+    together with the previous summary, by a cheap model. The summary is
+    stored on the session's SharedAgentMemory and the folded items are
+    removed, so session memory stays flat while prompts keep long-range
+    context. A failed call leaves the session untouched for the next attempt.
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        max_history: int = 12,
+        keep_recent: int = 5,
+        max_responses: int = 30,
+        keep_responses: int = 10,
+        summary_tokens: int = 400,
+        enabled: bool = True
+    ):
+        self.model = model
+        self.max_history = max_history
+        self.keep_recent = keep_recent
+        self.max_responses = max_responses
+        self.keep_responses = keep_responses
+        self.summary_tokens = summary_tokens
+        self.enabled = enabled
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.compactions = 0
+        self.failures = 0
+
+    def needs_compaction(self, session: Dict[str, Any]) -> bool:
+        workflow = session.get("multi_agent_workflow")
+        responses = workflow.agent_responses if workflow else []
+        return len(session.get("history") or []) > self.max_history or len(responses) > self.max_responses
+
+    def schedule(self, session_id: str, session: Dict[str, Any], on_done: Optional[Callable[[str], None]] = None):
+        """Start a compaction in the background if the session needs one and none is running"""
+        if not self.enabled or session_id in self._tasks or not self.needs_compaction(session):
+            return None
+        task = asyncio.create_task(self._run(session_id, session, on_done))
+        self._tasks[session_id] = task
+        return task
+
+    async def _run(self, session_id: str, session: Dict[str, Any], on_done):
+        try:
+            if await self.compact(session) and on_done:
+                on_done(session_id)
+        finally:
+            self._tasks.pop(session_id, None)
+
+    async def compact(self, session: Dict[str, Any]) -> bool:
+        """Summarize and drop the session's older turns; False if nothing changed"""
+        history = session["history"]
+        responses = session["multi_agent_workflow"].agent_responses
+        shared_memory = session["shared_memory"]
+        old_requests = history[:max(0, len(history) - self.keep_recent)]
+        old_responses = responses[:max(0, len(responses) - self.keep_responses)]
+        if not old_requests and not old_responses:
+            return False
+
+        prompt = self._build_prompt(shared_memory.conversation_summary, old_requests, old_responses)
+        try:
+            response = await llm_manager.generate(
+                messages=[
+                    LLMMessage(role="system", content=SUMMARY_INSTRUCTIONS),
+                    LLMMessage(role="user", content=prompt)
+                ],
+                model=self.model,
+                temperature=0.2,
+                max_tokens=self.summary_tokens,
+                use_cache=False
+            )
+        except Exception as e:
+            self.failures += 1
+            print(f"[SUMMARY] Compaction of session {shared_memory.session_id} failed: {e}")
+            return False
+
+        summary = response.content.strip()
+        if not summary:
+            self.failures += 1
+            return False
+
+        # New turns may have arrived during the call; they sit after the folded ones
+        shared_memory.conversation_summary = summary
+        shared_memory.summarized_turns += len(old_requests)
+        shared_memory.summarized_responses += len(old_responses)
+        del history[:len(old_requests)]
+        del responses[:len(old_responses)]
+        self.compactions += 1
+        print(
+            f"[SUMMARY] Session {shared_memory.session_id}: folded {len(old_requests)} requests and "
+            f"{len(old_responses)} agent responses into a {len(summary)} character summary"
+        )
+        return True
+
+    def _build_prompt(self, summary: str, requests, responses) -> str:
+        instructions = (
+            "Rewrite the summary so it also covers the earlier requests and feedback above: the product "
+            "being designed, decisions made, features requested, stated preferences and open questions. "
+            f"Use at most {self.summary_tokens * 3 // 4} words. Reply with the summary only."
+        )
+        assembler = ContextAssembler.for_model(self.model, SUMMARY_INSTRUCTIONS, instructions, max_tokens=self.summary_tokens)
+        assembler.add("summary", "EXISTING SUMMARY:", summary, priority=1)
+        assembler.add("requests", "EARLIER USER REQUESTS:", "\n".join(f"- {text}" for text in requests), priority=2, keep="tail")
+        assembler.add(
+            "responses", "EARLIER AGENT FEEDBACK:",
+            "\n".join(f"- {response.agent_type.value}: {response.content}" for response in responses),
+            priority=3, keep="tail"
+        )
+        return f"{assembler.assemble().text}\n{instructions}"
+
+    def in_progress(self, session_id: str) -> bool:
+        return session_id in self._tasks
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "model": self.model,
+            "running": len(self._tasks),
+            "compactions": self.compactions,
+            "failures": self.failures
+        }
+
+
+def create_conversation_compactor_from_env() -> ConversationCompactor:
+    """Build the compactor from CONTEXT_SUMMARY_* settings"""
+    return ConversationCompactor(
+        model=os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini"),
+        max_history=int(os.getenv("CONTEXT_SUMMARY_MAX_HISTORY", "12")),
+        keep_recent=int(os.getenv("CONTEXT_SUMMARY_KEEP_RECENT", "5")),
+        enabled=os.getenv("CONTEXT_SUMMARY_ENABLED", "true").lower() == "true"
+    )
+
+
+# Global instance
+conversation_compactor = create_conversation_compactor_from_env()
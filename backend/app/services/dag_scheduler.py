@@ -0,0 +1,205 @@
+"""
+Ready-queue execution of a dependency graph of async tasks
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+COMPLETED = "completed"
+FAILED = "failed"
+TIMED_OUT = "timeout"
+SKIPPED = "skipped"
+
+# What happens to the dependents of a node that failed or timed out
+SKIP_DEPENDENTS = "skip_dependents"
+CONTINUE = "continue"
+FAILURE_POLICIES = {SKIP_DEPENDENTS, CONTINUE}
+
+
+@dataclass
+class NodeRun:
+    node_id: str
+    status: str = "pending"
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    # The dependency whose completion let this node start
+    gated_by: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+@dataclass
+class DagReport:
+    nodes: Dict[str, NodeRun] = field(default_factory=dict)
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def wall_clock(self) -> float:
+        return self.finished - self.started
+
+    @property
+    def critical_path(self) -> List[str]:
+        """The chain of nodes that determined the total run time, first to last"""
+        ran = [run for run in self.nodes.values() if run.finished is not None]
+        if not ran:
+            return []
+        node = max(ran, key=lambda run: run.finished)
+        path = [node.node_id]
+        while node.gated_by:
+            node = self.nodes[node.gated_by]
+            path.append(node.node_id)
+        return path[::-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        critical_path = self.critical_path
+        return {
+            "wall_clock": round(self.wall_clock, 3),
+            "critical_path": critical_path,
+            "critical_path_time": round(sum(self.nodes[node].duration for node in critical_path), 3),
+            "nodes": {
+                node_id: {
+                    "status": run.status,
+                    "start_offset": round(run.started - self.started, 3) if run.started is not None else None,
+                    "duration": round(run.duration, 3),
+                    "error": run.error
+                }
+                for node_id, run in self.nodes.items()
+            }
+        }
+
+
+def execution_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """Topological order of the graph; raises ValueError on a cycle.
+
+    Dependencies on nodes outside the graph are ignored.
+    """
+    in_degree = {node: 0 for node in dependencies}
+    dependents: Dict[str, List[str]] = {node: [] for node in dependencies}
+    for node, deps in dependencies.items():
+        for dep in set(deps):
+            if dep in dependencies:
+                in_degree[node] += 1
+                dependents[dep].append(node)
+
+    order = [node for node, degree in in_degree.items() if degree == 0]
+    for node in order:
+        for dependent in dependents[node]:
+            in_degree[dependent] -= 1
+            if in_degree[dependent] == 0:
+                order.append(dependent)
+    if len(order) != len(dependencies):
+        raise ValueError("A circular dependency was detected among the selected agents.")
+    return order
+
+
+async def run_dag(
+    dependencies: Dict[str, List[str]],
+    run_node: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+    timeout: Optional[float] = None,
+    failure_policy: str = SKIP_DEPENDENTS,
+    is_failure: Callable[[Any], Optional[str]] = lambda result: None,
+    on_settled: Optional[Callable[[str, NodeRun, Any], Awaitable[None]]] = None
+) -> Tuple[Dict[str, Any], DagReport]:
+    """Run every node as soon as its own dependencies have finished.
+
+    `run_node(node_id, dependency_results)` receives the results of the
+    node's completed dependencies. A node fails when it raises, exceeds
+    `timeout` seconds, or when `is_failure(result)` returns an error message.
+    Under SKIP_DEPENDENTS everything downstream of a failed node is skipped;
+    under CONTINUE its dependents run without its result. Returns what each
+    node returned (failed ones included, if they returned at all) and a
+    report with per-node timings and the critical path.
+
+    `on_settled(node_id, run, result)` is awaited for every node as soon as
+    it completes, fails or is skipped, after its ready dependents started.
+    """
+    if failure_policy not in FAILURE_POLICIES:
+        raise ValueError(f"Unknown failure policy '{failure_policy}'. Available: {sorted(FAILURE_POLICIES)}")
+    execution_order(dependencies)
+
+    deps: Dict[str, Set[str]] = {
+        node: {dep for dep in node_deps if dep in dependencies} for node, node_deps in dependencies.items()
+    }
+    waiting = {node: set(node_deps) for node, node_deps in deps.items()}
+    report = DagReport(nodes={node: NodeRun(node) for node in dependencies}, started=time.perf_counter())
+    results: Dict[str, Any] = {}
+    running: Dict[asyncio.Task, str] = {}
+
+    async def execute(node: str):
+        dependency_results = {
+            dep: results[dep] for dep in dependencies[node]
+            if dep in results and report.nodes[dep].status == COMPLETED
+        }
+        if timeout:
+            return await asyncio.wait_for(run_node(node, dependency_results), timeout)
+        return await run_node(node, dependency_results)
+
+    def start_ready():
+        for node in list(waiting):
+            if not waiting[node]:
+                del waiting[node]
+                report.nodes[node].started = time.perf_counter()
+                running[asyncio.create_task(execute(node))] = node
+
+    def skip_downstream(node: str, settled: List[str]):
+        for dependent in [n for n in waiting if node in deps[n]]:
+            if dependent not in waiting:  # already skipped through another path
+                continue
+            del waiting[dependent]
+            report.nodes[dependent].status = SKIPPED
+            report.nodes[dependent].error = f"Dependency {node} did not complete"
+            settled.append(dependent)
+            skip_downstream(dependent, settled)
+
+    try:
+        start_ready()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            settled: List[str] = []
+            for task in done:
+                node = running.pop(task)
+                settled.append(node)
+                run = report.nodes[node]
+                run.finished = time.perf_counter()
+                status = FAILED
+                try:
+                    results[node] = task.result()
+                    error = is_failure(results[node])
+                except asyncio.TimeoutError:
+                    status, error = TIMED_OUT, f"Timed out after {timeout}s"
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+
+                if error is None:
+                    run.status = COMPLETED
+                else:
+                    run.status, run.error = status, error
+                    if failure_policy == SKIP_DEPENDENTS:
+                        skip_downstream(node, settled)
+
+                for dependent, dependent_waiting in waiting.items():
+                    if node in dependent_waiting:
+                        dependent_waiting.discard(node)
+                        if not dependent_waiting:
+                            report.nodes[dependent].gated_by = node
+            start_ready()
+            if on_settled:
+                for node in settled:
+                    await on_settled(node, report.nodes[node], results.get(node))
+    finally:
+        # Cancelled from outside: nothing is left running in the background
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        report.finished = time.perf_counter()
+
+    return results, report
@@ -9,7 +9,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from ..services.template_agent_executor import template_agent_executor
-from ..models.agent_models import AgentExecutionResult
+from ..models.agent_templates import AgentExecutionResult
+from ..websocket.manager import manager
 
 
 class EpicStoriesPipeline:
@@ -67,6 +68,7 @@ class EpicStoriesPipeline:
             print(f"[PIPELINE] {pipeline_id} - Starting Epic generation...")
             pipeline["status"] = "generating_epics"
             pipeline["progress"]["epics"] = "running"
+            await self._notify(pipeline_id)
             
             epics_result = await self._generate_epics(
                 pipeline["user_input"],
@@ -93,6 +95,7 @@ class EpicStoriesPipeline:
             print(f"[PIPELINE] {pipeline_id} - Starting parallel story generation for {len(epics)} epics...")
             pipeline["status"] = "generating_stories" 
             pipeline["progress"]["stories"] = "running"
+            await self._notify(pipeline_id)
             
             story_tasks = []
             for i, epic in enumerate(epics):
@@ -113,6 +116,7 @@ class EpicStoriesPipeline:
             print(f"[PIPELINE] {pipeline_id} - Merging final development plan...")
             pipeline["status"] = "merging"
             pipeline["progress"]["merge"] = "running"
+            await self._notify(pipeline_id)
             
             final_file = await self._merge_development_plan(
                 pipeline_id, epics_result, pipeline["stories_files"]
@@ -122,6 +126,7 @@ class EpicStoriesPipeline:
             pipeline["progress"]["merge"] = "completed"
             pipeline["status"] = "completed"
             pipeline["completed_at"] = datetime.now()
+            await self._notify(pipeline_id)
             
             print(f"[PIPELINE] {pipeline_id} - Development plan ready: {final_file}")
             
@@ -129,6 +134,24 @@ class EpicStoriesPipeline:
             print(f"[PIPELINE] {pipeline_id} - ERROR: {e}")
             self.active_pipelines[pipeline_id]["status"] = "failed"
             self.active_pipelines[pipeline_id]["error"] = str(e)
+            await self._notify(pipeline_id)
+    
+    async def _notify(self, pipeline_id: str):
+        """Push pipeline progress to the session, whichever worker holds its socket"""
+        pipeline = self.active_pipelines[pipeline_id]
+        try:
+            await manager.send_json_message({
+                "type": "pipeline_progress",
+                "data": {
+                    "pipeline_id": pipeline_id,
+                    "status": pipeline["status"],
+                    "progress": pipeline["progress"],
+                    "final_file": pipeline.get("final_file"),
+                    "error": pipeline.get("error")
+                }
+            }, pipeline["session_id"])
+        except Exception as e:
+            print(f"[PIPELINE] {pipeline_id} - Failed to send progress: {e}")
     
     async def _generate_epics(self, user_input: str, context: Dict, llm_settings: Dict) -> Optional[AgentExecutionResult]:
         """Generate epics using the Epic Generator"""
@@ -0,0 +1,120 @@
+"""
+Memoized template agent results, keyed by everything that shapes them
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from ..llm.response_cache import CacheTier, DiskCacheTier, MemoryCacheTier
+from ..models.agent_templates import AgentExecutionResult, AgentTemplate
+
+# Settings that change how a result is delivered, not what it says
+_DELIVERY_SETTINGS = {"stream", "use_cache"}
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _dependency_entry(result: Union[AgentExecutionResult, Dict[str, Any]]) -> List[str]:
+    # Clients send earlier results back as plain dicts
+    if isinstance(result, AgentExecutionResult):
+        result = result.model_dump()
+    return [result.get("template_id", ""), _digest([result.get("content", ""), result.get("suggestions") or []])]
+
+
+class ResultMemo:
+    """Stores AgentExecutionResults so unchanged nodes of a template graph are not run again.
+
+    A key covers the template (id and content), the user input, the current
+    prototype, the session context (summary, history and preferences), the
+    results of the template's dependencies and the LLM settings. Editing one template therefore misses only for that template
+    and, once its new result differs, for the templates that depend on it.
+    Dependency results are compared as a set, whether they came from the
+    graph or from the client.
+    Uses the response cache's storage tiers, so results can survive restarts.
+    """
+
+    def __init__(self, tiers: List[CacheTier], ttl: float = 86400.0):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        template: AgentTemplate,
+        user_input: str,
+        dependency_results: List[Union[AgentExecutionResult, Dict[str, Any]]],
+        llm_settings: Optional[Dict[str, Any]] = None,
+        prototype: Any = None,
+        session_context: Any = None
+    ) -> str:
+        # Built-in templates get a fresh updated_at on every start, so the
+        # template's content identifies its version
+        template_version = _digest([template.type, template.name, template.prompt])
+        payload = {
+            "template": [template.id, template_version],
+            "input": _digest(user_input),
+            "prototype": _digest(prototype or {}),
+            "session": _digest(session_context or []),
+            "dependencies": sorted(_dependency_entry(result) for result in dependency_results),
+            "llm_settings": {
+                key: value for key, value in (llm_settings or {}).items() if key not in _DELIVERY_SETTINGS
+            }
+        }
+        return _digest(payload)
+
+    def __contains__(self, key: str) -> bool:
+        return any(tier.get(key) is not None for tier in self.tiers)
+
+    def get(self, key: str) -> Optional[AgentExecutionResult]:
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is None:
+                continue
+            for upper in self.tiers[:index]:
+                upper.set(key, value, self.ttl)
+            self.hits += 1
+            return AgentExecutionResult(**{**value, "memoized": True})
+        self.misses += 1
+        return None
+
+    def set(self, key: str, result: AgentExecutionResult):
+        """Remember a successful result; failures are always run again"""
+        if result.error:
+            return
+        value = result.model_dump(mode="json")
+        value["memoized"] = False
+        for tier in self.tiers:
+            tier.set(key, value, self.ttl)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": {tier.name: tier.size() for tier in self.tiers}
+        }
+
+
+def create_result_memo_from_env() -> Optional[ResultMemo]:
+    """Build the result memo configured by AGENT_RESULT_MEMO_* environment variables"""
+    if os.getenv("AGENT_RESULT_MEMO_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    tiers: List[CacheTier] = [MemoryCacheTier(int(os.getenv("AGENT_RESULT_MEMO_MAX_ENTRIES", "256")))]
+    if os.getenv("AGENT_RESULT_MEMO_DISK", "false").lower() in ("1", "true", "yes"):
+        default_dir = Path(__file__).parent.parent.parent / "data" / "agent_results"
+        tiers.append(DiskCacheTier(Path(os.getenv("AGENT_RESULT_MEMO_DIR", str(default_dir))), 2000))
+
+    return ResultMemo(tiers, ttl=float(os.getenv("AGENT_RESULT_MEMO_TTL", "86400")))
@@ -0,0 +1,129 @@
+"""
+Pluggable storage for serialized WebSocket session state
+"""
+
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class SessionBackend(ABC):
+    """Stores session snapshots produced by session_state.serialize_session.
+
+    A shared backend is visible to every worker and node, so it holds the
+    authoritative copy: sessions are written through after every message and
+    reloaded on every connect. A local backend only receives sessions the
+    in-process store evicts, and hands each snapshot back once.
+    """
+
+    shared = False
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def save(self, session_id: str, data: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        pass
+
+
+class MemorySessionBackend(SessionBackend):
+    """Serialized snapshots in a bounded in-process LRU"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[str, str]" = OrderedDict()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshots.get(session_id)
+        return json.loads(snapshot) if snapshot is not None else None
+
+    def save(self, session_id: str, data: Dict[str, Any]):
+        # Stored as JSON text: far smaller than the live objects it replaces
+        self._snapshots[session_id] = json.dumps(data, default=str)
+        self._snapshots.move_to_end(session_id)
+        while len(self._snapshots) > self.max_entries:
+            self._snapshots.popitem(last=False)
+
+    def delete(self, session_id: str):
+        self._snapshots.pop(session_id, None)
+
+
+class FileSessionBackend(SessionBackend):
+    """One JSON file per session, named by a hash of the session id"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _path(self, session_id: str) -> Path:
+        # Session ids come from the URL; never use them as file names directly
+        return self.directory / f"{hashlib.sha256(session_id.encode('utf-8')).hexdigest()}.json"
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(session_id)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        return snapshot["state"] if snapshot.get("session_id") == session_id else None
+
+    def save(self, session_id: str, data: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(session_id)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"session_id": session_id, "state": data}, f, default=str)
+        tmp_path.replace(path)
+
+    def delete(self, session_id: str):
+        self._path(session_id).unlink(missing_ok=True)
+
+
+class RedisSessionBackend(SessionBackend):
+    """Snapshots in Redis with a sliding expiry, shared by all workers"""
+
+    shared = True
+
+    def __init__(self, client, ttl: int = 7 * 24 * 3600, prefix: str = "ws_session:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = self.client.get(f"{self.prefix}{session_id}")
+        return json.loads(snapshot) if snapshot else None
+
+    def save(self, session_id: str, data: Dict[str, Any]):
+        self.client.set(f"{self.prefix}{session_id}", json.dumps(data, default=str), ex=self.ttl)
+
+    def delete(self, session_id: str):
+        self.client.delete(f"{self.prefix}{session_id}")
+
+
+def create_session_backend_from_env() -> SessionBackend:
+    """Build the backend selected by SESSION_BACKEND (memory, file or redis)"""
+    kind = os.getenv("SESSION_BACKEND", "memory").lower()
+
+    if kind == "redis":
+        # Reuses the connection settings and client of the shared RedisService
+        from .redis_service import redis_service
+        if redis_service.is_connected():
+            return RedisSessionBackend(
+                redis_service.redis_client,
+                ttl=int(os.getenv("SESSION_BACKEND_TTL", str(7 * 24 * 3600)))
+            )
+        print("[WARNING] SESSION_BACKEND=redis but Redis is unavailable; keeping sessions in memory")
+
+    if kind == "file":
+        default_dir = Path(__file__).parent.parent.parent / "data" / "ws_sessions"
+        return FileSessionBackend(Path(os.getenv("SESSION_PERSIST_DIR", str(default_dir))))
+
+    return MemorySessionBackend(int(os.getenv("SESSION_BACKEND_MAX_ENTRIES", "10000")))
@@ -0,0 +1,221 @@
+"""
+Creation, serialization and persistence of WebSocket session state
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from ..models.agent_models import AgentType, MultiAgentWorkflow, ConversationContext, SharedAgentMemory
+from ..agents.base import DesignAgent, StoriesAndQAAgent
+from ..agents.handoff_coordinator import HandoffCoordinator
+from ..agents.memory import SessionMemory
+from ..prototype.delta import PrototypeVersions
+from .session_backends import SessionBackend
+from .context_builder import SessionContextBuilder
+
+DESIGN_AGENT_TYPES = [
+    AgentType.UI_DESIGNER, AgentType.UX_RESEARCHER, AgentType.DEVELOPER,
+    AgentType.PRODUCT_MANAGER, AgentType.STAKEHOLDER
+]
+STORIES_QA_AGENT_TYPES = [
+    AgentType.EPIC_GENERATOR, AgentType.STORY_GENERATOR,
+    AgentType.QA_PLANNER, AgentType.REVIEW_AGENT
+]
+
+# Agents hold no per-session state, so every session shares one set
+_shared_agents: Dict[str, Dict[AgentType, Any]] = {}
+
+
+def _agents() -> Dict[str, Dict[AgentType, Any]]:
+    if not _shared_agents:
+        _shared_agents["agents"] = {agent_type: DesignAgent(agent_type) for agent_type in DESIGN_AGENT_TYPES}
+        _shared_agents["stories_qa_agents"] = {
+            agent_type: StoriesAndQAAgent(agent_type) for agent_type in STORIES_QA_AGENT_TYPES
+        }
+    return _shared_agents
+
+
+def create_session(session_id: str) -> Dict[str, Any]:
+    """Fresh state for a new WebSocket session"""
+    conversation_context = ConversationContext(session_id=session_id)
+    shared_memory = SharedAgentMemory(
+        session_id=session_id,
+        conversation_context=conversation_context
+    )
+    return _assemble_session(
+        shared_memory=shared_memory,
+        history=[],
+        memory=SessionMemory(),
+        imported_documents=[],
+        current_prototype={},
+        previous_response_id=None,
+        multi_agent_workflow=MultiAgentWorkflow(
+            session_id=session_id,
+            current_agent=AgentType.UI_DESIGNER
+        )
+    )
+
+
+def _assemble_session(shared_memory: SharedAgentMemory, prototype_version: int = 0, **state) -> Dict[str, Any]:
+    agents = _agents()
+    session = {
+        **state,
+        "prototype_versions": PrototypeVersions(state.get("current_prototype"), prototype_version),
+        "shared_memory": shared_memory,
+        "handoff_coordinator": HandoffCoordinator(shared_memory),
+        "agents": agents["agents"],
+        "stories_qa_agents": agents["stories_qa_agents"]
+    }
+    session["context_builder"] = SessionContextBuilder(session)
+    return session
+
+
+def serialize_session(session: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe snapshot of a session; agents and coordinators are rebuilt on restore"""
+    return {
+        "history": session.get("history", []),
+        "memory": session["memory"].to_dict() if session.get("memory") else None,
+        "shared_memory": session["shared_memory"].model_dump(mode="json"),
+        "imported_documents": session.get("imported_documents", []),
+        "current_prototype": session.get("current_prototype", {}),
+        "prototype_version": session["prototype_versions"].version if session.get("prototype_versions") else 0,
+        "current_request": session.get("current_request"),
+        "previous_response_id": session.get("previous_response_id"),
+        "multi_agent_workflow": session["multi_agent_workflow"].model_dump(mode="json")
+    }
+
+
+def restore_session(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild live session state from serialize_session output"""
+    session = _assemble_session(
+        shared_memory=SharedAgentMemory.model_validate(data["shared_memory"]),
+        history=data.get("history", []),
+        memory=SessionMemory.from_dict(data["memory"]) if data.get("memory") else SessionMemory(),
+        imported_documents=data.get("imported_documents", []),
+        current_prototype=data.get("current_prototype", {}),
+        prototype_version=data.get("prototype_version", 0),
+        previous_response_id=data.get("previous_response_id"),
+        multi_agent_workflow=MultiAgentWorkflow.model_validate(data["multi_agent_workflow"])
+    )
+    if data.get("current_request") is not None:
+        session["current_request"] = data["current_request"]
+    return session
+
+
+def session_size(session: Dict[str, Any]) -> int:
+    """Approximate memory held by a session, as the size of its snapshot"""
+    return len(json.dumps(serialize_session(session), default=str))
+
+
+def save_session(backend: SessionBackend, session_id: str, session: Dict[str, Any]):
+    """Write a session snapshot to the backend"""
+    backend.save(session_id, serialize_session(session))
+
+
+def load_session(backend: SessionBackend, session_id: str) -> Optional[Dict[str, Any]]:
+    """Restore a session from the backend, or None if it has no usable snapshot.
+
+    Local backends only hold evicted sessions, so their snapshot is consumed;
+    a shared backend keeps it as the copy other workers will read.
+    """
+    try:
+        data = backend.load(session_id)
+        if data is None:
+            return None
+        session = restore_session(data)
+    except Exception as e:
+        print(f"[SESSIONS] Failed to restore session {session_id}: {e}")
+        return None
+    if not backend.shared:
+        backend.delete(session_id)
+    return session
+
+
+class SessionWriter:
+    """Saves sessions to the backend without blocking the event loop.
+
+    Snapshots are taken on the loop, so they are consistent, but encoding and
+    writing them (file or Redis I/O) run in a worker thread. Writes of one
+    session complete in the order they were requested, and `load` waits for
+    them, so a reconnect never reads an older snapshot.
+
+    Write-through to a shared backend is debounced: every request for a
+    session within `delay` seconds is served by one snapshot.
+    """
+
+    def __init__(self, backend: SessionBackend, delay: float = 0.5):
+        self.backend = backend
+        self.delay = delay
+        # session id -> (debounce timer, session it will write)
+        self._timers: Dict[str, Tuple[asyncio.Task, Dict[str, Any]]] = {}
+        self._writes: Dict[str, asyncio.Task] = {}
+        self.writes = 0
+        self.coalesced = 0
+
+    def schedule(self, session_id: str, session: Dict[str, Any]):
+        """Write the session through to a shared backend once the delay has passed"""
+        if not self.backend.shared:
+            return
+        if session_id in self._timers:
+            self.coalesced += 1
+            return
+        self._timers[session_id] = (asyncio.create_task(self._write_later(session_id, session)), session)
+
+    async def _write_later(self, session_id: str, session: Dict[str, Any]):
+        await asyncio.sleep(self.delay)
+        self._timers.pop(session_id, None)
+        self.save(session_id, session)
+
+    def save(self, session_id: str, session: Dict[str, Any]):
+        """Snapshot the session now and write it in the background (inline without a running loop)"""
+        snapshot = serialize_session(session)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._save(session_id, snapshot)
+            return
+        previous = self._writes.get(session_id)
+        task = asyncio.create_task(self._save_after(session_id, snapshot, previous))
+        self._writes[session_id] = task
+        task.add_done_callback(lambda done: self._writes.pop(session_id, None) if self._writes.get(session_id) is done else None)
+
+    async def _save_after(self, session_id: str, snapshot: Dict[str, Any], previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.wait({previous})
+        await asyncio.to_thread(self._save, session_id, snapshot)
+
+    def _save(self, session_id: str, snapshot: Dict[str, Any]):
+        try:
+            self.backend.save(session_id, snapshot)
+            self.writes += 1
+        except Exception as e:
+            print(f"[SESSIONS] Failed to save session {session_id}: {e}")
+
+    async def flush(self, session_id: str, session: Optional[Dict[str, Any]] = None):
+        """Write a debounced snapshot (or `session`, to a shared backend) now and wait for the writes"""
+        timer = self._timers.pop(session_id, None)
+        if timer:
+            timer[0].cancel()
+            session = session or timer[1]
+        if session is not None and self.backend.shared:
+            self.save(session_id, session)
+        await self._settled(session_id)
+
+    async def _settled(self, session_id: str):
+        pending = self._writes.get(session_id)
+        if pending is not None:
+            await asyncio.wait({pending})
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """load_session in a worker thread, after the session's pending writes"""
+        await self.flush(session_id)
+        return await asyncio.to_thread(load_session, self.backend, session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._timers),
+            "writing": len(self._writes),
+            "writes": self.writes,
+            "coalesced": self.coalesced
+        }
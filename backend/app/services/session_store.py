@@ -0,0 +1,206 @@
+"""
+Bounded in-memory store for live WebSocket session state
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+EvictionCallback = Callable[[str, Dict[str, Any], str], None]
+
+
+def _json_size(session: Dict[str, Any]) -> int:
+    return len(json.dumps(session, default=str))
+
+
+class SessionStore(MutableMapping):
+    """Dict-like session registry with idle-TTL and LRU eviction.
+
+    Reading a session marks it as recently used. Sessions with an open
+    WebSocket are pinned and never evicted; everything else is dropped once
+    it has been idle for idle_ttl seconds, or least-recently-used first when
+    there are more than max_sessions or the measured total exceeds
+    max_total_bytes. Sizes are cached: a session is measured again only
+    after it is stored anew or marked changed(). on_evict(session_id,
+    session, reason) runs before a session is dropped so its state can be
+    persisted.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_ttl: float = 3600.0,
+        max_total_bytes: Optional[int] = None,
+        on_evict: Optional[EvictionCallback] = None,
+        sizer: Callable[[Dict[str, Any]], int] = _json_size
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_total_bytes = max_total_bytes
+        self.on_evict = on_evict
+        self.sizer = sizer
+
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._pins: Dict[str, int] = {}
+        self._sizes: Dict[str, int] = {}
+        # Sessions whose cached size is missing or out of date
+        self._changed: Set[str] = set()
+        self.evictions: Dict[str, int] = {"idle": 0, "capacity": 0, "memory": 0}
+
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        session = self._sessions[session_id]
+        self.touch(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session: Dict[str, Any]):
+        self._sessions[session_id] = session
+        self._changed.add(session_id)
+        self.touch(session_id)
+        self._enforce_capacity()
+
+    def __delitem__(self, session_id: str):
+        del self._sessions[session_id]
+        self._last_access.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+        self._changed.discard(session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        # Membership checks do not count as use
+        return session_id in self._sessions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def touch(self, session_id: str):
+        if session_id in self._sessions:
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = time.monotonic()
+
+    def changed(self, session_id: str):
+        """Have the session measured again, after it was modified in place"""
+        if session_id in self._sessions:
+            self._changed.add(session_id)
+
+    def pin(self, session_id: str):
+        """Protect a session from eviction while a connection is using it"""
+        self._pins[session_id] = self._pins.get(session_id, 0) + 1
+        self.touch(session_id)
+
+    def unpin(self, session_id: str):
+        remaining = self._pins.get(session_id, 0) - 1
+        if remaining > 0:
+            self._pins[session_id] = remaining
+        else:
+            self._pins.pop(session_id, None)
+        # Idle time counts from the moment the last connection closed
+        self.touch(session_id)
+
+    def is_pinned(self, session_id: str) -> bool:
+        return session_id in self._pins
+
+    def evict(self, session_id: str, reason: str = "manual"):
+        """Persist (via on_evict) and drop a session"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        if self.on_evict:
+            try:
+                self.on_evict(session_id, session, reason)
+            except Exception as e:
+                print(f"[SESSIONS] Failed to persist evicted session {session_id}: {e}")
+        del self[session_id]
+        self.evictions[reason] = self.evictions.get(reason, 0) + 1
+        print(f"[SESSIONS] Evicted session {session_id} ({reason})")
+
+    def _evictable(self):
+        """Unpinned session ids, least recently used first"""
+        return [session_id for session_id in self._sessions if session_id not in self._pins]
+
+    def _enforce_capacity(self):
+        excess = len(self._sessions) - self.max_sessions
+        for session_id in self._evictable()[:max(0, excess)]:
+            self.evict(session_id, "capacity")
+
+    def measure(self) -> int:
+        """Re-estimate the size in bytes of every changed session and return the total"""
+        changed, self._changed = self._changed, set()
+        for session_id in changed:
+            try:
+                self._sizes[session_id] = self.sizer(self._sessions[session_id])
+            except Exception as e:
+                print(f"[SESSIONS] Failed to measure session {session_id}: {e}")
+        return sum(self._sizes.values())
+
+    def sweep(self) -> int:
+        """Evict idle sessions, then enforce the memory budget; returns evictions"""
+        evicted = 0
+        cutoff = time.monotonic() - self.idle_ttl
+        for session_id in self._evictable():
+            if self._last_access.get(session_id, 0) < cutoff:
+                self.evict(session_id, "idle")
+                evicted += 1
+
+        if self.max_total_bytes:
+            total = self.measure()
+            for session_id in self._evictable():
+                if total <= self.max_total_bytes:
+                    break
+                total -= self._sizes.get(session_id, 0)
+                self.evict(session_id, "memory")
+                evicted += 1
+        return evicted
+
+    async def run_sweeper(self, interval: float = 60.0):
+        """Sweep periodically; run as a background task for the app's lifetime"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[SESSIONS] Sweep failed: {e}")
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        total = self.measure()
+        now = time.monotonic()
+        largest = sorted(self._sizes.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "sessions": len(self._sessions),
+            "pinned": len(self._pins),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "total_bytes": total,
+            "max_total_bytes": self.max_total_bytes,
+            "evictions": dict(self.evictions),
+            "largest_sessions": [
+                {
+                    "session_id": session_id,
+                    "bytes": size,
+                    "idle_seconds": round(now - self._last_access.get(session_id, now), 1),
+                    "pinned": session_id in self._pins
+                }
+                for session_id, size in largest
+            ]
+        }
+
+
+def create_session_store_from_env(
+    on_evict: Optional[EvictionCallback] = None,
+    sizer: Callable[[Dict[str, Any]], int] = _json_size
+) -> SessionStore:
+    """Build the session store configured by SESSION_* environment variables"""
+    max_total_bytes = os.getenv("SESSION_MAX_TOTAL_BYTES")
+    return SessionStore(
+        max_sessions=int(os.getenv("SESSION_MAX_COUNT", "1000")),
+        idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "3600")),
+        max_total_bytes=int(max_total_bytes) if max_total_bytes else None,
+        on_evict=on_evict,
+        sizer=sizer
+    )
@@ -0,0 +1,179 @@
+"""
+Speculative background runs of the template a user is likely to request next
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.agent_templates import AgentExecutionResult
+from .agent_template_service import agent_template_service
+from .template_agent_executor import TemplateAgentExecutor, template_agent_executor
+
+
+class SpeculativeRunner:
+    """Pre-computes follow-up templates, such as the synthesizer, after a fan-out.
+
+    Once a fan-out completes without failures, each of `targets` that was not
+    part of it but depends on a template that was is run in the background on
+    the fan-out's results, the way a later request for it alone would run
+    when the client sends those results back. The result goes into the
+    executor's result memo, so that request is answered from the memo, or
+    waits for the run still in progress instead of starting another. Runs
+    are bounded by the executor's node timeout, and requests wait for them
+    for at most its speculative_wait.
+
+    Speculation is skipped while the busiest provider is at `max_load` of its
+    concurrency limit or beyond, and a session's runs are cancelled as soon
+    as it sends new input.
+    """
+
+    def __init__(
+        self,
+        executor: TemplateAgentExecutor,
+        targets: Tuple[str, ...] = ("synthesizer_default",),
+        max_load: float = 0.5,
+        enabled: bool = False
+    ):
+        self.executor = executor
+        self.targets = targets
+        self.max_load = max_load
+        self.enabled = enabled
+        # session id -> (user input, memo key -> run)
+        self._runs: Dict[str, Tuple[str, Dict[str, asyncio.Task]]] = {}
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.skipped_for_load = 0
+
+    def load(self) -> float:
+        """In-flight plus queued calls of the busiest provider, relative to its concurrency limit"""
+        stats = self.executor.llm_manager.get_scheduler_stats().values()
+        return max(
+            ((entry["in_flight"] + entry["queue_depth"]) / max(1, entry["max_in_flight"]) for entry in stats),
+            default=0.0
+        )
+
+    def after_fan_out(
+        self,
+        session_id: str,
+        template_ids: List[str],
+        results: List[AgentExecutionResult],
+        user_input: str,
+        context: Dict[str, Any] = None,
+        llm_settings: Dict[str, Any] = None
+    ) -> List[str]:
+        """Start speculative runs for what is likely requested next; returns their template ids"""
+        memo = self.executor.result_memo
+        if not self.enabled or memo is None or not (llm_settings or {}).get('use_cache', True):
+            return []
+        if not results or any(result.error for result in results):
+            return []
+
+        completed = {result.template_id for result in results}
+        candidates = []
+        for target in self.targets:
+            template = agent_template_service.get_template(target)
+            if template and target not in template_ids and completed & set(template.depends_on or []):
+                candidates.append(template)
+        if not candidates:
+            return []
+
+        load = self.load()
+        if load >= self.max_load:
+            self.skipped_for_load += 1
+            print(f"[SPECULATE] Skipped for session {session_id}: provider load {load:.2f} >= {self.max_load}")
+            return []
+
+        # Runs made for an earlier input of this session are no longer wanted
+        self.cancel(session_id, keep_input=user_input)
+        _, runs = self._runs.setdefault(session_id, (user_input, {}))
+        # The same context a request for the target alone gets, with the results sent back
+        speculative_context = dict(context or {})
+        speculative_context['dependency_results'] = [result.model_dump() for result in results]
+        started = []
+        for template in candidates:
+            memo_key = self.executor.memo_key(template, user_input, speculative_context, llm_settings)
+            if memo_key in memo or memo_key in self.executor.speculative_runs:
+                continue
+            task = asyncio.create_task(
+                self._run(template.id, memo_key, user_input, speculative_context, llm_settings)
+            )
+            task.add_done_callback(lambda done, key=memo_key: self._forget(session_id, key, done))
+            runs[memo_key] = task
+            self.executor.speculative_runs[memo_key] = task
+            self.started += 1
+            started.append(template.id)
+            print(f"[SPECULATE] Running {template.id} ahead of time for session {session_id}")
+        if not runs:
+            del self._runs[session_id]
+        return started
+
+    async def _run(self, template_id: str, memo_key: str, user_input: str, context, llm_settings):
+        # Bounded like a template of a graph run (TEMPLATE_NODE_TIMEOUT)
+        timeout = self.executor.node_timeout or None
+        try:
+            result = await asyncio.wait_for(
+                self.executor.execute_agent_template(template_id, user_input, context, llm_settings), timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"[SPECULATE] {template_id} timed out after {timeout}s")
+            return
+        except Exception as e:
+            print(f"[SPECULATE] {template_id} failed: {e}")
+            return
+        self.executor.result_memo.set(memo_key, result)
+        self.completed += 1
+
+    def _forget(self, session_id: str, memo_key: str, task: asyncio.Task):
+        if self.executor.speculative_runs.get(memo_key) is task:
+            del self.executor.speculative_runs[memo_key]
+        entry = self._runs.get(session_id)
+        if entry and entry[1].get(memo_key) is task:
+            del entry[1][memo_key]
+            if not entry[1]:
+                del self._runs[session_id]
+
+    def cancel(self, session_id: str, keep_input: Optional[str] = None):
+        """Cancel the session's speculative runs, unless they were made for `keep_input`"""
+        entry = self._runs.get(session_id)
+        if not entry or entry[0] == keep_input:
+            return
+        del self._runs[session_id]
+        self.cancelled += len(entry[1])
+        for memo_key, task in entry[1].items():
+            task.cancel()
+            if self.executor.speculative_runs.get(memo_key) is task:
+                del self.executor.speculative_runs[memo_key]
+        print(f"[SPECULATE] Cancelled {len(entry[1])} speculative runs for session {session_id}")
+
+    def running(self, session_id: str) -> int:
+        entry = self._runs.get(session_id)
+        return len(entry[1]) if entry else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "targets": list(self.targets),
+            "max_load": self.max_load,
+            "running": sum(len(runs) for _, runs in self._runs.values()),
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "skipped_for_load": self.skipped_for_load
+        }
+
+
+def create_speculative_runner_from_env() -> SpeculativeRunner:
+    """Build the runner from SPECULATIVE_* settings; speculation is off unless enabled"""
+    targets = tuple(t.strip() for t in os.getenv("SPECULATIVE_TARGETS", "synthesizer_default").split(",") if t.strip())
+    return SpeculativeRunner(
+        template_agent_executor,
+        targets=targets,
+        max_load=float(os.getenv("SPECULATIVE_MAX_LOAD", "0.5")),
+        enabled=os.getenv("SPECULATIVE_EXECUTION_ENABLED", "false").lower() == "true"
+    )
+
+
+# Global instance
+speculative_runner = create_speculative_runner_from_env()
@@ -1,26 +1,51 @@
 import asyncio
-import json
-from typing import Dict, Any, List
+import functools
+import os
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Tuple
 from datetime import datetime
 from ..models.agent_templates import AgentTemplate, AgentExecutionResult, AgentTemplateType
 from ..services.agent_template_service import agent_template_service
 from ..llm.llm_manager import llm_manager
 from ..llm.base_provider import LLMMessage
+from ..llm.tokens import estimate_tokens
+from ..core.serialization import dumps_pretty
+from .context_assembler import ContextAssembler, ContextSection, session_sections
+from .dag_scheduler import DagReport, NodeRun, SKIP_DEPENDENTS, run_dag
+from .result_memo import ResultMemo, create_result_memo_from_env
+
+DEFAULT_TEMPLATE_MODEL = "gpt-4o-mini"
+STANDARD_MAX_TOKENS = 1500
+# The rerun agent samples this many independent analyses of one prompt
+RERUN_VARIATIONS = 5
+RERUN_TEMPERATURE = 1.0
 
 class TemplateAgentExecutor:
     """Executes agents based on templates"""
     
     def __init__(self):
         self.llm_manager = llm_manager
+        # Limits for execute_multiple_templates; a timeout of 0 disables it
+        self.node_timeout = float(os.getenv("TEMPLATE_NODE_TIMEOUT", "120"))
+        self.failure_policy = os.getenv("TEMPLATE_FAILURE_POLICY", SKIP_DEPENDENTS)
+        self.result_memo: Optional[ResultMemo] = create_result_memo_from_env()
+        # Background runs that will store a result under these memo keys (see SpeculativeRunner),
+        # and how long a request for one of the keys waits for them before running itself
+        self.speculative_runs: Dict[str, asyncio.Task] = {}
+        self.speculative_wait = float(os.getenv("SPECULATIVE_WAIT_TIMEOUT", "30"))
     
     async def execute_agent_template(
         self, 
         template_id: str, 
         user_input: str, 
         context: Dict[str, Any] = None,
-        llm_settings: Dict[str, Any] = None
+        llm_settings: Dict[str, Any] = None,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> AgentExecutionResult:
-        """Execute an agent based on its template"""
+        """Execute an agent based on its template.
+
+        Standard agents forward completion deltas to on_token when given;
+        rerun and questions agents make several calls and do not stream.
+        """
         
         template = agent_template_service.get_template(template_id)
         if not template:
@@ -28,44 +53,64 @@ class TemplateAgentExecutor:
         
         start_time = datetime.now()
         
-        # Build context string
-        context_parts = []
-        if context:
-            if context.get('conversation_history'):
-                context_parts.append("CONVERSATION HISTORY:")
-                for hist in context['conversation_history'][-5:]:
-                    context_parts.append(f"- {hist}")
-                context_parts.append("")
-            
+        # Pack the context into what the model has left after the prompt and request
+        model = (llm_settings or {}).get('model', DEFAULT_TEMPLATE_MODEL)
+        prompt_text = self._build_prompt(template, "", user_input)
+        assembler = ContextAssembler.for_model(
+            model, template.prompt, prompt_text,
+            max_tokens=STANDARD_MAX_TOKENS,
+            cap=self._max_input_tokens(template.id, llm_settings)
+        )
+        if context and context.get('context_builder'):
+            # Cached session rendering shared by every agent in a fan-out
+            assembler.extend(self._session_sections(context['context_builder']))
+        elif context:
+            history = context.get('conversation_history') or []
+            assembler.add("history", "CONVERSATION HISTORY:", "\n".join(f"- {hist}" for hist in history[-5:]), priority=3, keep="tail")
             if context.get('current_prototype'):
-                context_parts.append("CURRENT PROTOTYPE STATE:")
-                context_parts.append(json.dumps(context['current_prototype'], indent=2))
-                context_parts.append("")
-            
+                assembler.add("prototype", "CURRENT PROTOTYPE STATE:", dumps_pretty(context['current_prototype']), priority=1)
             if context.get('session_preferences'):
-                context_parts.append("USER PREFERENCES:")
-                context_parts.append(context['session_preferences'])
-                context_parts.append("")
-            
-            if context.get('dependency_results'):
-                dependency_count = len(context['dependency_results'])
-                print(f"[CONTEXT] Including {dependency_count} previous agent results for context")
-                context_parts.append("PREVIOUS AGENT ANALYSES:")
-                for i, result in enumerate(context['dependency_results']):
-                    agent_name = result.get('agent_name', 'Unknown Agent')
-                    print(f"[CONTEXT] Adding result #{i+1}: {agent_name}")
-                    context_parts.append(f"\n=== {agent_name} ===")
-                    context_parts.append(result.get('content', ''))
-                    if result.get('suggestions'):
-                        context_parts.append("\nKey Suggestions:")
-                        for suggestion in result['suggestions'][:3]:  # Limit to top 3
-                            context_parts.append(f"- {suggestion}")
-                context_parts.append("")
+                assembler.add("preferences", "USER PREFERENCES:", str(context['session_preferences']), priority=2)
         
-        context_str = "\n".join(context_parts)
+        if context and context.get('dependency_results'):
+            dependency_count = len(context['dependency_results'])
+            print(f"[CONTEXT] Including {dependency_count} previous agent results for context")
+            dependency_parts = []
+            for i, result in enumerate(context['dependency_results']):
+                agent_name = result.get('agent_name', 'Unknown Agent')
+                print(f"[CONTEXT] Adding result #{i+1}: {agent_name}")
+                dependency_parts.append(f"\n=== {agent_name} ===")
+                dependency_parts.append(result.get('content', ''))
+                if result.get('suggestions'):
+                    dependency_parts.append("\nKey Suggestions:")
+                    for suggestion in result['suggestions'][:3]:  # Limit to top 3
+                        dependency_parts.append(f"- {suggestion}")
+            assembler.add("dependency_results", "PREVIOUS AGENT ANALYSES:", "\n".join(dependency_parts), priority=1)
+        
+        assembled = assembler.assemble()
+        context_str = assembled.text
+        input_tokens = estimate_tokens(template.prompt) + estimate_tokens(prompt_text) + assembled.tokens
+        print(f"[CONTEXT] {template.name} on {model}: ~{input_tokens} input tokens, {assembled.summary()}")
         
         # Prepare the full prompt
-        full_prompt = f"""{template.prompt}
+        full_prompt = self._build_prompt(template, context_str, user_input)
+        
+        # Handle special agent types with custom logic
+        if template.type == AgentTemplateType.RERUN:
+            result = await self._execute_rerun_agent(template, user_input, context_str, llm_settings)
+        elif template.type == AgentTemplateType.QUESTIONS:
+            result = await self._execute_questions_agent(template, user_input, context_str)
+        else:
+            result = await self._execute_standard_agent(template, full_prompt, start_time, llm_settings, on_token)
+        result.input_tokens_estimate = input_tokens
+        return result
+    
+    @staticmethod
+    def _session_sections(builder) -> List[ContextSection]:
+        return session_sections(builder, history_line="- {text}", preferences_title="USER PREFERENCES:")
+    
+    def _build_prompt(self, template: AgentTemplate, context_str: str, user_input: str) -> str:
+        return f"""{template.prompt}
 
 CONTEXT:
 {context_str}
@@ -74,30 +119,34 @@ USER REQUEST:
 {user_input}
 
 Please provide your analysis and recommendations based on your role as {template.name}."""
-        
-        # Handle special agent types with custom logic
-        if template.type == AgentTemplateType.RERUN:
-            return await self._execute_rerun_agent(template, user_input, context_str)
-        elif template.type == AgentTemplateType.QUESTIONS:
-            return await self._execute_questions_agent(template, user_input, context_str)
-        else:
-            return await self._execute_standard_agent(template, full_prompt, start_time, llm_settings)
+    
+    def _max_input_tokens(self, template_id: str, llm_settings: Dict[str, Any] = None) -> Optional[int]:
+        """Input token cap from llm_settings: one number for every agent, or a dict by template id"""
+        cap = (llm_settings or {}).get('max_input_tokens')
+        if isinstance(cap, dict):
+            cap = cap.get(template_id)
+        return int(cap) if cap else None
     
     async def _execute_standard_agent(
         self, 
         template: AgentTemplate, 
         full_prompt: str, 
         start_time: datetime,
-        llm_settings: Dict[str, Any] = None
+        llm_settings: Dict[str, Any] = None,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> AgentExecutionResult:
         """Execute a standard agent template"""
         
         # Extract LLM settings or use defaults
-        model = "gpt-4o-mini"
+        model = DEFAULT_TEMPLATE_MODEL
         temperature = 0.7
+        use_cache = True
+        routing = None
         if llm_settings:
             model = llm_settings.get('model', model)
             temperature = llm_settings.get('temperature', temperature)
+            use_cache = llm_settings.get('use_cache', use_cache)
+            routing = llm_settings.get('routing')
         
         print(f"[LLM] Using model: {model}, temperature: {temperature}")
         
@@ -113,12 +162,18 @@ Please provide your analysis and recommendations based on your role as {template
             ]
             
             print(f"[LLM] Calling LLM manager generate with provider: {provider}")
-            response = await self.llm_manager.generate(
+            generation_args = dict(
                 messages=messages,
                 model=model,
                 temperature=temperature,
-                max_tokens=1500
+                max_tokens=STANDARD_MAX_TOKENS,
+                use_cache=use_cache,
+                routing_policy=self.llm_manager.routing_policy(routing)
             )
+            if on_token:
+                response = await self.llm_manager.generate_streaming(on_token=on_token, **generation_args)
+            else:
+                response = await self.llm_manager.generate(**generation_args)
             print(f"[LLM] Received response: {len(response.content)} characters")
             
             content = response.content
@@ -156,41 +211,43 @@ Please provide your analysis and recommendations based on your role as {template
                 agent_name=template.name,
                 content=f"Error executing agent: {str(e)}",
                 confidence_level=0.0,
-                execution_time=(datetime.now() - start_time).total_seconds()
+                execution_time=(datetime.now() - start_time).total_seconds(),
+                error=str(e)
             )
     
     async def _execute_rerun_agent(
         self, 
         template: AgentTemplate, 
         user_input: str, 
-        context_str: str
+        context_str: str,
+        llm_settings: Dict[str, Any] = None
     ) -> AgentExecutionResult:
         """Execute the rerun agent that provides 5 different analyses"""
         
         start_time = datetime.now()
-        rerun_results = []
+        settings = llm_settings or {}
         
-        base_prompt = f"""{template.prompt}
+        prompt = f"""{template.prompt}
 
 CONTEXT:
 {context_str}
 
 USER REQUEST:
-{user_input}"""
-        
-        # Run 5 different analyses in parallel
-        tasks = []
-        for i in range(5):
-            variation_prompt = f"""{base_prompt}
+{user_input}
 
-This is variation #{i+1}. Provide a unique perspective focusing on different aspects or approaches than the other variations."""
-            
-            task = self._get_single_response(variation_prompt, temperature=0.8 + (i * 0.1))
-            tasks.append(task)
+Provide one distinct perspective. Several independent analyses of this request are written at once, so commit to the aspects or approach you find most compelling rather than covering everything."""
         
         try:
-            responses = await asyncio.gather(*tasks)
-            rerun_results = [f"Analysis #{i+1}:\n{resp}" for i, resp in enumerate(responses)]
+            # One request sampled RERUN_VARIATIONS times where the provider supports it
+            responses = await self.llm_manager.generate_n(
+                messages=[LLMMessage(role="user", content=prompt)],
+                model=settings.get('model', DEFAULT_TEMPLATE_MODEL),
+                n=RERUN_VARIATIONS,
+                temperature=RERUN_TEMPERATURE,
+                max_tokens=800,
+                routing_policy=self.llm_manager.routing_policy(settings.get('routing'))
+            )
+            rerun_results = [f"Analysis #{i+1}:\n{resp.content}" for i, resp in enumerate(responses)]
             
             # Combine all results
             combined_content = "\n\n" + "="*50 + "\n\n".join(rerun_results)
@@ -212,7 +269,8 @@ This is variation #{i+1}. Provide a unique perspective focusing on different asp
                 agent_name=template.name,
                 content=f"Error executing rerun agent: {str(e)}",
                 confidence_level=0.0,
-                execution_time=(datetime.now() - start_time).total_seconds()
+                execution_time=(datetime.now() - start_time).total_seconds(),
+                error=str(e)
             )
     
     async def _execute_questions_agent(
@@ -267,24 +325,10 @@ Generate exactly 10 strategic questions that would help better understand and im
                 agent_name=template.name,
                 content=f"Error executing questions agent: {str(e)}",
                 confidence_level=0.0,
-                execution_time=(datetime.now() - start_time).total_seconds()
+                execution_time=(datetime.now() - start_time).total_seconds(),
+                error=str(e)
             )
     
-    async def _get_single_response(self, prompt: str, temperature: float = 0.7) -> str:
-        """Get a single response from the AI"""
-        try:
-            messages = [LLMMessage(role="user", content=prompt)]
-            
-            response = await self.llm_manager.generate(
-                messages=messages,
-                model="gpt-4o-mini",
-                temperature=temperature,
-                max_tokens=800
-            )
-            return response.content
-        except Exception as e:
-            return f"Error getting response: {str(e)}"
-    
     def _extract_suggestions(self, content: str) -> List[str]:
         """Extract suggestions from agent response"""
         suggestions = []
@@ -361,82 +405,176 @@ Generate exactly 10 strategic questions that would help better understand and im
         template_ids: List[str], 
         user_input: str, 
         context: Dict[str, Any] = None,
-        llm_settings: Dict[str, Any] = None
+        llm_settings: Dict[str, Any] = None,
+        on_token: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        timeout: Optional[float] = None,
+        failure_policy: Optional[str] = None,
+        on_result: Optional[Callable[[AgentExecutionResult], Awaitable[None]]] = None
     ) -> List[AgentExecutionResult]:
         """
-        Executes multiple agent templates in an order determined by their dependencies.
+        Executes multiple agent templates, each as soon as its own dependencies are done.
+        If on_token is given it receives (template_id, delta) as each agent streams;
+        on_result receives each result as soon as its template is done.
+        """
+        results, _ = await self.execute_template_graph(
+            template_ids, user_input, context, llm_settings, on_token, timeout, failure_policy, on_result
+        )
+        return results
+    
+    async def iter_multiple_templates(
+        self,
+        template_ids: List[str],
+        user_input: str,
+        context: Dict[str, Any] = None,
+        llm_settings: Dict[str, Any] = None,
+        on_token: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        timeout: Optional[float] = None,
+        failure_policy: Optional[str] = None
+    ) -> AsyncIterator[AgentExecutionResult]:
+        """Yield each template's result in completion order.
+
+        Leaving the loop early cancels the templates still running.
+        """
+        finished: asyncio.Queue = asyncio.Queue()
+        graph = asyncio.create_task(self.execute_template_graph(
+            template_ids, user_input, context, llm_settings, on_token, timeout, failure_policy,
+            on_result=finished.put
+        ))
+        graph.add_done_callback(lambda _: finished.put_nowait(None))
+        try:
+            while True:
+                result = await finished.get()
+                if result is None:
+                    break
+                yield result
+            # Surface errors such as an unknown template or a dependency cycle
+            await graph
+        finally:
+            if not graph.done():
+                graph.cancel()
+                await asyncio.gather(graph, return_exceptions=True)
+    
+    def memo_key(
+        self,
+        template: AgentTemplate,
+        user_input: str,
+        context: Dict[str, Any] = None,
+        llm_settings: Dict[str, Any] = None,
+        dependency_results: List[AgentExecutionResult] = None
+    ) -> str:
+        """The result memo key of a template run; without graph dependencies, the client's dependency_results count"""
+        context = context or {}
+        # The session context the agent's prompt is built from
+        if context.get('context_builder'):
+            session = [section.body for section in self._session_sections(context['context_builder'])]
+        else:
+            session = [(context.get('conversation_history') or [])[-5:], context.get('session_preferences')]
+        return ResultMemo.make_key(
+            template, user_input, dependency_results or context.get('dependency_results') or [],
+            llm_settings, context.get('current_prototype'), session
+        )
+    
+    async def _recall(self, template_id: str, memo_key: str) -> Optional[AgentExecutionResult]:
+        """A memoized result, waiting up to speculative_wait for a speculative run of the same key"""
+        pending = self.speculative_runs.get(memo_key)
+        if pending and not pending.done():
+            print(f"[SPECULATE] Waiting for the speculative run of {template_id}")
+            # wait() neither cancels the run with this request nor raises if the run was cancelled
+            done, _ = await asyncio.wait({pending}, timeout=self.speculative_wait or None)
+            if not done:
+                print(f"[SPECULATE] Stopped waiting for {template_id} after {self.speculative_wait}s, running it now")
+                return None
+        return self.result_memo.get(memo_key)
+    
+    async def execute_template_graph(
+        self,
+        template_ids: List[str],
+        user_input: str,
+        context: Dict[str, Any] = None,
+        llm_settings: Dict[str, Any] = None,
+        on_token: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        timeout: Optional[float] = None,
+        failure_policy: Optional[str] = None,
+        on_result: Optional[Callable[[AgentExecutionResult], Awaitable[None]]] = None
+    ) -> Tuple[List[AgentExecutionResult], DagReport]:
+        """Run templates along their `depends_on` graph; returns results in request order and a DagReport.
+
+        A template starts the moment the templates it depends on have
+        finished, rather than when their whole stage has. Each template may run
+        for `timeout` seconds (TEMPLATE_NODE_TIMEOUT by default). When one
+        fails, `failure_policy` (TEMPLATE_FAILURE_POLICY) either skips the
+        templates that depend on it or lets them run without its analysis;
+        failed and skipped templates are returned with `error` set.
+
+        Results are memoized (see ResultMemo): a template whose inputs and
+        dependency results are unchanged is not run again, unless
+        llm_settings has use_cache set to false.
         """
-        
-        # 1. Fetch all template objects to access their `depends_on` fields.
         templates = {tid: agent_template_service.get_template(tid) for tid in template_ids}
         for tid, template in templates.items():
             if not template:
                 raise ValueError(f"Template not found: {tid}")
-
-        # 2. Build the dependency graph.
-        graph = {tid: set() for tid in template_ids}
-        in_degree = {tid: 0 for tid in template_ids}
-
-        for tid, template in templates.items():
-            # Ensure depends_on exists and is a list before iterating
-            dependencies = getattr(template, 'depends_on', []) or []
-            for dep_id in dependencies:
-                if dep_id in templates: # Only consider dependencies that are part of the current selection
-                    graph[dep_id].add(tid)
-                    in_degree[tid] += 1
-
-        # 3. Perform a topological sort (Kahn's algorithm) to find execution stages.
-        queue = [tid for tid in template_ids if in_degree[tid] == 0]
-        execution_stages = []
         
-        while queue:
-            execution_stages.append(queue)
-            next_queue = []
-            for u in queue:
-                for v in sorted(list(graph[u])): # sorted for deterministic order
-                    in_degree[v] -= 1
-                    if in_degree[v] == 0:
-                        next_queue.append(v)
-            queue = next_queue
-
-        # Check for cycles (if not all templates were included in the sort)
-        if sum(len(stage) for stage in execution_stages) != len(template_ids):
-            raise ValueError("A circular dependency was detected among the selected agents.")
-
-        # 4. Execute the stages sequentially.
-        executed_results: Dict[str, AgentExecutionResult] = {}
+        # Only dependencies that are part of the current selection count
+        dependencies = {
+            tid: [dep for dep in (getattr(template, 'depends_on', []) or []) if dep in templates]
+            for tid, template in templates.items()
+        }
         
-        for stage in execution_stages:
-            tasks = []
-            for template_id in stage:
-                template = templates[template_id]
-                
-                # Create a new context for this execution
-                execution_context = context.copy() if context else {}
-                
-                # Gather results from dependencies and add them to the context
-                dependency_outputs = []
-                # Ensure depends_on exists and is a list before iterating
-                dependencies = getattr(template, 'depends_on', []) or []
-                for dep_id in dependencies:
-                    if dep_id in executed_results:
-                        dependency_outputs.append(executed_results[dep_id].dict())
-                
-                if dependency_outputs:
-                    execution_context['dependency_results'] = dependency_outputs
-
-                task = self.execute_agent_template(template_id, user_input, execution_context, llm_settings)
-                tasks.append(task)
-            
-            # Run the current stage in parallel
-            stage_results: List[AgentExecutionResult] = await asyncio.gather(*tasks)
+        async def run_template(template_id: str, dependency_results: Dict[str, AgentExecutionResult]):
+            memo_key = None
+            if self.result_memo:
+                memo_key = self.memo_key(
+                    templates[template_id], user_input, context, llm_settings, list(dependency_results.values())
+                )
+                if (llm_settings or {}).get('use_cache', True):
+                    memoized = await self._recall(template_id, memo_key)
+                    if memoized:
+                        print(f"[MEMO] Reusing the previous result of {template_id}")
+                        return memoized
             
-            # Store results
-            for result in stage_results:
-                executed_results[result.template_id] = result
-
-        # 5. Return the results in the original requested order.
-        return [executed_results[tid] for tid in template_ids if tid in executed_results]
+            execution_context = context.copy() if context else {}
+            if dependency_results:
+                execution_context['dependency_results'] = [result.model_dump() for result in dependency_results.values()]
+            agent_on_token = functools.partial(on_token, template_id) if on_token else None
+            result = await self.execute_agent_template(
+                template_id, user_input, execution_context, llm_settings, agent_on_token
+            )
+            if memo_key:
+                self.result_memo.set(memo_key, result)
+            return result
+        
+        final: Dict[str, AgentExecutionResult] = {}
+        
+        async def settled(template_id: str, run: NodeRun, result: Optional[AgentExecutionResult]):
+            if result is None:
+                # Timed out, raised or skipped: report it in place of an analysis
+                result = AgentExecutionResult(
+                    template_id=template_id,
+                    agent_name=templates[template_id].name,
+                    content=f"Agent {run.status}: {run.error}",
+                    execution_time=run.duration,
+                    error=run.error
+                )
+            final[template_id] = result
+            if on_result:
+                await on_result(result)
+        
+        _, report = await run_dag(
+            dependencies,
+            run_template,
+            timeout=timeout if timeout is not None else self.node_timeout,
+            failure_policy=failure_policy or self.failure_policy,
+            is_failure=lambda result: result.error,
+            on_settled=settled
+        )
+        
+        summary = report.to_dict()
+        print(
+            f"[DAG] {len(template_ids)} templates in {summary['wall_clock']}s; "
+            f"critical path {' -> '.join(summary['critical_path'])} ({summary['critical_path_time']}s)"
+        )
+        return [final[tid] for tid in template_ids], report
 
 # Global instance
 template_agent_executor = TemplateAgentExecutor()
\ No newline at end of file
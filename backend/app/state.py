@@ -1,5 +1,20 @@
 # This file holds the shared state of the application.
-# In a production environment, this in-memory dictionary should be replaced with
-# a more robust, persistent state manager like Redis.
+# Live WebSocket sessions are kept in a bounded in-process store. Their
+# serialized state lives in session_backend (memory, file or Redis; see
+# SESSION_BACKEND): with Redis every worker and node sees the same sessions,
+# otherwise the backend only receives sessions the store evicts. Snapshots are
+# written by session_writer, off the event loop.
 
-sessions = {}
+import os
+
+from .services.session_backends import create_session_backend_from_env
+from .services.session_store import create_session_store_from_env
+from .services.session_state import SessionWriter, session_size
+
+session_backend = create_session_backend_from_env()
+session_writer = SessionWriter(session_backend, delay=float(os.getenv("SESSION_WRITE_DELAY", "0.5")))
+
+sessions = create_session_store_from_env(
+    on_evict=lambda session_id, session, reason: session_writer.save(session_id, session),
+    sizer=session_size
+)
@@ -0,0 +1,83 @@
+import os
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Union
+
+from ..core.serialization import dumps_bytes, to_jsonable
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class FrameCodec:
+    """Encodes outbound JSON frames; the default sends every frame as JSON text"""
+
+    name = "json"
+
+    def encode(self, data: Any) -> Union[str, bytes]:
+        return dumps_bytes(data).decode("utf-8")
+
+
+class BinaryFrameCodec(FrameCodec, ABC):
+    """Sends frames of at least `threshold` encoded bytes as binary frames.
+
+    Smaller frames stay JSON text, so clients keep handling chat-sized
+    messages as before and only decode binary frames for large results.
+    Each codec measures a frame in the form it sends it in, so a large
+    frame is only encoded once.
+    """
+
+    def __init__(self, threshold: int = 16384):
+        self.threshold = threshold
+
+    @abstractmethod
+    def encode(self, data: Any) -> Union[str, bytes]:
+        """JSON text below the threshold, the codec's binary form from it"""
+        pass
+
+
+class ZlibFrameCodec(BinaryFrameCodec):
+    """Large frames as zlib-compressed JSON (inflate, then JSON.parse)"""
+
+    name = "zlib"
+
+    def __init__(self, threshold: int = 16384, level: int = 6):
+        super().__init__(threshold)
+        self.level = level
+
+    def encode(self, data: Any) -> Union[str, bytes]:
+        encoded = dumps_bytes(data)
+        if len(encoded) < self.threshold:
+            return encoded.decode("utf-8")
+        return zlib.compress(encoded, self.level)
+
+
+class MsgpackFrameCodec(BinaryFrameCodec):
+    """Large frames as MessagePack; the threshold applies to the packed size"""
+
+    name = "msgpack"
+
+    def encode(self, data: Any) -> Union[str, bytes]:
+        packed = msgpack.packb(data, default=to_jsonable, use_bin_type=True)
+        if len(packed) < self.threshold:
+            return FrameCodec.encode(self, data)
+        return packed
+
+
+def create_frame_codec(encoding: Optional[str], threshold: Optional[int] = None) -> FrameCodec:
+    """Codec for the encoding a client asked for (?encoding=zlib|msgpack), JSON otherwise"""
+    encoding = (encoding or "json").lower()
+    if threshold is None:
+        threshold = int(os.getenv("WS_BINARY_THRESHOLD", "16384"))
+
+    if encoding == "zlib":
+        return ZlibFrameCodec(threshold)
+    if encoding == "msgpack":
+        if msgpack:
+            return MsgpackFrameCodec(threshold)
+        print("[WEBSOCKET] msgpack encoding requested but msgpack is not installed; sending JSON")
+    elif encoding != "json":
+        print(f"[WEBSOCKET] Unknown frame encoding '{encoding}'; sending JSON")
+    return FrameCodec()
@@ -1,84 +1,83 @@
-import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from .manager import manager
 from .handlers import message_handlers
-from ..main import sessions
-from ..models.agent_models import AgentType, MultiAgentWorkflow, ConversationContext, SharedAgentMemory
-from ..agents.base import DesignAgent, StoriesAndQAAgent
-from ..agents.handoff_coordinator import HandoffCoordinator
-from ..agents.memory import SessionMemory
+from .dispatcher import create_session_dispatcher_from_env
+from .codec import create_frame_codec
+from ..state import sessions, session_backend, session_writer
+from ..services.session_state import create_session
+from ..services.conversation_compactor import conversation_compactor
+from ..services.speculative_runner import speculative_runner
+from ..llm.scheduler import current_session_id
+from ..core.serialization import loads
 
 router = APIRouter()
 
+def _write_through(session_id: str):
+    """Save the session to a shared backend so any worker can resume it"""
+    if session_id in sessions:
+        sessions.changed(session_id)
+        session_writer.schedule(session_id, sessions[session_id])
+
+def _after_message(session_id: str):
+    """Persist the session and fold old turns into its summary once it grows long"""
+    _write_through(session_id)
+    # Compaction changes the context speculative runs were keyed on, so it waits
+    # for a message after the one they are for
+    if session_id in sessions and not speculative_runner.running(session_id):
+        conversation_compactor.schedule(session_id, sessions[session_id], on_done=_write_through)
+
 @router.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     print(f"[CONNECT] New WebSocket connection for session: {session_id}")
-    await manager.connect(websocket, session_id)
+    # Clients that can decode binary frames opt in with ?encoding=zlib or ?encoding=msgpack
+    await manager.connect(websocket, session_id, create_frame_codec(websocket.query_params.get("encoding")))
+    # LLM calls made while serving this socket are queued under its session
+    current_session_id.set(session_id)
+    
+    # A shared backend may hold newer state written by another worker, unless
+    # this worker is already serving the session on another socket
+    reload_session = session_id not in sessions or (
+        session_backend.shared and not sessions.is_pinned(session_id)
+    )
     
-    # Initialize session if not exists
-    if session_id not in sessions:
-        print(f"[INIT] Initializing new session: {session_id}")
+    # An open connection keeps its session from being evicted
+    sessions.pin(session_id)
+    
+    # Initialize session if not exists, restoring saved state when there is some
+    if reload_session:
         try:
-            conversation_context = ConversationContext(session_id=session_id)
-            shared_memory = SharedAgentMemory(
-                session_id=session_id,
-                conversation_context=conversation_context
-            )
-            handoff_coordinator = HandoffCoordinator(shared_memory)
-        
-            sessions[session_id] = {
-            "history": [],
-            "memory": SessionMemory(),
-            "shared_memory": shared_memory,
-            "handoff_coordinator": handoff_coordinator,
-            "imported_documents": [],
-            "current_prototype": {},
-            "previous_response_id": None,  # For GPT-5 Responses API stateful conversations
-            "multi_agent_workflow": MultiAgentWorkflow(
-                session_id=session_id,
-                current_agent=AgentType.UI_DESIGNER
-            ),
-            "agents": {
-                agent_type: DesignAgent(agent_type) for agent_type in [
-                    AgentType.UI_DESIGNER, AgentType.UX_RESEARCHER, AgentType.DEVELOPER,
-                    AgentType.PRODUCT_MANAGER, AgentType.STAKEHOLDER
-                ]
-            },
-            "stories_qa_agents": {
-                agent_type: StoriesAndQAAgent(agent_type) for agent_type in [
-                    AgentType.EPIC_GENERATOR, AgentType.STORY_GENERATOR,
-                    AgentType.QA_PLANNER, AgentType.REVIEW_AGENT
-                ]
-            }
-            }
-            print(f"[INIT] New session initialized successfully for {session_id}")
+            restored = await session_writer.load(session_id)
+            if restored:
+                print(f"[INIT] Restored session: {session_id}")
+                sessions[session_id] = restored
+            elif session_id not in sessions:
+                print(f"[INIT] Initializing new session: {session_id}")
+                sessions[session_id] = create_session(session_id)
+                print(f"[INIT] New session initialized successfully for {session_id}")
         except Exception as e:
             print(f"[ERROR] Failed to initialize session {session_id}: {e}")
+            sessions.unpin(session_id)
             raise
 
+    # A new socket has to acknowledge a prototype version before it is sent patches
+    sessions[session_id]["prototype_versions"].reset_client()
+
+    # Slow handlers run as tasks so this loop can still take "cancel" and quick requests
+    dispatcher = create_session_dispatcher_from_env(
+        session_id,
+        message_handlers,
+        lambda data: manager.send_json_message(data, session_id),
+        on_done=_after_message
+    )
+
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = loads(data)
             print(f"[WEBSOCKET] Session {session_id} received: {message.get('type', 'no-type')} - {message.get('text', message.get('data', {}).get('message', 'no-text'))[:50]}...")
-            handler = message_handlers.get(message.get("type"))
-            
-            if handler:
-                await handler(session_id, message)
-            else:
-                # Handle default case - if no specific type, treat as standard prototype generation
-                if "text" in message and not message.get("type"):
-                    # Default to single-agent prototype generation for backward compatibility
-                    await message_handlers["generate_prototype"](session_id, message)
-                else:
-                    print(f"Unknown message type: {message.get('type')}")
-                    await manager.send_json_message({
-                        "type": "error",
-                        "message": f"Unknown message type: {message.get('type')}"
-                    }, session_id)
+            await dispatcher.dispatch(message)
 
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
         print(f"Client #{session_id} disconnected")
     except Exception as e:
         print(f"Error in WebSocket for session {session_id}: {e}")
@@ -86,3 +85,11 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             "type": "error",
             "message": f"An unexpected error occurred: {str(e)}"
         }, session_id)
+    finally:
+        # Abandoned requests stop consuming tokens and provider slots
+        await dispatcher.close()
+        speculative_runner.cancel(session_id)
+        await manager.release(session_id, websocket)
+        if session_id in sessions:
+            await session_writer.flush(session_id, sessions[session_id])
+        sessions.unpin(session_id)
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Handler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# Cheap, LLM-free messages: answered inline so they never wait behind a slow task
+INLINE_MESSAGE_TYPES = {
+    "switch_agent", "get_prompts", "save_prompt", "get_agent_templates", "import_documents",
+    "prototype_ack", "prototype_resync"
+}
+
+# Inline messages that leave the session's saved state alone: no on_done, so no snapshot
+STATELESS_MESSAGE_TYPES = {"get_prompts", "save_prompt", "get_agent_templates", "prototype_ack", "prototype_resync"}
+
+# Messages that read and rewrite the session's prototype or conversation; they
+# run one at a time, in arrival order, so later edits build on earlier ones
+ORDERED_MESSAGE_TYPES = {"generate_prototype", "multi_agent_prototype"}
+
+
+class SessionDispatcher:
+    """Runs one socket's messages as tasks so the receive loop stays responsive.
+
+    Slow handlers run in the background, at most `max_concurrent` at a time,
+    with at most `max_pending` running or waiting; beyond that a message is
+    answered with an error. Each task is tracked by the client's `request_id`
+    (or a generated one) so a `cancel` message can abort it; a request_id that
+    is still in flight is rejected. Cancelling a task cancels the LLM calls it
+    is awaiting, which releases their scheduler slots and HTTP connections.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        handlers: Dict[str, Handler],
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        max_concurrent: int = 2,
+        on_done: Optional[Callable[[str], None]] = None,
+        max_pending: int = 16
+    ):
+        self.session_id = session_id
+        self.handlers = handlers
+        self.send = send
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.on_done = on_done
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._message_types: Dict[str, str] = {}
+        self._last_ordered: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    async def dispatch(self, message: Dict[str, Any]):
+        message_type = message.get("type")
+        if message_type == "cancel":
+            await self._handle_cancel(message)
+            return
+
+        if not message_type and "text" in message:
+            # Backward compatibility: untyped text is a prototype request
+            message_type = "generate_prototype"
+        handler = self.handlers.get(message_type)
+        if handler is None:
+            print(f"Unknown message type: {message.get('type')}")
+            await self.send({
+                "type": "error",
+                "message": f"Unknown message type: {message.get('type')}"
+            })
+            return
+
+        if message_type in INLINE_MESSAGE_TYPES:
+            await handler(self.session_id, message)
+            if message_type not in STATELESS_MESSAGE_TYPES:
+                self._finished()
+            return
+
+        request_id = str(message.get("request_id") or uuid.uuid4())
+        if request_id in self._tasks:
+            await self._reject(request_id, f"Request {request_id} is already in progress")
+            return
+        if len(self._tasks) >= self.max_pending:
+            await self._reject(request_id, f"Too many requests in progress (limit {self.max_pending})")
+            return
+        after = self._last_ordered if message_type in ORDERED_MESSAGE_TYPES else None
+        task = asyncio.create_task(self._run(request_id, handler, message, after))
+        if message_type in ORDERED_MESSAGE_TYPES:
+            self._last_ordered = task
+        self._tasks[request_id] = task
+        self._message_types[request_id] = message_type
+
+    async def _run(self, request_id: str, handler: Handler, message: Dict[str, Any], after: Optional[asyncio.Task]):
+        try:
+            if after is not None and not after.done():
+                # Wait for the previous ordered message without inheriting its outcome
+                await asyncio.wait([after])
+            async with self._slots:
+                await handler(self.session_id, message)
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception as e:
+            print(f"[DISPATCH] {self._message_types.get(request_id)} failed for session {self.session_id}: {e}")
+            await self.send({"type": "error", "message": f"An unexpected error occurred: {str(e)}"})
+        finally:
+            self._tasks.pop(request_id, None)
+            self._message_types.pop(request_id, None)
+            self._finished()
+
+    async def _reject(self, request_id: str, reason: str):
+        self.rejected += 1
+        print(f"[DISPATCH] Session {self.session_id}: {reason}")
+        await self.send({"type": "error", "message": reason, "request_id": request_id})
+
+    def _finished(self):
+        if self.on_done:
+            self.on_done(self.session_id)
+
+    async def _handle_cancel(self, message: Dict[str, Any]):
+        data = message.get("data") or {}
+        request_id = data.get("request_id") or message.get("request_id")
+        if request_id:
+            cancelled = self.cancel(str(request_id))
+        else:
+            cancelled = self.cancel_all()
+        print(f"[DISPATCH] Session {self.session_id} cancelled {len(cancelled)} task(s)")
+        await self.send({"type": "cancelled", "data": {"request_ids": cancelled}})
+
+    def cancel(self, request_id: str) -> List[str]:
+        task = self._tasks.get(request_id)
+        if task is None or task.done():
+            return []
+        task.cancel()
+        return [request_id]
+
+    def cancel_all(self) -> List[str]:
+        cancelled = []
+        for request_id in list(self._tasks):
+            cancelled.extend(self.cancel(request_id))
+        return cancelled
+
+    async def close(self):
+        """Cancel everything still running; nobody is left to receive the results"""
+        tasks = list(self._tasks.values())
+        self.cancel_all()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def in_flight(self) -> Dict[str, str]:
+        return dict(self._message_types)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._tasks),
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected
+        }
+
+
+def create_session_dispatcher_from_env(session_id: str, handlers: Dict[str, Handler], send, on_done=None) -> SessionDispatcher:
+    """Build a dispatcher limited by WS_MAX_CONCURRENT_TASKS and WS_MAX_PENDING_TASKS"""
+    return SessionDispatcher(
+        session_id,
+        handlers,
+        send,
+        max_concurrent=max(1, int(os.getenv("WS_MAX_CONCURRENT_TASKS", "2"))),
+        on_done=on_done,
+        max_pending=max(1, int(os.getenv("WS_MAX_PENDING_TASKS", "16")))
+    )
@@ -1,7 +1,7 @@
-import json
 import asyncio
+import uuid
 import openai
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Awaitable
 
 from .manager import manager
 from ..state import sessions
@@ -14,9 +14,54 @@ from ..models.api_models import DocumentResponse
 from ..prompts.prompt_manager import prompt_manager
 from ..services.template_agent_executor import template_agent_executor
 from ..services.agent_template_service import agent_template_service
+from ..services.speculative_runner import speculative_runner
+from ..services.context_assembler import ContextAssembler, session_sections
 from ..models.agent_templates import AgentExecutionRequest
 from ..llm.llm_manager import llm_manager
 from ..llm.base_provider import LLMMessage, LLMProvider
+from ..prototype.stream_parser import PrototypeStreamParser, PrototypeStreamError, parse_prototype
+
+def token_streamer(session_id: str, source: str) -> Callable[[str], Awaitable[None]]:
+    """Forward LLM token deltas to the client as llm_token frames.
+
+    Frames carry a stream_id unique to this completion and the source that
+    produced it (a template id, or "prototype"); the usual result message
+    still follows once the completion is done.
+    """
+    stream_id = uuid.uuid4().hex
+    
+    async def on_token(delta: str):
+        await manager.send_json_message({
+            "type": "llm_token",
+            "data": {"stream_id": stream_id, "source": source, "delta": delta}
+        }, session_id)
+    
+    return on_token
+
+def record_template_request(session_id: str, user_input: str):
+    """Make user_input the session's current request.
+
+    Running more templates on the input just handled is not a new turn, so
+    it is not added to the history again; the session context, and with it
+    the memo keys of the earlier results, stays the same.
+    """
+    session = sessions[session_id]
+    session["current_request"] = user_input
+    if not session["history"] or session["history"][-1] != user_input:
+        session["history"].append(user_input)
+
+async def send_prototype_update(session_id: str, prototype: Dict[str, Any]):
+    """Store a new prototype version and send it as a patch or, if needed, in full.
+
+    Clients that acknowledge versions (prototype_ack) receive prototype_patch
+    frames against the version they last confirmed; others receive the whole
+    tree as before, now tagged with its version.
+    """
+    session = sessions[session_id]
+    session["current_prototype"] = prototype
+    versions = session["prototype_versions"]
+    versions.commit(prototype)
+    await manager.send_json_message(versions.update_message(), session_id)
 
 async def handle_multi_agent_prototype(session_id: str, message: Dict[str, Any]):
     """Handles the main multi-agent prototyping logic."""
@@ -28,7 +73,8 @@ async def handle_multi_agent_prototype(session_id: str, message: Dict[str, Any])
     # Store the current request in session for agent context
     sessions[session_id]["current_request"] = message['text']
     
-    # Add to history for session memory
+    # Add to history for session memory; speculative runs for the previous input are moot
+    speculative_runner.cancel(session_id)
     sessions[session_id]["history"].append(message['text'])
 
     current_workflow = sessions[session_id]["multi_agent_workflow"]
@@ -45,84 +91,62 @@ async def handle_multi_agent_prototype(session_id: str, message: Dict[str, Any])
         print("Enhanced multi-agent workflow mode")
         agent_responses = await process_enhanced_multi_agent_workflow(
             message["text"],
-            sessions[session_id]
+            sessions[session_id],
+            session_id=session_id
         )
 
+    versions = sessions[session_id]["prototype_versions"]
     response_data = {
         "type": "multi_agent_response",
         "data": {
-            "agent_responses": [response.model_dump() for response in agent_responses],
-            "current_prototype": sessions[session_id].get("current_prototype", None)
+            "agent_responses": agent_responses,
+            # Clients that track versions already hold the tree
+            "current_prototype": None if versions.client_supports_patches else sessions[session_id].get("current_prototype", None),
+            "prototype_version": versions.version
         }
     }
     await manager.send_json_message(response_data, session_id)
 
+def budgeted_session_context(session: Dict[str, Any], model: str, *reserved: str) -> str:
+    """The session context packed into what `model` has left after the reserved prompt text"""
+    assembled = ContextAssembler.for_model(model, *reserved).extend(
+        session_sections(session["context_builder"])
+    ).assemble()
+    if assembled.truncated or assembled.dropped:
+        print(f"[CONTEXT] Session context for {model}: {assembled.summary()}")
+    return assembled.text
+
 async def process_single_agent(user_input: str, session: Dict[str, Any], agent_type: AgentType):
     """Processes a request using a single agent."""
     agent = session["agents"][agent_type]
     
-    # Build comprehensive context including current request
-    context_parts = [
-        f"CURRENT REQUEST: {user_input}",
-        ""
-    ]
-    
-    # Add session history
-    if session.get('history'):
-        context_parts.append("CONVERSATION HISTORY:")
-        for i, hist in enumerate(session['history'][-5:]):  # Last 5 history items
-            context_parts.append(f"{i+1}. {hist}")
-        context_parts.append("")
-    
-    # Add current prototype state
-    if session.get('current_prototype'):
-        context_parts.append("CURRENT PROTOTYPE STATE:")
-        context_parts.append(json.dumps(session['current_prototype'], indent=2))
-        context_parts.append("")
-    
-    # Add learned preferences from memory
-    if session.get('memory'):
-        memory_context = session['memory'].get_context_summary()
-        if memory_context and memory_context != "No learned preferences yet.":
-            context_parts.append("LEARNED USER PREFERENCES:")
-            context_parts.append(memory_context)
-            context_parts.append("")
-    
-    context = "\n".join(context_parts)
+    # Current request, then history, prototype and learned preferences within the model's budget
+    session_context = budgeted_session_context(session, agent.model, agent.instructions, user_input)
+    context = f"CURRENT REQUEST: {user_input}\n\n{session_context}"
     
     response = await agent.process(user_input, session.get('current_prototype', {}), context)
     return [response]
 
-async def process_enhanced_multi_agent_workflow(user_input: str, session: Dict[str, Any]):
-    """Processes a request using the enhanced multi-agent workflow with HandoffCoordinator."""
+async def process_enhanced_multi_agent_workflow(user_input: str, session: Dict[str, Any], session_id: Optional[str] = None):
+    """Processes a request using the enhanced multi-agent workflow with HandoffCoordinator.
+
+    Assignments without dependencies run concurrently; an assignment with
+    dependencies starts once those agents have answered. When a session_id is
+    given, each response is pushed as an ``agent_response`` message as soon as
+    its agent finishes.
+    """
     handoff_coordinator = session["handoff_coordinator"]
     shared_memory = session["shared_memory"]
     
-    # Build comprehensive session context
-    session_context_parts = []
-    
-    # Add session history
-    if session.get('history'):
-        session_context_parts.append("CONVERSATION HISTORY:")
-        for i, hist in enumerate(session['history'][-5:]):
-            session_context_parts.append(f"{i+1}. {hist}")
-        session_context_parts.append("")
-    
-    # Add current prototype state
-    if session.get('current_prototype'):
-        session_context_parts.append("CURRENT PROTOTYPE STATE:")
-        session_context_parts.append(json.dumps(session['current_prototype'], indent=2))
-        session_context_parts.append("")
-    
-    # Add learned preferences from memory
-    if session.get('memory'):
-        memory_context = session['memory'].get_context_summary()
-        if memory_context and memory_context != "No learned preferences yet.":
-            session_context_parts.append("LEARNED USER PREFERENCES:")
-            session_context_parts.append(memory_context)
-            context_parts.append("")
-    
-    session_context = "\n".join(session_context_parts)
+    # Session history, prototype and learned preferences, rendered once for every agent
+    # and fitted to the smallest context window among their models
+    agents = session["agents"].values()
+    session_context = budgeted_session_context(
+        session,
+        min((agent.model for agent in agents), key=llm_manager.context_length),
+        max((agent.instructions for agent in agents), key=len),
+        user_input
+    )
     
     # Update shared memory context
     turn = {"user_input": user_input, "agent_responses": [], "session_context": session_context}
@@ -136,8 +160,15 @@ async def process_enhanced_multi_agent_workflow(user_input: str, session: Dict[s
 
     assignments = handoff_coordinator.create_workload_assignments(handoff_decision, user_input)
     
-    agent_responses = []
-    for assignment in assignments:
+    agent_tasks: Dict[AgentType, asyncio.Task] = {}
+
+    async def run_assignment(assignment):
+        # Wait for the agents this one depends on and share their answers
+        dependency_responses = []
+        for dependency in assignment.dependencies:
+            if dependency in agent_tasks and dependency != assignment.agent_type:
+                dependency_responses.append(await agent_tasks[dependency])
+        
         agent = session["agents"][assignment.agent_type]
         peer_assignments = [a for a in assignments if a.agent_type != assignment.agent_type]
         
@@ -152,8 +183,31 @@ async def process_enhanced_multi_agent_workflow(user_input: str, session: Dict[s
         # Add session context to the enriched context
         full_context = f"{session_context}\n\n{base_enriched_context}"
         
+        if dependency_responses:
+            dependency_parts = ["", "RESPONSES FROM AGENTS YOU DEPEND ON:"]
+            for dependency_response in dependency_responses:
+                dependency_parts.append(f"- {dependency_response.agent_type.value}: {dependency_response.content}")
+            full_context += "\n".join(dependency_parts)
+        
         response = await agent.process_enhanced(user_input, full_context, assignment)
-        agent_responses.append(response)
+        
+        if session_id:
+            await manager.send_json_message({
+                "type": "agent_response",
+                "data": {
+                    "response": response,
+                    "priority": assignment.priority,
+                    "total_agents": len(assignments)
+                }
+            }, session_id)
+        
+        return response
+
+    for assignment in assignments:
+        agent_tasks[assignment.agent_type] = asyncio.create_task(run_assignment(assignment))
+    
+    print(f"[MULTI-AGENT] Running {len(assignments)} agents (parallel: {handoff_decision.requires_parallel_processing})")
+    agent_responses = list(await asyncio.gather(*agent_tasks.values()))
 
     # Update workflow with responses
     session["multi_agent_workflow"].agent_responses.extend(agent_responses)
@@ -212,7 +266,8 @@ async def handle_direct_chat(session_id: str, message: Dict[str, Any]):
         
         agent = sessions[session_id]["agents"][agent_type]
         
-        context_str_parts = []
+        # Lower priorities are the last to be cut when the context exceeds the model's budget
+        assembler = ContextAssembler.for_model(agent.model, agent.instructions, user_message)
         
         # PRIORITY 1: Add current request from session (most recent context)
         current_req_from_session = sessions[session_id].get("current_request")
@@ -220,63 +275,62 @@ async def handle_direct_chat(session_id: str, message: Dict[str, Any]):
         print(f"[DEBUG] Context data keys: {list(context_data.keys())}")
         
         if current_req_from_session:
-            context_str_parts.append(f"CURRENT SESSION CONTEXT:\n")
-            context_str_parts.append(f"Latest Request: {current_req_from_session}\n")
-            context_str_parts.append("\n")
+            assembler.add("session_request", "CURRENT SESSION CONTEXT:", f"Latest Request: {current_req_from_session}", priority=1)
         
         # PRIORITY 2: Add current request/main topic from message context
         if context_data.get("current_request") or context_data.get("main_topic"):
             current_req = context_data.get("current_request", "")
             main_topic = context_data.get("main_topic", "")
-            context_str_parts.append(f"MESSAGE CONTEXT:\n")
+            message_parts = []
             if current_req:
-                context_str_parts.append(f"Current Request: {current_req}\n")
+                message_parts.append(f"Current Request: {current_req}")
             if main_topic:
-                context_str_parts.append(f"{main_topic}\n")
-            context_str_parts.append("\n")
+                message_parts.append(main_topic)
+            assembler.add("message_context", "MESSAGE CONTEXT:", "\n".join(message_parts), priority=2)
         
-        # PRIORITY 3: Add recent session history (most relevant)
+        # PRIORITY 3: Add the summary of older turns and recent session history (most relevant)
+        assembler.add("summary", "CONVERSATION SUMMARY:", sessions[session_id]["context_builder"].summary(), priority=3)
         if sessions[session_id]["history"]:
-            context_str_parts.append("RECENT SESSION HISTORY:\n")
-            context_str_parts.append("\n".join([f"User said: {h}" for h in sessions[session_id]["history"][-3:]]))
-            context_str_parts.append("\n")
+            assembler.add(
+                "history", "RECENT SESSION HISTORY:",
+                sessions[session_id]["context_builder"].history(3, "User said: {text}"),
+                priority=3, keep="tail"
+            )
         
         # PRIORITY 4: Add agent responses context for continuity
         if context_data.get("agent_responses") and len(context_data["agent_responses"]) > 0:
-            context_str_parts.append("PREVIOUS MULTI-AGENT DISCUSSION:\n")
+            discussion = []
             for response in context_data["agent_responses"][-3:]:
                 agent_name = response.get("agent_type", "Agent").replace("_", " ").title()
                 content_preview = response.get("response", {}).get("response", "")[:200]
-                context_str_parts.append(f"{agent_name}: {content_preview}...\n")
-            context_str_parts.append("\n")
+                discussion.append(f"{agent_name}: {content_preview}...")
+            assembler.add("agent_responses", "PREVIOUS MULTI-AGENT DISCUSSION:", "\n".join(discussion), priority=4, keep="tail")
         
         # PRIORITY 5: Add direct conversation history (if available)
         if context_data.get("conversation_history"):
-            context_str_parts.append("DIRECT CONVERSATION HISTORY:\n")
+            conversation = []
             for msg in context_data["conversation_history"][-5:]:
                 role = "User" if msg["role"] == "user" else agent_type.value.replace("_", " ").title()
-                context_str_parts.append(f"{role}: {msg['content']}\n")
-            context_str_parts.append("\n")
+                conversation.append(f"{role}: {msg['content']}")
+            assembler.add("conversation", "DIRECT CONVERSATION HISTORY:", "\n".join(conversation), priority=5, keep="tail")
         
         # PRIORITY 6: Add imported documents ONLY if no current context exists
         if (
             sessions[session_id].get('imported_documents') and 
             not sessions[session_id].get("current_request") and 
             not context_data.get("current_request") and 
-            len(context_str_parts) < 2
+            not assembler.sections
         ):
-            context_str_parts.append("REFERENCE DOCUMENTS (BACKGROUND):\n")
-            total_doc_chars = 0
-            max_doc_chars = 3000  # Further reduced to prevent context pollution
-            
-            for i, doc in enumerate(sessions[session_id]['imported_documents'][-1:]):  # Only last 1 doc
-                context_str_parts.append(f"Document: {doc['name']} ({doc['type']})\n")
-                
-                # Only show document title and brief summary
-                context_str_parts.append(f"Brief Summary: {doc['content'][:200]}...\n\n")
-                break  # Only one document as background context
+            # Only the last document, as its title and a brief summary
+            assembler.add(
+                "documents", "REFERENCE DOCUMENTS (BACKGROUND):",
+                sessions[session_id]["context_builder"].documents(limit=1, preview=200),
+                priority=6
+            )
 
-        context_str = "\n".join(context_str_parts)
+        assembled = assembler.assemble()
+        context_str = assembled.text
+        print(f"[DIRECT-CHAT] {assembled.summary()}")
 
         response_content = await agent.direct_chat(user_message, context_str)
         
@@ -341,27 +395,40 @@ async def handle_execute_template_agent(session_id: str, message: Dict[str, Any]
         template_id = message["data"]["template_id"]
         user_input = message["data"]["user_input"]
         context = message["data"].get("context", {})
+        llm_settings = message["data"].get("llm_settings", {})
         
         # Add session context
+        session_data = sessions[session_id]
+        memory = session_data.get("memory")
         session_context = {
-            "conversation_history": sessions[session_id].get("history", []),
-            "current_prototype": sessions[session_id].get("current_prototype"),
-            "session_preferences": sessions[session_id].get("memory", {}).get("preferences", {}) if sessions[session_id].get("memory") else {}
+            "conversation_history": session_data.get("history", []),
+            "current_prototype": session_data.get("current_prototype"),
+            "session_preferences": memory.preferences if memory else {},
+            "context_builder": session_data["context_builder"]
         }
         context.update(session_context)
         
-        # Store the current request
-        sessions[session_id]["current_request"] = user_input
-        sessions[session_id]["history"].append(user_input)
+        # Store the current request; a new input cancels speculative runs made for the last one
+        speculative_runner.cancel(session_id, keep_input=user_input)
+        record_template_request(session_id, user_input)
         
-        result = await template_agent_executor.execute_agent_template(
-            template_id, user_input, context
+        on_token = None
+        if llm_settings.get("stream"):
+            streamer = token_streamer(session_id, template_id)
+            
+            async def on_token(_: str, delta: str):
+                await streamer(delta)
+        
+        # As a graph of one, so the result memo, or a speculative run of this template, can answer it
+        results, _ = await template_agent_executor.execute_template_graph(
+            [template_id], user_input, context, llm_settings=llm_settings, on_token=on_token
         )
+        result = results[0]
         
         await manager.send_json_message({
             "type": "template_agent_result",
             "data": {
-                "result": result.dict(),
+                "result": result,
                 "template_id": template_id
             }
         }, session_id)
@@ -392,24 +459,59 @@ async def handle_execute_multiple_template_agents(session_id: str, message: Dict
         session_context = {
             "conversation_history": session_data.get("history", []),
             "current_prototype": session_data.get("current_prototype"),
-            "session_preferences": memory.preferences if memory else {}
+            "session_preferences": memory.preferences if memory else {},
+            # Every template in the fan-out shares one rendering of the session
+            "context_builder": session_data["context_builder"]
         }
         context.update(session_context)
         
-        # Store the current request
-        sessions[session_id]["current_request"] = user_input
-        sessions[session_id]["history"].append(user_input)
+        # Store the current request; a new input cancels speculative runs made for the last one
+        speculative_runner.cancel(session_id, keep_input=user_input)
+        record_template_request(session_id, user_input)
         
-        results = await template_agent_executor.execute_multiple_templates(
-            template_ids, user_input, context, llm_settings=llm_settings
+        on_token = None
+        if llm_settings.get("stream"):
+            streamers: Dict[str, Callable[[str], Awaitable[None]]] = {}
+            
+            async def on_token(template_id: str, delta: str):
+                if template_id not in streamers:
+                    streamers[template_id] = token_streamer(session_id, template_id)
+                await streamers[template_id](delta)
+        
+        # Clients that opt in get each template_agent_result as soon as its template is done
+        on_result = None
+        if message["data"].get("stream_results"):
+            completed = 0
+            
+            async def on_result(result):
+                nonlocal completed
+                completed += 1
+                await manager.send_json_message({
+                    "type": "template_agent_result",
+                    "data": {
+                        "result": result,
+                        "template_id": result.template_id,
+                        "completed": completed,
+                        "total": len(template_ids)
+                    }
+                }, session_id)
+        
+        # Optional per-request overrides of TEMPLATE_NODE_TIMEOUT / TEMPLATE_FAILURE_POLICY
+        results, report = await template_agent_executor.execute_template_graph(
+            template_ids, user_input, context, llm_settings=llm_settings, on_token=on_token,
+            timeout=message["data"].get("timeout"), failure_policy=message["data"].get("failure_policy"),
+            on_result=on_result
         )
+        # Opt-in (SPECULATIVE_EXECUTION_ENABLED): run the likely next template while the client reads these
+        speculative_runner.after_fan_out(session_id, template_ids, results, user_input, context, llm_settings)
         
         await manager.send_json_message({
             "type": "multiple_template_agents_result",
             "data": {
-                "results": [result.dict() for result in results],
+                "results": results,
                 "user_input": user_input,
-                "execution_count": len(results)
+                "execution_count": len(results),
+                "execution_report": report.to_dict()
             }
         }, session_id)
         
@@ -427,7 +529,7 @@ async def handle_get_agent_templates(session_id: str, message: Dict[str, Any]):
         await manager.send_json_message({
             "type": "agent_templates",
             "data": {
-                "templates": [template.dict() for template in collection.templates],
+                "templates": collection.templates,
                 "active_templates": collection.active_templates
             }
         }, session_id)
@@ -451,6 +553,10 @@ async def handle_execute_llm_agents(session_id: str, message: Dict[str, Any]):
         provider_str = llm_settings.get("provider", "openai")
         model = llm_settings.get("model", "gpt-4o-mini")
         temperature = llm_settings.get("temperature", 0.7)
+        use_cache = llm_settings.get("use_cache", True)
+        stream = llm_settings.get("stream", False)
+        # Only consulted when model is a routing alias such as "auto"
+        routing_policy = llm_manager.routing_policy(llm_settings.get("routing"))
         
         # Convert provider string to enum
         try:
@@ -459,7 +565,8 @@ async def handle_execute_llm_agents(session_id: str, message: Dict[str, Any]):
             provider = LLMProvider.OPENAI
             print(f"[WARNING] Invalid provider '{provider_str}', using OpenAI")
         
-        # Store request in session
+        # Store request in session; a new input cancels speculative runs made for the last one
+        speculative_runner.cancel(session_id, keep_input=user_input)
         sessions[session_id]["current_request"] = user_input
         sessions[session_id]["history"].append(user_input)
         
@@ -497,30 +604,23 @@ async def handle_execute_llm_agents(session_id: str, message: Dict[str, Any]):
                 # Generate response using selected LLM
                 print(f"[DEBUG] Calling LLM for {agent_name}: {provider} {model}")
                 
-                try:
-                    response = await llm_manager.generate(
-                        messages=messages,
-                        model=model,
-                        provider=provider,
-                        temperature=temperature,
-                        max_tokens=1500
+                # Retries and provider fallback are handled by llm_manager
+                generation_args = dict(
+                    messages=messages,
+                    model=model,
+                    provider=provider,
+                    temperature=temperature,
+                    max_tokens=1500,
+                    use_cache=use_cache,
+                    routing_policy=routing_policy
+                )
+                if stream:
+                    response = await llm_manager.generate_streaming(
+                        on_token=token_streamer(session_id, template_id), **generation_args
                     )
-                    print(f"[DEBUG] LLM response received for {agent_name}: {len(response.content)} chars")
-                except Exception as llm_error:
-                    print(f"[DEBUG] Primary LLM failed for {agent_name}: {llm_error}")
-                    # Fallback to OpenAI if selected provider fails
-                    if provider != LLMProvider.OPENAI:
-                        print(f"[DEBUG] Falling back to OpenAI for {agent_name}")
-                        response = await llm_manager.generate(
-                            messages=messages,
-                            model="gpt-4o-mini",
-                            provider=LLMProvider.OPENAI,
-                            temperature=temperature,
-                            max_tokens=1500
-                        )
-                        print(f"[DEBUG] Fallback LLM response received for {agent_name}: {len(response.content)} chars")
-                    else:
-                        raise llm_error
+                else:
+                    response = await llm_manager.generate(**generation_args)
+                print(f"[DEBUG] LLM response received for {agent_name}: {len(response.content)} chars")
                 
                 # Parse the response into structured format
                 content = response.content
@@ -612,7 +712,7 @@ async def handle_execute_llm_agents(session_id: str, message: Dict[str, Any]):
                     "suggestions": [],
                     "questions": [],
                     "confidence_level": 0.0,
-                    "execution_time": response_time,
+                    "execution_time": 0.0,
                     "alternative_ideas": [],
                     "rerun_results": []
                 }
@@ -667,6 +767,7 @@ async def handle_generate_prototype(session_id: str, message: Dict[str, Any]):
         provider_str = llm_settings.get("provider", "openai")
         model = llm_settings.get("model", "gpt-4o-mini")
         temperature = llm_settings.get("temperature", 0.7)
+        stream = llm_settings.get("stream", False)
         
         # Convert provider string to enum
         try:
@@ -675,7 +776,8 @@ async def handle_generate_prototype(session_id: str, message: Dict[str, Any]):
             provider = LLMProvider.OPENAI
             print(f"[WARNING] Invalid provider '{provider_str}', using OpenAI")
         
-        # Store request in session
+        # Store request in session; the new prototype invalidates speculative runs
+        speculative_runner.cancel(session_id)
         sessions[session_id]["current_request"] = user_input
         sessions[session_id]["history"].append(user_input)
         
@@ -712,8 +814,7 @@ Available components: div, button, input, form, h1, h2, h3, h4, h5, h6, p, span,
             LLMMessage(role="user", content=f"Create a UI component for: {user_input}")
         ]
         
-        # Generate prototype using selected LLM
-        response = await llm_manager.generate(
+        generation_args = dict(
             messages=messages,
             model=model,
             provider=provider,
@@ -721,23 +822,28 @@ Available components: div, button, input, form, h1, h2, h3, h4, h5, h6, p, span,
             max_tokens=2000
         )
         
-        # Parse the JSON response
-        prototype_json = None
+        # Parse the JSON response; in streaming mode completed components are
+        # sent as they arrive and malformed output stops the generation early
         try:
-            # Try to extract JSON from response
-            content = response.content.strip()
-            
-            # Handle markdown wrapped JSON
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            
-            prototype_json = json.loads(content.strip())
+            if stream:
+                parser = PrototypeStreamParser()
+                send_token = token_streamer(session_id, "prototype")
+                
+                async def on_token(delta: str):
+                    await send_token(delta)
+                    for partial in parser.feed(delta):
+                        await manager.send_json_message({
+                            "type": "prototype_partial",
+                            "data": partial
+                        }, session_id)
+                
+                await llm_manager.generate_streaming(on_token=on_token, **generation_args)
+                prototype_json = parser.close()
+            else:
+                response = await llm_manager.generate(**generation_args)
+                prototype_json = parse_prototype(response.content)
             
-        except json.JSONDecodeError as e:
+        except PrototypeStreamError as e:
             print(f"[ERROR] Failed to parse JSON: {e}")
             # Fallback to simple structure
             prototype_json = {
@@ -757,13 +863,8 @@ Available components: div, button, input, form, h1, h2, h3, h4, h5, h6, p, span,
                 ]
             }
         
-        # Store prototype in session
-        sessions[session_id]["current_prototype"] = prototype_json
-        
-        await manager.send_json_message({
-            "type": "prototype",
-            "data": prototype_json
-        }, session_id)
+        # Store prototype in session and send what changed
+        await send_prototype_update(session_id, prototype_json)
         
         print(f"[PROTOTYPE] Successfully generated prototype for session {session_id}")
         
@@ -775,6 +876,21 @@ Available components: div, button, input, form, h1, h2, h3, h4, h5, h6, p, span,
         }, session_id)
 
 
+async def handle_prototype_ack(session_id: str, message: Dict[str, Any]):
+    """Records the prototype version the client holds; an unknown version gets a full resync."""
+    versions = sessions[session_id]["prototype_versions"]
+    version = (message.get("data") or {}).get("version")
+    if not isinstance(version, int) or not versions.ack(version):
+        print(f"[PROTOTYPE] Session {session_id} acknowledged unknown version {version}; resyncing")
+        await manager.send_json_message(versions.full_message(), session_id)
+
+async def handle_prototype_resync(session_id: str, message: Dict[str, Any]):
+    """Sends the full current prototype, e.g. after the client failed to apply a patch."""
+    versions = sessions[session_id]["prototype_versions"]
+    versions.reset_client()
+    await manager.send_json_message(versions.full_message(), session_id)
+
+
 message_handlers = {
     "multi_agent_prototype": handle_multi_agent_prototype,
     "switch_agent": handle_switch_agent,
@@ -787,4 +903,6 @@ message_handlers = {
     "execute_llm_agents": handle_execute_llm_agents,
     "get_agent_templates": handle_get_agent_templates,
     "generate_prototype": handle_generate_prototype,
+    "prototype_ack": handle_prototype_ack,
+    "prototype_resync": handle_prototype_resync,
 }
\ No newline at end of file
@@ -1,24 +1,117 @@
-from typing import Dict
+import asyncio
+import os
+from typing import Any, Dict, Optional
 from fastapi import WebSocket
 
+from .message_bus import MessageBus, create_message_bus_from_env
+from .outbound import OutboundQueue
+from .codec import FrameCodec
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(
+        self,
+        bus: Optional[MessageBus] = None,
+        max_queue: Optional[int] = None,
+        send_timeout: Optional[float] = None
+    ):
         self.active_connections: Dict[str, WebSocket] = {}
+        # Each socket is written by its own task from a bounded queue
+        self.outbound: Dict[str, OutboundQueue] = {}
+        self.max_queue = max_queue or int(os.getenv("WS_OUTBOUND_MAX_QUEUE", "256"))
+        self.send_timeout = send_timeout or float(os.getenv("WS_SEND_TIMEOUT", "10"))
+        self.stalled_clients = 0
+        # Messages for sockets held by another worker travel over the bus
+        self.bus = bus or create_message_bus_from_env()
+
+    async def start(self):
+        await self.bus.start(self._deliver_local)
+
+    async def stop(self):
+        await asyncio.gather(*(queue.drain() for queue in self.outbound.values()))
+        for session_id in list(self.active_connections):
+            self.disconnect(session_id)
+        await self.bus.stop()
 
-    async def connect(self, websocket: WebSocket, session_id: str):
+    async def connect(self, websocket: WebSocket, session_id: str, codec: Optional[FrameCodec] = None):
         await websocket.accept()
+        previous = self.outbound.pop(session_id, None)
+        if previous:
+            previous.close()
+        queue = OutboundQueue(
+            websocket,
+            max_size=self.max_queue,
+            send_timeout=self.send_timeout,
+            on_stalled=lambda: self._close_stalled(session_id, websocket),
+            codec=codec
+        )
+        queue.start()
         self.active_connections[session_id] = websocket
+        self.outbound[session_id] = queue
 
-    def disconnect(self, session_id: str):
+    def disconnect(self, session_id: str, websocket: Optional[WebSocket] = None):
+        # A reconnect may already have replaced the socket being torn down
+        if websocket is not None and self.active_connections.get(session_id) is not websocket:
+            return
         if session_id in self.active_connections:
             del self.active_connections[session_id]
+        queue = self.outbound.pop(session_id, None)
+        if queue:
+            queue.close()
+
+    async def release(self, session_id: str, websocket: WebSocket, timeout: float = 1.0):
+        """Flush what is still queued for a closing socket, then disconnect it"""
+        queue = self.outbound.get(session_id)
+        if queue and self.active_connections.get(session_id) is websocket:
+            await queue.drain(timeout)
+        self.disconnect(session_id, websocket)
+
+    def _close_stalled(self, session_id: str, websocket: WebSocket):
+        self.stalled_clients += 1
+        self.disconnect(session_id, websocket)
+        # The client will see the close and reconnect; its receive loop then exits
+        asyncio.get_running_loop().create_task(self._close_socket(websocket))
+
+    async def _close_socket(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), 5)
+        except Exception as e:
+            print(f"[WEBSOCKET] Failed to close stalled socket: {e}")
 
     async def send_personal_message(self, message: str, session_id: str):
-        if session_id in self.active_connections:
-            await self.active_connections[session_id].send_text(message)
+        await self._send({"kind": "text", "data": message}, session_id)
 
     async def send_json_message(self, data: dict, session_id: str):
+        await self._send({"kind": "json", "data": data}, session_id)
+
+    async def _send(self, envelope: Dict[str, Any], session_id: str):
         if session_id in self.active_connections:
-            await self.active_connections[session_id].send_json(data)
+            await self._deliver_local(session_id, envelope)
+        else:
+            await self.bus.publish(session_id, envelope)
+
+    async def _deliver_local(self, session_id: str, envelope: Dict[str, Any]) -> bool:
+        queue = self.outbound.get(session_id)
+        if queue is None:
+            return False
+        await queue.put(envelope)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Outbound queue depth and coalescing counters across this worker's sockets"""
+        queues = {session_id: queue.get_stats() for session_id, queue in self.outbound.items()}
+        totals = {
+            name: sum(stats[name] for stats in queues.values())
+            for name in ["depth", "sent", "merged", "superseded", "dropped", "bytes_sent", "binary_frames"]
+        }
+        deepest = sorted(queues.items(), key=lambda item: item[1]["depth"], reverse=True)[:5]
+        return {
+            "connections": len(self.active_connections),
+            "max_queue": self.max_queue,
+            "send_timeout": self.send_timeout,
+            "stalled_clients": self.stalled_clients,
+            "peak_depth": max((stats["peak_depth"] for stats in queues.values()), default=0),
+            **totals,
+            "deepest_queues": [{"session_id": session_id, **stats} for session_id, stats in deepest]
+        }
 
 manager = ConnectionManager()
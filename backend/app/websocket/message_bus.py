@@ -0,0 +1,105 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..core.serialization import dumps, loads
+
+# Delivers a message to a socket held by this process; returns False if the
+# session has no socket here
+Deliver = Callable[[str, Dict[str, Any]], Awaitable[bool]]
+
+
+class MessageBus(ABC):
+    """Carries outbound WebSocket messages to whichever worker holds the socket"""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, session_id: str, envelope: Dict[str, Any]):
+        """Send an envelope ({"kind": "json" | "text", "data": ...}) to a session"""
+
+
+class InProcessMessageBus(MessageBus):
+    """Single-worker bus: only sockets in this process can be reached"""
+
+    async def publish(self, session_id: str, envelope: Dict[str, Any]):
+        if self._deliver:
+            await self._deliver(session_id, envelope)
+
+
+class RedisMessageBus(MessageBus):
+    """Redis pub/sub bus shared by every worker and node.
+
+    All workers subscribe to one channel and deliver the messages addressed to
+    sessions whose socket they hold; the rest are ignored.
+    """
+
+    def __init__(self, client, channel: str = "ws:messages"):
+        super().__init__()
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+        print(f"[BUS] Redis message bus listening on {self.channel}")
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def publish(self, session_id: str, envelope: Dict[str, Any]):
+        payload = {"session_id": session_id, **envelope}
+        await self.client.publish(self.channel, dumps(payload))
+        self.published += 1
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                payload = loads(message["data"])
+                session_id = payload.pop("session_id")
+                if await self._deliver(session_id, payload):
+                    self.delivered += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[BUS] Failed to handle bus message: {e}")
+                await asyncio.sleep(0.1)
+
+
+def create_message_bus_from_env() -> MessageBus:
+    """Build the bus selected by MESSAGE_BUS (inprocess or redis)"""
+    if os.getenv("MESSAGE_BUS", "inprocess").lower() == "redis":
+        import redis.asyncio as redis_async
+        client = redis_async.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            db=int(os.getenv("REDIS_DB", "0")),
+            decode_responses=True
+        )
+        return RedisMessageBus(client, channel=os.getenv("MESSAGE_BUS_CHANNEL", "ws:messages"))
+    return InProcessMessageBus()
@@ -0,0 +1,205 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from fastapi import WebSocket
+
+from .codec import FrameCodec
+
+# Frames that carry part of a result the client also receives whole, so a
+# backed-up client can lose them without losing anything it needs
+DROPPABLE_TYPES = {"llm_token", "prototype_partial"}
+
+# Progress frames where only the newest one per key is worth sending
+SUPERSEDED_BY_KEY = {"pipeline_progress": "pipeline_id"}
+
+
+def _frame(envelope: Dict[str, Any]) -> Dict[str, Any]:
+    data = envelope.get("data")
+    return data if envelope.get("kind") == "json" and isinstance(data, dict) else {}
+
+
+def _frame_key(frame: Dict[str, Any], field: str) -> Any:
+    return (frame.get("data") or {}).get(field)
+
+
+class OutboundQueue:
+    """Bounded send queue for one socket, drained by its own writer task.
+
+    Handlers enqueue and move on, so a slow browser no longer blocks the agent
+    task reporting to it. Token deltas for the same stream are merged while
+    they wait, superseded progress frames are replaced, and droppable frames
+    are shed when the queue is full. If the queue stays full of frames that
+    must be delivered for send_timeout seconds, the client is treated as
+    stalled and on_stalled is called so the connection can be closed.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_size: int = 256,
+        send_timeout: float = 10.0,
+        on_stalled: Optional[Callable[[], None]] = None,
+        codec: Optional[FrameCodec] = None
+    ):
+        self.websocket = websocket
+        self.codec = codec or FrameCodec()
+        self.max_size = max_size
+        self.send_timeout = send_timeout
+        self.on_stalled = on_stalled
+        self._items: Deque[Dict[str, Any]] = deque()
+        self._changed = asyncio.Condition()
+        self._writer: Optional[asyncio.Task] = None
+        self._sending = False
+        self.closed = False
+        self.stalled = False
+        self.peak_depth = 0
+        self.sent = 0
+        self.merged = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.binary_frames = 0
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    async def put(self, envelope: Dict[str, Any]) -> bool:
+        """Queue an envelope; False if the connection is closed or stalled"""
+        async with self._changed:
+            if self.closed:
+                return False
+            if self._coalesce(envelope):
+                return True
+            if len(self._items) >= self.max_size:
+                self._drop_oldest_droppable()
+            if len(self._items) >= self.max_size:
+                if _frame(envelope).get("type") in DROPPABLE_TYPES:
+                    self.dropped += 1
+                    return True
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self.closed or len(self._items) < self.max_size),
+                        self.send_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self._stall()
+                    return False
+                if self.closed:
+                    return False
+            self._items.append(envelope)
+            self.peak_depth = max(self.peak_depth, len(self._items))
+            self._changed.notify_all()
+            return True
+
+    def _coalesce(self, envelope: Dict[str, Any]) -> bool:
+        frame = _frame(envelope)
+        frame_type = frame.get("type")
+
+        if frame_type == "llm_token" and self._items:
+            # Only the newest queued frame can absorb a delta without reordering
+            tail = _frame(self._items[-1])
+            if tail.get("type") == "llm_token" and _frame_key(tail, "stream_id") == _frame_key(frame, "stream_id"):
+                delta = tail["data"].get("delta", "") + frame["data"].get("delta", "")
+                merged_frame = {**tail, "data": {**tail["data"], "delta": delta}}
+                self._items[-1] = {**self._items[-1], "data": merged_frame}
+                self.merged += 1
+                return True
+
+        field = SUPERSEDED_BY_KEY.get(frame_type)
+        if field:
+            key = _frame_key(frame, field)
+            for index, queued in enumerate(self._items):
+                queued_frame = _frame(queued)
+                if queued_frame.get("type") == frame_type and _frame_key(queued_frame, field) == key:
+                    self._items[index] = envelope
+                    self.superseded += 1
+                    return True
+        return False
+
+    def _drop_oldest_droppable(self):
+        for index, queued in enumerate(self._items):
+            if _frame(queued).get("type") in DROPPABLE_TYPES:
+                del self._items[index]
+                self.dropped += 1
+                return
+
+    def _stall(self):
+        print(f"[WEBSOCKET] Client stalled with {len(self._items)} queued messages; closing")
+        self.stalled = True
+        self.close()
+        if self.on_stalled:
+            self.on_stalled()
+
+    async def _write_loop(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.closed or self._items)
+                if self.closed:
+                    return
+                envelope = self._items.popleft()
+                self._sending = True
+                self._changed.notify_all()
+            try:
+                if envelope["kind"] == "text":
+                    frame = envelope["data"]
+                else:
+                    # Encoded here rather than by send_json so every frame uses the fast encoder
+                    frame = self.codec.encode(envelope["data"])
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                    self.binary_frames += 1
+                    self.bytes_sent += len(frame)
+                else:
+                    await self.websocket.send_text(frame)
+                    self.bytes_sent += len(frame)  # characters; close enough for mostly-ASCII JSON
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WEBSOCKET] Send failed, dropping connection queue: {e}")
+                self.close()
+                return
+            finally:
+                self._sending = False
+
+    async def drain(self, timeout: float = 1.0) -> bool:
+        """Wait until everything queued has been sent; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while (self._items or self._sending) and not self.closed:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return not self.closed and not self._items
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._items.clear()
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        # Wake senders waiting for room so they see the queue is closed
+        asyncio.get_running_loop().create_task(self._wake())
+
+    async def _wake(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._items),
+            "peak_depth": self.peak_depth,
+            "sent": self.sent,
+            "merged": self.merged,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "encoding": self.codec.name,
+            "bytes_sent": self.bytes_sent,
+            "binary_frames": self.binary_frames,
+            "stalled": self.stalled
+        }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: encoding multi-agent result frames with the stdlib json path
+the WebSocket layer used before versus the shared serializer.
+
+Usage: python benchmark_serialization.py [iterations]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.core.serialization import BACKEND, dumps, dumps_pretty
+from app.models.agent_models import AgentResponse, AgentType
+from app.models.agent_templates import AgentExecutionResult
+
+
+def _prototype(depth: int = 4, width: int = 4):
+    if depth == 0:
+        return {"component": "text", "props": {"content": "Label " * 5, "style": {"color": "#333"}}}
+    return {
+        "component": "container",
+        "props": {"layout": "column", "gap": 12, "title": "Section"},
+        "children": [_prototype(depth - 1, width) for _ in range(width)]
+    }
+
+
+def _payloads():
+    prototype = _prototype()
+    results = [
+        AgentExecutionResult(
+            template_id=f"template_{i}",
+            agent_name=f"Agent {i}",
+            content="Detailed analysis of the proposed layout and flows. " * 40,
+            suggestions=[f"Suggestion {n}" for n in range(8)],
+            questions=[f"Question {n}?" for n in range(5)],
+            critique="Consider contrast and spacing. " * 10,
+            confidence_level=0.82,
+            execution_time=12.5
+        )
+        for i in range(8)
+    ]
+    responses = [
+        AgentResponse(agent_type=agent_type, content="Agent feedback. " * 60,
+                      suggestions=["Use cards", "Add search"], prototype_update=prototype)
+        for agent_type in [AgentType.UI_DESIGNER, AgentType.UX_RESEARCHER, AgentType.DEVELOPER]
+    ]
+    return prototype, results, responses
+
+
+def _stdlib_frames(prototype, results, responses):
+    # What handlers and Starlette's send_json did: dump each model, then encode
+    return [
+        json.dumps({"type": "multiple_template_agents_result",
+                    "data": {"results": [r.model_dump() for r in results], "execution_count": len(results)}},
+                   separators=(",", ":"), ensure_ascii=False),
+        json.dumps({"type": "multi_agent_response",
+                    "data": {"agent_responses": [r.model_dump() for r in responses], "current_prototype": prototype}},
+                   separators=(",", ":"), ensure_ascii=False),
+        json.dumps(prototype, indent=2)
+    ]
+
+
+def _shared_frames(prototype, results, responses):
+    return [
+        dumps({"type": "multiple_template_agents_result",
+               "data": {"results": results, "execution_count": len(results)}}),
+        dumps({"type": "multi_agent_response",
+               "data": {"agent_responses": responses, "current_prototype": prototype}}),
+        dumps_pretty(prototype)
+    ]
+
+
+def _time(fn, args, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    args = _payloads()
+    frame_bytes = sum(len(frame.encode("utf-8")) for frame in _shared_frames(*args))
+
+    baseline = _time(_stdlib_frames, args, iterations)
+    shared = _time(_shared_frames, args, iterations)
+
+    print(f"Payload: {frame_bytes / 1024:.1f} KiB per round, {iterations} rounds, backend={BACKEND}")
+    print(f"stdlib json : {baseline * 1000 / iterations:.3f} ms/round ({frame_bytes * iterations / baseline / 1e6:.1f} MB/s)")
+    print(f"serializer  : {shared * 1000 / iterations:.3f} ms/round ({frame_bytes * iterations / shared / 1e6:.1f} MB/s)")
+    print(f"speedup     : {baseline / shared:.2f}x")
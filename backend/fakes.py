@@ -0,0 +1,223 @@
+"""
+Fakes shared by the test scripts
+"""
+
+import asyncio
+import json
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.llm.base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse, LLMProviderError
+from app.llm.llm_manager import LLMManager, llm_manager
+from app.llm.resilience import RetryPolicy
+from app.llm.response_cache import MemoryCacheTier
+from app.models.agent_templates import AgentExecutionResult
+from app.services.result_memo import ResultMemo
+from app.services.session_state import create_session
+from app.services.template_agent_executor import TemplateAgentExecutor
+from app.state import sessions
+from app.websocket import handlers
+from app.websocket.manager import manager
+
+
+class FakeWebSocket:
+    """Records the frames a server sends.
+
+    Created with gated=True, sends block until `gate` is set, which lets a
+    test hold the socket's writer mid-send.
+    """
+
+    def __init__(self, gated: bool = False):
+        self.sent = []
+        self.gate = asyncio.Event()
+        if not gated:
+            self.gate.set()
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        # JSON frames arrive pre-encoded; plain text messages are kept as they are
+        try:
+            self.sent.append(json.loads(text))
+        except ValueError:
+            self.sent.append(text)
+
+    async def send_bytes(self, data):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+class FakeProvider(BaseLLMProvider):
+    """Stands in for an LLM provider and records what it was asked.
+
+    Replies are `reply` formatted with the request count `n`, the last
+    message `prompt` and the `provider` name. Each request sleeps for the
+    next of `delays` (or `delay`) and then fails with the next status code
+    of `failures` (or with `fail_status`) if there is one. Streams yield
+    `tokens`, or the reply in one piece.
+
+    With multi=True, generate_n answers every candidate in one request.
+    """
+
+    def __init__(self, name: LLMProvider = LLMProvider.OPENAI, model_id: str = "gpt-4o-mini",
+                 reply: str = "answer #{n} to {prompt}", context_length: int = 128000,
+                 cost_per_token: float = 0.0, tokens: Optional[List[str]] = None, multi: bool = False,
+                 tokens_used: Optional[int] = None, delay: float = 0.0, delays: List[float] = None,
+                 failures: List[int] = None, fail_status: Optional[int] = None):
+        super().__init__("test-key")
+        self.name = name
+        self.model_id = model_id
+        self.reply = reply
+        self.context_length = context_length
+        self.cost_per_token = cost_per_token
+        self.tokens = tokens
+        self.supports_multiple_candidates = multi
+        self.tokens_used = tokens_used
+        self.delay = delay
+        self.delays = list(delays or [])
+        self.failures = list(failures or [])
+        self.fail_status = fail_status
+        # (model, candidates) per request, and the last message of each
+        self.requests = []
+        self.prompts: List[str] = []
+        self.stream_calls = 0
+        self.tokens_sent = 0
+        self.closed = False
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    def _check_failure(self):
+        status = self.failures.pop(0) if self.failures else self.fail_status
+        if status:
+            raise LLMProviderError(f"{self.name.value} error {status}", provider=self.name.value, status_code=status)
+
+    async def _request(self, messages: List[LLMMessage], model: str, n: int):
+        self.requests.append((model, n))
+        self.prompts.append(messages[-1].content)
+        await asyncio.sleep(self.delays.pop(0) if self.delays else self.delay)
+        self._check_failure()
+
+    def _content(self, messages: List[LLMMessage]) -> str:
+        if self.tokens is not None:
+            return "".join(self.tokens)
+        return self.reply.format(n=self.calls, prompt=messages[-1].content, provider=self.name.value)
+
+    async def generate(self, messages: List[LLMMessage], model: str, temperature: float = 0.7,
+                       max_tokens: Optional[int] = None, **kwargs) -> LLMResponse:
+        await self._request(messages, model, 1)
+        return LLMResponse(content=self._content(messages), model_used=model, provider=self.name,
+                           tokens_used=self.tokens_used, response_time=self.delay)
+
+    async def generate_n(self, messages, model, n, temperature=0.7, max_tokens=None, **kwargs):
+        if not self.supports_multiple_candidates:
+            return await super().generate_n(messages, model, n, temperature, max_tokens, **kwargs)
+        await self._request(messages, model, n)
+        # Usage covers the whole request and is reported on the first choice only
+        usage = self.tokens_used * n if self.tokens_used else None
+        return [LLMResponse(content=f"choice {i}", model_used=model, provider=self.name,
+                            tokens_used=usage if i == 0 else None) for i in range(n)]
+
+    async def stream_generate(self, messages, model, temperature=0.7, max_tokens=None, **kwargs):
+        self.stream_calls += 1
+        self._check_failure()
+        try:
+            for token in self.tokens if self.tokens is not None else [self._content(messages)]:
+                await asyncio.sleep(0)
+                self.tokens_sent += 1
+                yield token
+        finally:
+            self.closed = True
+
+    def get_available_models(self) -> List[LLMModel]:
+        return [LLMModel(id=self.model_id, name=self.model_id, provider=self.name,
+                         context_length=self.context_length, cost_per_token=self.cost_per_token)]
+
+    def get_provider_name(self) -> LLMProvider:
+        return self.name
+
+
+def fake_manager(*providers: FakeProvider, cache=None, fallback_chain=None, retry_attempts: int = 3) -> LLMManager:
+    """An LLMManager serving only `providers`, with fast retries and no breakers"""
+    manager = LLMManager()
+    manager.providers = {p.name: p for p in providers}
+    manager.response_cache = cache
+    manager.retry_policy = RetryPolicy(max_attempts=retry_attempts, base_delay=0.01, max_delay=0.02)
+    manager.fallback_chain = fallback_chain or []
+    manager.breakers = {}
+    return manager
+
+
+@contextmanager
+def using_providers(*providers: FakeProvider):
+    """Serve the global llm_manager from `providers`, uncached, for the duration"""
+    saved = llm_manager.providers, llm_manager.fallback_chain, llm_manager.response_cache
+    llm_manager.providers = {p.name: p for p in providers}
+    llm_manager.fallback_chain = []
+    llm_manager.response_cache = None
+    try:
+        yield llm_manager
+    finally:
+        llm_manager.providers, llm_manager.fallback_chain, llm_manager.response_cache = saved
+
+
+def fake_template_executor(
+    delays: Optional[Dict[str, float]] = None,
+    errors: Optional[Dict[str, str]] = None,
+    content: Optional[Callable[[str, str, Dict[str, Any]], str]] = None,
+    memo: Optional[ResultMemo] = None
+):
+    """A TemplateAgentExecutor whose agents answer without a model; returns it and the ids it ran.
+
+    Each agent sleeps for its entry in `delays`, then answers with
+    content(template_id, user_input, context), or "analysis", and fails
+    with its entry in `errors`. Results go into `memo`, a fresh in-memory
+    one by default.
+    """
+    executor = TemplateAgentExecutor()
+    executor.result_memo = memo or ResultMemo([MemoryCacheTier()])
+    calls: List[str] = []
+
+    async def execute_agent_template(template_id, user_input, context=None, llm_settings=None, on_token=None):
+        calls.append(template_id)
+        await asyncio.sleep((delays or {}).get(template_id, 0))
+        return AgentExecutionResult(
+            template_id=template_id, agent_name=template_id,
+            content=content(template_id, user_input, context or {}) if content else "analysis",
+            error=(errors or {}).get(template_id)
+        )
+
+    executor.execute_agent_template = execute_agent_template
+    return executor, calls
+
+
+@contextmanager
+def handler_session(session_id: str, executor: TemplateAgentExecutor, runner=None):
+    """A fresh session whose template handlers run on `executor`; yields the messages sent to it.
+
+    A SpeculativeRunner given as `runner` replaces the handlers' one as well.
+    """
+    sent = []
+
+    async def send_json_message(message, target):
+        if target == session_id:
+            sent.append(message)
+
+    saved = handlers.template_agent_executor, handlers.speculative_runner
+    handlers.template_agent_executor = executor
+    handlers.speculative_runner = runner or handlers.speculative_runner
+    manager.send_json_message = send_json_message
+    sessions[session_id] = create_session(session_id)
+    try:
+        yield sent
+    finally:
+        handlers.template_agent_executor, handlers.speculative_runner = saved
+        del manager.send_json_message
+        del sessions[session_id]
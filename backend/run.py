@@ -40,5 +40,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # Negotiates permessage-deflate with clients that offer it, compressing
+        # every frame; set WS_PER_MESSAGE_DEFLATE=false to trade bandwidth for CPU
+        ws_per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() != "false"
     )
\ No newline at end of file
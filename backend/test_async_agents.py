@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Load test: agent calls must not block the event loop for other sessions
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.agents.base import DesignAgent, StoriesAndQAAgent
+from app.agents import base as agents_base
+from app.agents.handoff_coordinator import HandoffDecision, WorkloadAssignment
+from app.llm.base_provider import LLMProvider, LLMResponse
+from app.models.agent_models import AgentResponse, AgentType
+from app.services.session_state import create_session
+from app.websocket.handlers import process_enhanced_multi_agent_workflow
+
+SIMULATED_LATENCY = 0.3
+
+
+class SlowFakeLLM:
+    """Stands in for llm_manager with a fixed network latency"""
+
+    async def generate(self, messages, model, **kwargs):
+        await asyncio.sleep(SIMULATED_LATENCY)
+        return LLMResponse(
+            content='{"agent_type": "ui_designer", "content": "ok", "suggestions": ["a"], "critique": null, "handoff_to": null, "prototype_update": {}}',
+            model_used=model,
+            provider=LLMProvider.OPENAI,
+            response_time=SIMULATED_LATENCY
+        )
+
+
+async def _run_concurrent_sessions(session_count: int):
+    ticks = 0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def session(i: int):
+        agent = DesignAgent(AgentType.UI_DESIGNER)
+        qa_agent = StoriesAndQAAgent(AgentType.QA_PLANNER)
+        response = await agent.process(f"request {i}", {}, "")
+        chat = await agent.direct_chat(f"hello {i}", "")
+        qa = await qa_agent.process_request(f"plan {i}", "", "")
+        return response, chat, qa
+
+    beat = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(session(i) for i in range(session_count)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await beat
+    return results, elapsed, ticks
+
+
+def test_concurrent_sessions_progress_in_parallel():
+    original = agents_base.llm_manager
+    agents_base.llm_manager = SlowFakeLLM()
+    try:
+        session_count = 10
+        results, elapsed, ticks = asyncio.run(_run_concurrent_sessions(session_count))
+    finally:
+        agents_base.llm_manager = original
+
+    serial_time = session_count * 3 * SIMULATED_LATENCY
+    print(f"{session_count} sessions finished in {elapsed:.2f}s (serial would be {serial_time:.2f}s), heartbeat ticks: {ticks}")
+
+    assert len(results) == session_count
+    assert all(response.content == "ok" for response, _, _ in results)
+    # Three sequential calls per session; sessions overlap instead of queueing
+    assert elapsed < 3 * SIMULATED_LATENCY + 0.5
+    # The loop kept servicing other work while the calls were in flight
+    assert ticks > 10
+
+
+class TimedAgent:
+    """Fake agent that records when it started and finished answering"""
+
+    def __init__(self, agent_type: AgentType, timeline: dict):
+        self.agent_type = agent_type
+        self.model = "gpt-4o-mini"
+        self.instructions = f"You are the {agent_type.value}."
+        self.timeline = timeline
+        self.contexts = []
+
+    async def process_enhanced(self, user_input, context, assignment):
+        self.timeline[self.agent_type] = [time.perf_counter(), None]
+        self.contexts.append(context)
+        await asyncio.sleep(SIMULATED_LATENCY)
+        self.timeline[self.agent_type][1] = time.perf_counter()
+        return AgentResponse(agent_type=self.agent_type, content=f"{self.agent_type.value} answer")
+
+
+class FixedCoordinator:
+    """Hands out a fixed set of assignments"""
+
+    def __init__(self, assignments):
+        self.assignments = assignments
+
+    def evaluate_handoff_needs(self, user_input, current_agent, recent_responses):
+        return HandoffDecision(AgentType.UI_DESIGNER, [], True, False, 1.0, "test")
+
+    def create_workload_assignments(self, decision, user_input):
+        return self.assignments
+
+    def create_enriched_context(self, agent_type, user_input, assignment, peers):
+        return f"ASSIGNMENT: {agent_type.value}"
+
+
+def test_workflow_runs_independent_agents_together_and_waits_for_dependencies():
+    timeline = {}
+    independent = [AgentType.UI_DESIGNER, AgentType.UX_RESEARCHER, AgentType.DEVELOPER]
+    assignments = [WorkloadAssignment(agent_type, 1, [], [], []) for agent_type in independent]
+    assignments.append(WorkloadAssignment(AgentType.PRODUCT_MANAGER, 2, [], [], [AgentType.UI_DESIGNER, AgentType.DEVELOPER]))
+
+    session = create_session("workflow-concurrency")
+    session["agents"] = {a.agent_type: TimedAgent(a.agent_type, timeline) for a in assignments}
+    session["handoff_coordinator"] = FixedCoordinator(assignments)
+
+    start = time.perf_counter()
+    responses = asyncio.run(process_enhanced_multi_agent_workflow("a todo app", session))
+    elapsed = time.perf_counter() - start
+
+    assert [r.agent_type for r in responses] == [a.agent_type for a in assignments]
+    # The three independent agents overlap instead of running one after another
+    latest_start = max(timeline[agent_type][0] for agent_type in independent)
+    earliest_end = min(timeline[agent_type][1] for agent_type in independent)
+    assert latest_start < earliest_end
+    # The product manager starts only after its dependencies and sees their answers
+    pm_start = timeline[AgentType.PRODUCT_MANAGER][0]
+    assert pm_start >= timeline[AgentType.UI_DESIGNER][1] and pm_start >= timeline[AgentType.DEVELOPER][1]
+    pm_context = session["agents"][AgentType.PRODUCT_MANAGER].contexts[0]
+    assert "ui_designer answer" in pm_context and "developer answer" in pm_context
+    assert "ux_researcher answer" not in pm_context
+    assert elapsed < 3 * SIMULATED_LATENCY
+    assert session["multi_agent_workflow"].agent_responses[-4:] == responses
+
+
+if __name__ == "__main__":
+    print("Testing async agent concurrency...")
+    print("=" * 50)
+    test_concurrent_sessions_progress_in_parallel()
+    test_workflow_runs_independent_agents_together_and_waits_for_dependencies()
+    print("\nAsync agent load test passed!")
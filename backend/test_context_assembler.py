@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for token-budgeted context assembly
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.llm.base_provider import LLMProvider
+from app.llm.llm_manager import DEFAULT_CONTEXT_LENGTH, LLMManager
+from app.llm.tokens import estimate_tokens, truncate_to_tokens
+from app.services.context_assembler import ContextAssembler, session_sections
+from app.services.session_state import create_session
+from app.services.template_agent_executor import template_agent_executor
+from fakes import FakeProvider, using_providers
+
+
+def _provider(name: LLMProvider, model_id: str, context_length: int) -> FakeProvider:
+    return FakeProvider(name, model_id, reply="You should consider a clearer layout.", context_length=context_length)
+
+
+def test_truncation_keeps_the_requested_end():
+    text = "".join(f"line {i}\n" for i in range(200))
+    head = truncate_to_tokens(text, 50, keep="head")
+    tail = truncate_to_tokens(text, 50, keep="tail")
+    assert head.startswith("line 0") and "line 199" not in head
+    assert tail.endswith("line 199\n") and "line 0\n" not in tail
+    assert estimate_tokens(head) <= 50 and estimate_tokens(tail) <= 50
+    assert truncate_to_tokens("short", 50) == "short"
+
+
+def test_everything_fits_keeps_every_section_whole():
+    session = create_session("fits")
+    session["history"].extend(["make a login form", "add a signup link"])
+    session["current_prototype"] = {"component": "form", "children": []}
+    session["prototype_versions"].commit(session["current_prototype"])
+    builder = session["context_builder"]
+
+    assembled = ContextAssembler(10000).extend(session_sections(builder)).assemble()
+    assert assembled.text == "\n".join([
+        f"CONVERSATION HISTORY:\n{builder.history()}\n",
+        f"CURRENT PROTOTYPE STATE:\n{builder.prototype()}\n"
+    ])
+    assert not assembled.truncated and not assembled.dropped
+
+
+def test_low_priority_sections_are_cut_first():
+    assembler = ContextAssembler(300)
+    assembler.add("history", "HISTORY:", "\n".join(f"message {i}" for i in range(200)), priority=3, keep="tail")
+    assembler.add("prototype", "PROTOTYPE:", "p" * 800, priority=1)
+    assembler.add("notes", "NOTES:", "n" * 2000, priority=5)
+    assembled = assembler.assemble()
+
+    assert assembled.tokens <= 300
+    assert assembled.sections["prototype"]["status"] == "kept"
+    assert assembled.truncated == ["history"] and assembled.dropped == ["notes"]
+    # Sections keep their insertion order and the newest history survives
+    assert assembled.text.index("HISTORY:") < assembled.text.index("PROTOTYPE:")
+    assert "message 199" in assembled.text and "message 0\n" not in assembled.text
+
+
+def test_budget_follows_the_model_window():
+    manager = LLMManager()
+    manager.providers = {
+        LLMProvider.KIMI: _provider(LLMProvider.KIMI, "moonshot-v1-8k", 8192),
+        LLMProvider.OPENAI: _provider(LLMProvider.OPENAI, "gpt-4o", 128000)
+    }
+    manager.router.groups = {"smart": ["gpt-4o", "moonshot-v1-8k"]}
+    manager.max_input_tokens = None
+
+    assert manager.context_length("gpt-4o") == 128000
+    assert manager.context_length("auto:smart") == 8192  # any member may serve the call
+    assert manager.context_length("unknown-model") == DEFAULT_CONTEXT_LENGTH
+    assert manager.input_token_budget("moonshot-v1-8k", max_tokens=1192) == 7000
+    assert manager.input_token_budget("gpt-4o", max_tokens=1000, cap=2000) == 2000
+    manager.max_input_tokens = 3000
+    assert manager.input_token_budget("gpt-4o") == 3000
+
+
+def test_executor_caps_input_tokens_per_agent():
+    provider = _provider(LLMProvider.OPENAI, "gpt-4o-mini", 128000)
+    with using_providers(provider):
+        session = create_session("capped")
+        session["history"].extend(f"request number {i} " * 20 for i in range(5))
+        session["current_prototype"] = {"component": "div", "children": [{"component": "p", "text": "x" * 20000}]}
+        session["prototype_versions"].commit(session["current_prototype"])
+        context = {"context_builder": session["context_builder"]}
+
+        uncapped = asyncio.run(template_agent_executor.execute_agent_template(
+            "ui_designer_default", "make it pop", context, {"model": "gpt-4o-mini", "use_cache": False}
+        ))
+        capped = asyncio.run(template_agent_executor.execute_agent_template(
+            "ui_designer_default", "make it pop", context,
+            {"model": "gpt-4o-mini", "use_cache": False, "max_input_tokens": {"ui_designer_default": 2500}}
+        ))
+
+    assert uncapped.input_tokens_estimate > 5000
+    assert capped.input_tokens_estimate <= 2500
+    # The prototype outranks the history, so it is cut down rather than left out
+    assert "CURRENT PROTOTYPE STATE:" in provider.prompts[-1]
+    assert "request number" not in provider.prompts[-1]
+    assert len(provider.prompts[-1]) < len(provider.prompts[0])
+
+
+if __name__ == "__main__":
+    print("Testing context assembler...")
+    print("=" * 50)
+    test_truncation_keeps_the_requested_end()
+    test_everything_fits_keeps_every_section_whole()
+    test_low_priority_sections_are_cut_first()
+    test_budget_follows_the_model_window()
+    test_executor_caps_input_tokens_per_agent()
+    print("\nAll context assembler tests passed!")
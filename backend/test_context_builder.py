@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached per-session context builder
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.core.serialization import dumps_pretty
+from app.services.context_assembler import ContextAssembler, session_sections
+from app.services.session_state import create_session
+
+
+def _session():
+    session = create_session("s1")
+    session["history"].extend(["make a login form", "add a signup link"])
+    prototype = {"component": "form", "children": [{"component": "input", "props": {"type": "email"}}]}
+    session["current_prototype"] = prototype
+    session["prototype_versions"].commit(prototype)
+    session["memory"].learn_from_change({}, {"props": {"style": {"color": "blue"}}}, "make it blue")
+    return session
+
+
+def _context(builder) -> str:
+    # How the handlers pack the session context when it fits
+    return ContextAssembler(10000).extend(session_sections(builder)).assemble().text
+
+
+def test_renders_the_same_context_as_before():
+    session = _session()
+    expected = "\n".join([
+        "CONVERSATION HISTORY:",
+        "1. make a login form",
+        "2. add a signup link",
+        "",
+        "CURRENT PROTOTYPE STATE:",
+        dumps_pretty(session["current_prototype"]),
+        "",
+        "LEARNED USER PREFERENCES:",
+        session["memory"].get_context_summary(),
+        ""
+    ])
+    assert _context(session["context_builder"]) == expected
+
+
+def test_fan_out_renders_each_section_once():
+    session = _session()
+    builder = session["context_builder"]
+    contexts = {_context(builder) for _ in range(10)}
+    assert len(contexts) == 1
+    # summary, history, prototype and preferences, each rendered once
+    assert builder.renders == 4 and builder.hits == 36
+
+
+def test_only_changed_sections_are_rendered_again():
+    session = _session()
+    builder = session["context_builder"]
+    _context(builder)
+    renders = builder.renders
+
+    new_prototype = {"component": "form", "children": []}
+    session["current_prototype"] = new_prototype
+    session["prototype_versions"].commit(new_prototype)
+    context = _context(builder)
+    assert builder.renders == renders + 1  # only the prototype
+    assert dumps_pretty(new_prototype) in context
+
+    session["history"].append("now add a footer")
+    assert "3. now add a footer" in _context(builder)
+    assert builder.renders == renders + 2
+
+
+def test_empty_session_has_no_context():
+    session = create_session("empty")
+    assert _context(session["context_builder"]) == ""
+    assert session["context_builder"].documents() == ""
+
+
+if __name__ == "__main__":
+    print("Testing context builder...")
+    print("=" * 50)
+    test_renders_the_same_context_as_before()
+    test_fan_out_renders_each_section_once()
+    test_only_changed_sections_are_rendered_again()
+    test_empty_session_has_no_context()
+    print("\nAll context builder tests passed!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for rolling conversation summaries
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.models.agent_models import AgentResponse, AgentType
+from app.services.context_assembler import ContextAssembler, session_sections
+from app.services.conversation_compactor import ConversationCompactor
+from app.services.session_state import create_session, restore_session, serialize_session
+from fakes import FakeProvider, using_providers
+
+
+def _provider(fail: bool = False, delay: float = 0.0) -> FakeProvider:
+    return FakeProvider(reply="Summary #{n}: a login flow", delay=delay, fail_status=400 if fail else None)
+
+
+def _with_provider(provider, run):
+    with using_providers(provider):
+        return run()
+
+
+def _long_session(requests: int = 15, responses: int = 40):
+    session = create_session("long")
+    session["history"].extend(f"request {i}" for i in range(requests))
+    session["multi_agent_workflow"].agent_responses.extend(
+        AgentResponse(agent_type=AgentType.UI_DESIGNER, content=f"feedback {i}") for i in range(responses)
+    )
+    return session
+
+
+def test_old_turns_are_folded_into_the_summary():
+    provider = _provider()
+    compactor = ConversationCompactor(max_history=12, keep_recent=5, max_responses=30, keep_responses=10)
+    session = _long_session()
+    assert compactor.needs_compaction(session)
+
+    assert _with_provider(provider, lambda: asyncio.run(compactor.compact(session)))
+    assert session["history"] == [f"request {i}" for i in range(10, 15)]
+    assert [r.content for r in session["multi_agent_workflow"].agent_responses] == [f"feedback {i}" for i in range(30, 40)]
+    shared_memory = session["shared_memory"]
+    assert shared_memory.conversation_summary == "Summary #1: a login flow"
+    assert (shared_memory.summarized_turns, shared_memory.summarized_responses) == (10, 30)
+    assert "request 9" in provider.prompts[0] and "request 10" not in provider.prompts[0]
+    assert not compactor.needs_compaction(session)
+
+    # The next compaction builds on the previous summary
+    session["history"].extend(f"request {i}" for i in range(15, 23))
+    _with_provider(provider, lambda: asyncio.run(compactor.compact(session)))
+    assert "Summary #1: a login flow" in provider.prompts[1]
+    assert shared_memory.summarized_turns == 18 and len(session["history"]) == 5
+
+
+def test_summary_reaches_the_prompt_context():
+    session = _long_session()
+    _with_provider(_provider(), lambda: asyncio.run(ConversationCompactor().compact(session)))
+    context = ContextAssembler(10000).extend(session_sections(session["context_builder"])).assemble().text
+    assert context.startswith("CONVERSATION SUMMARY:\nSummary #1: a login flow\n")
+    assert "1. request 10" in context
+
+    restored = restore_session(serialize_session(session))
+    assert restored["context_builder"].summary() == "Summary #1: a login flow"
+
+
+def test_failed_summary_keeps_the_turns():
+    compactor = ConversationCompactor()
+    session = _long_session()
+    assert not _with_provider(_provider(fail=True), lambda: asyncio.run(compactor.compact(session)))
+    assert len(session["history"]) == 15 and session["shared_memory"].conversation_summary == ""
+    assert compactor.failures == 1
+
+
+def test_schedule_runs_once_per_session_and_keeps_new_turns():
+    provider = _provider(delay=0.05)
+    compactor = ConversationCompactor()
+    session = _long_session()
+    saved = []
+
+    async def scenario():
+        first = compactor.schedule("long", session, on_done=saved.append)
+        assert compactor.schedule("long", session) is None  # already running
+        await asyncio.sleep(0.01)  # the summary call is now in flight
+        session["history"].append("arrived during the call")
+        await first
+
+    _with_provider(provider, lambda: asyncio.run(scenario()))
+    assert len(provider.prompts) == 1 and saved == ["long"]
+    assert session["history"][-1] == "arrived during the call"
+    assert session["history"][0] == "request 10"
+    assert compactor.schedule("long", session) is None  # short again
+
+
+if __name__ == "__main__":
+    print("Testing conversation compactor...")
+    print("=" * 50)
+    test_old_turns_are_folded_into_the_summary()
+    test_summary_reaches_the_prompt_context()
+    test_failed_summary_keeps_the_turns()
+    test_schedule_runs_once_per_session_and_keeps_new_turns()
+    print("\nAll conversation compactor tests passed!")
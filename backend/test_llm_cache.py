@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM response cache and in-flight request coalescing
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.llm.base_provider import LLMProvider, LLMMessage, LLMResponse
+from app.llm.response_cache import ResponseCache, MemoryCacheTier, DiskCacheTier
+from fakes import FakeProvider, fake_manager
+
+
+def test_repeated_requests_hit_cache():
+    provider = FakeProvider(model_id="fake-model", context_length=4096)
+    manager = fake_manager(provider, cache=ResponseCache([MemoryCacheTier(max_entries=10)]))
+    messages = [LLMMessage(role="user", content="hello")]
+
+    async def run():
+        first = await manager.generate(messages, model="fake-model", temperature=0.2)
+        second = await manager.generate(messages, model="fake-model", temperature=0.2)
+        other_temperature = await manager.generate(messages, model="fake-model", temperature=0.9)
+        bypassed = await manager.generate(messages, model="fake-model", temperature=0.2, use_cache=False)
+        return first, second, other_temperature, bypassed
+
+    first, second, other_temperature, bypassed = asyncio.run(run())
+
+    assert not first.cached
+    assert second.cached and second.content == first.content
+    assert not other_temperature.cached
+    assert not bypassed.cached
+    assert provider.calls == 3
+    stats = manager.get_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    print(f"Cache stats: {stats}")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryCacheTier(max_entries=2)
+    tier.set("a", {"v": 1}, ttl=60)
+    tier.set("b", {"v": 2}, ttl=60)
+    tier.get("a")
+    tier.set("c", {"v": 3}, ttl=60)
+    assert tier.get("b") is None
+    assert tier.get("a") == {"v": 1}
+
+    tier.set("expired", {"v": 4}, ttl=-1)
+    assert tier.get("expired") is None
+
+
+def test_disk_tier_survives_new_cache_instance():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        response = LLMResponse(content="persisted", model_used="fake-model", provider=LLMProvider.OPENAI)
+        asyncio.run(ResponseCache([MemoryCacheTier(), DiskCacheTier(cache_dir)]).set("key", response))
+
+        fresh = ResponseCache([MemoryCacheTier(), DiskCacheTier(cache_dir)])
+        hit = asyncio.run(fresh.get("key"))
+        assert hit is not None and hit.content == "persisted" and hit.cached
+        assert fresh.get_stats()["tiers"]["disk"]["hits"] == 1
+        # Promoted into the memory tier on the way back up
+        assert fresh.tiers[0].get("key") is not None
+
+
+def test_disk_tier_counts_entries_and_evicts_the_oldest():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        tier = DiskCacheTier(cache_dir, max_entries=10)
+        for i in range(10):
+            tier.set(f"k{i}", {"v": i}, ttl=60)
+            os.utime(tier._path(f"k{i}"), (i, i))
+        tier.set("k0", {"v": 0}, ttl=60)  # overwriting does not add an entry
+        os.utime(tier._path("k0"), (0, 0))
+        assert tier.size() == 10
+
+        asyncio.run(tier.aset("k10", {"v": 10}, ttl=60))
+        # Overflow trims to 90% of the limit, oldest first
+        assert tier.size() == 9 == len(os.listdir(cache_dir))
+        assert tier.get("k0") is None and tier.get("k1") is None
+        assert asyncio.run(tier.aget("k10")) == {"v": 10}
+        assert DiskCacheTier(cache_dir, max_entries=10).size() == 9
+
+
+def test_concurrent_identical_requests_share_one_call():
+    provider = FakeProvider(model_id="fake-model", context_length=4096, delay=0.2)
+    # No cache tier, so only in-flight coalescing can save calls
+    manager = fake_manager(provider)
+    messages = [LLMMessage(role="user", content="burst")]
+
+    async def run():
+        return await asyncio.gather(*(
+            manager.generate(messages, model="fake-model", temperature=0.5) for _ in range(5)
+        ))
+
+    responses = asyncio.run(run())
+    assert provider.calls == 1
+    assert len({r.content for r in responses}) == 1
+    # Followers get their own copy of the leader's response
+    assert len({id(r) for r in responses}) == 5
+    stats = manager.single_flight.get_stats()
+    assert stats == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+
+def test_shared_call_survives_one_cancelled_caller():
+    provider = FakeProvider(model_id="fake-model", context_length=4096, delay=0.2)
+    manager = fake_manager(provider)
+    messages = [LLMMessage(role="user", content="cancel me")]
+
+    async def run():
+        leader = asyncio.create_task(manager.generate(messages, model="fake-model"))
+        follower = asyncio.create_task(manager.generate(messages, model="fake-model"))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        result = await follower
+        return leader, result
+
+    leader, result = asyncio.run(run())
+    assert leader.cancelled()
+    assert result.content.startswith("answer #1")
+    assert provider.calls == 1
+
+
+if __name__ == "__main__":
+    print("Testing LLM response cache...")
+    print("=" * 50)
+    test_repeated_requests_hit_cache()
+    test_memory_tier_evicts_least_recently_used()
+    test_disk_tier_survives_new_cache_instance()
+    test_disk_tier_counts_entries_and_evicts_the_oldest()
+    test_concurrent_identical_requests_share_one_call()
+    test_shared_call_survives_one_cancelled_caller()
+    print("\nAll LLM cache tests passed!")
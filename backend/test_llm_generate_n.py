@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-candidate generation
+"""
+
+import asyncio
+import os
+import sys
+from typing import Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.llm.base_provider import LLMProvider, LLMMessage
+from app.services.template_agent_executor import template_agent_executor
+from fakes import FakeProvider, fake_manager, using_providers
+
+
+def _provider(name: LLMProvider, model_id: str, multi: bool, fail_status: Optional[int] = None) -> FakeProvider:
+    return FakeProvider(name, model_id, reply="take {n}", multi=multi, tokens_used=10, fail_status=fail_status)
+
+
+def test_one_request_for_all_candidates():
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o", multi=True)
+    manager = fake_manager(openai, retry_attempts=1)
+    responses = asyncio.run(manager.generate_n([LLMMessage(role="user", content="hi")], model="gpt-4o", n=5))
+    assert [r.content for r in responses] == [f"choice {i}" for i in range(5)]
+    assert openai.requests == [("gpt-4o", 5)]
+    # One request for five candidates says nothing about a single completion's latency
+    assert manager.metrics.get("openai", "gpt-4o").sample_count() == 0
+
+
+def test_parallel_calls_without_native_support():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", multi=False)
+    manager = fake_manager(deepseek, retry_attempts=1)
+    responses = asyncio.run(manager.generate_n([LLMMessage(role="user", content="hi")], model="deepseek-chat", n=3))
+    assert len(responses) == 3 and deepseek.requests == [("deepseek-chat", 1)] * 3
+
+
+def test_candidates_fall_back_to_the_next_provider():
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o", multi=True, fail_status=503)
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", multi=False)
+    manager = fake_manager(openai, deepseek, fallback_chain=[(LLMProvider.DEEPSEEK, "deepseek-chat")],
+                           retry_attempts=1)
+    responses = asyncio.run(manager.generate_n([LLMMessage(role="user", content="hi")], model="gpt-4o", n=2))
+    assert [r.provider for r in responses] == [LLMProvider.DEEPSEEK] * 2
+
+
+def test_a_failed_parallel_call_cancels_the_others():
+    deepseek = FakeProvider(LLMProvider.DEEPSEEK, "deepseek-chat", delays=[0, 0.3, 0.3], failures=[503])
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o-mini", multi=True)
+    manager = fake_manager(deepseek, openai, fallback_chain=[(LLMProvider.OPENAI, "gpt-4o-mini")],
+                           retry_attempts=1)
+
+    async def run():
+        responses = await manager.generate_n([LLMMessage(role="user", content="hi")], model="deepseek-chat", n=3)
+        await asyncio.sleep(0.4)
+        return responses
+
+    responses = asyncio.run(run())
+    assert [r.provider for r in responses] == [LLMProvider.OPENAI] * 3
+    # The two slower calls never finished, so only the failure was recorded
+    assert manager.metrics.get("deepseek", "deepseek-chat").sample_count() == 1
+
+
+def test_rerun_agent_uses_the_selected_model_in_one_call():
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o", multi=True)
+    with using_providers(openai):
+        result = asyncio.run(template_agent_executor.execute_agent_template(
+            "rerun_default", "a budgeting app", {}, {"model": "gpt-4o"}
+        ))
+    assert openai.requests == [("gpt-4o", 5)]
+    assert len(result.rerun_results) == 5 and result.rerun_results[4].startswith("Analysis #5:")
+    assert result.error is None
+
+
+if __name__ == "__main__":
+    print("Testing multi-candidate generation...")
+    print("=" * 50)
+    test_one_request_for_all_candidates()
+    test_parallel_calls_without_native_support()
+    test_candidates_fall_back_to_the_next_provider()
+    test_a_failed_parallel_call_cancels_the_others()
+    test_rerun_agent_uses_the_selected_model_in_one_call()
+    print("\nAll multi-candidate tests passed!")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test script for LLM retries, hedging, circuit breaking, fallback and routing
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.llm.base_provider import LLMProvider, LLMMessage, LLMProviderError
+from app.llm.llm_manager import LLMManager
+from app.llm.resilience import CircuitBreaker, HedgePolicy, hedged_call
+from app.llm.router import RoutingPolicy
+from app.llm.scheduler import ProviderScheduler
+from fakes import FakeProvider, fake_manager
+
+
+def _provider(name: LLMProvider, model_id: str, **kwargs) -> FakeProvider:
+    return FakeProvider(name, model_id, reply="from {provider}", context_length=4096, **kwargs)
+
+
+def test_retryable_errors_are_retried():
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o-mini", failures=[429, 503])
+    manager = fake_manager(openai)
+    response = asyncio.run(manager.generate([LLMMessage(role="user", content="hi")], model="gpt-4o-mini"))
+    assert response.content == "from openai"
+    assert openai.calls == 3
+
+
+def test_client_errors_are_not_retried():
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o-mini", failures=[400])
+    manager = fake_manager(openai)
+    try:
+        asyncio.run(manager.generate([LLMMessage(role="user", content="hi")], model="gpt-4o-mini"))
+        assert False, "expected LLMProviderError"
+    except LLMProviderError as e:
+        assert e.status_code == 400
+    assert openai.calls == 1
+
+
+def test_bad_requests_do_not_fall_back():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", failures=[400])
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o-mini")
+    manager = fake_manager(deepseek, openai, fallback_chain=[(LLMProvider.OPENAI, "gpt-4o-mini")])
+    messages = [LLMMessage(role="user", content="hi")]
+    try:
+        asyncio.run(manager.generate(messages, model="deepseek-chat"))
+        assert False, "expected LLMProviderError"
+    except LLMProviderError as e:
+        assert e.status_code == 400
+    try:
+        asyncio.run(manager.generate(messages, model="no-such-model"))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert openai.calls == 0
+
+
+def test_failing_provider_falls_back_and_trips_breaker():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", failures=[500] * 20)
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o-mini")
+    manager = fake_manager(deepseek, openai, fallback_chain=[(LLMProvider.OPENAI, "gpt-4o-mini")])
+    manager.breakers[LLMProvider.DEEPSEEK] = CircuitBreaker("deepseek", failure_threshold=3, recovery_timeout=60)
+
+    async def run():
+        results = []
+        for i in range(3):
+            results.append(await manager.generate(
+                [LLMMessage(role="user", content=f"hi {i}")], model="deepseek-chat", provider=LLMProvider.DEEPSEEK
+            ))
+        return results
+
+    results = asyncio.run(run())
+    assert all(r.provider == LLMProvider.OPENAI for r in results)
+    # Three failed attempts open the breaker; later calls skip DeepSeek entirely
+    assert deepseek.calls == 3
+    assert manager.breakers[LLMProvider.DEEPSEEK].state == CircuitBreaker.OPEN
+
+
+def test_stream_retries_before_first_chunk():
+    openai = _provider(LLMProvider.OPENAI, "gpt-4o-mini", tokens=["hello", " ", "world"], failures=[502])
+    manager = fake_manager(openai)
+
+    async def run():
+        return [chunk async for chunk in manager.stream_generate(
+            [LLMMessage(role="user", content="hi")], model="gpt-4o-mini"
+        )]
+
+    assert "".join(asyncio.run(run())) == "hello world"
+
+
+def test_hedged_call_returns_faster_duplicate():
+    delays = [1.0, 0.05]
+
+    async def call():
+        await asyncio.sleep(delays.pop(0))
+        return "done"
+
+    async def run():
+        start = time.monotonic()
+        result = await hedged_call(call, hedge_delay=0.05)
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "done"
+    assert elapsed < 0.5
+
+
+def test_hedge_policy_waits_for_enough_samples():
+    manager = fake_manager(_provider(LLMProvider.OPENAI, "gpt-4o-mini"))
+    policy = HedgePolicy(enabled=True, percentile=0.9, min_samples=5, min_delay=0.1)
+    stats = manager.metrics.get("openai", "gpt-4o-mini")
+    assert policy.delay_for(stats) is None
+    for latency in [0.2, 0.3, 0.4, 0.5, 2.0]:
+        stats.record(latency, True)
+    assert policy.delay_for(stats) == 0.5
+
+
+def _routing_manager(*providers: FakeProvider) -> LLMManager:
+    manager = fake_manager(*providers)
+    manager.router.groups = {"fast": [p.model_id for p in providers]}
+    manager.router.default_group = "fast"
+    return manager
+
+
+def _record(manager: LLMManager, provider: FakeProvider, latency: float, count: int = 10):
+    for _ in range(count):
+        manager.metrics.record(provider.name.value, provider.model_id, latency, True)
+
+
+def test_routing_picks_cheapest_model_under_latency_limit():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", cost_per_token=0.000001)
+    kimi = _provider(LLMProvider.KIMI, "moonshot-v1-8k", cost_per_token=0.000005)
+    manager = _routing_manager(deepseek, kimi)
+    _record(manager, deepseek, 5.0)
+    _record(manager, kimi, 1.0)
+    messages = [LLMMessage(role="user", content="hi")]
+
+    cheapest = asyncio.run(manager.generate(messages, model="auto", use_cache=False))
+    assert cheapest.provider == LLMProvider.DEEPSEEK
+
+    policy = RoutingPolicy(objective="cost", max_p95=3.0)
+    fast_enough = asyncio.run(manager.generate(messages, model="auto", use_cache=False, routing_policy=policy))
+    assert fast_enough.provider == LLMProvider.KIMI
+
+
+def test_routing_skips_open_breaker():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", cost_per_token=0.000001)
+    kimi = _provider(LLMProvider.KIMI, "moonshot-v1-8k", cost_per_token=0.000005)
+    manager = _routing_manager(deepseek, kimi)
+    breaker = CircuitBreaker("deepseek", failure_threshold=1, recovery_timeout=60)
+    breaker.record_failure()
+    manager.breakers[LLMProvider.DEEPSEEK] = breaker
+
+    response = asyncio.run(manager.generate([LLMMessage(role="user", content="hi")], model="auto:fast"))
+    assert response.provider == LLMProvider.KIMI
+    assert deepseek.calls == 0
+
+
+def test_routing_counts_the_candidate_that_serves_the_call():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", failures=[500] * 3, cost_per_token=0.000001)
+    kimi = _provider(LLMProvider.KIMI, "moonshot-v1-8k", cost_per_token=0.000005)
+    manager = _routing_manager(deepseek, kimi)
+    events = []
+    begin, end = manager.router.begin, manager.router.end
+    manager.router.begin = lambda target: events.append(("begin", target[1])) or begin(target)
+    manager.router.end = lambda target: events.append(("end", target[1])) or end(target)
+
+    response = asyncio.run(manager.generate([LLMMessage(role="user", content="hi")], model="auto"))
+    assert response.provider == LLMProvider.KIMI
+    # The count moves off DeepSeek as soon as it has failed
+    assert events == [
+        ("begin", "deepseek-chat"), ("end", "deepseek-chat"), ("begin", "moonshot-v1-8k"), ("end", "moonshot-v1-8k")
+    ]
+    assert manager.router.get_stats()["outstanding"] == {}
+
+
+def test_routing_spreads_fan_out_across_providers():
+    deepseek = _provider(LLMProvider.DEEPSEEK, "deepseek-chat", delays=[0.05] * 4)
+    kimi = _provider(LLMProvider.KIMI, "moonshot-v1-8k", delays=[0.05] * 4)
+    manager = _routing_manager(deepseek, kimi)
+    manager.schedulers = {p.name: ProviderScheduler(p.name.value, max_in_flight=1) for p in (deepseek, kimi)}
+    _record(manager, deepseek, 1.0)
+    _record(manager, kimi, 1.5)
+    policy = RoutingPolicy(objective="latency")
+
+    async def run():
+        return await asyncio.gather(*(
+            manager.generate([LLMMessage(role="user", content=f"task {i}")], model="auto", routing_policy=policy)
+            for i in range(2)
+        ))
+
+    responses = asyncio.run(run())
+    assert {r.provider for r in responses} == {LLMProvider.DEEPSEEK, LLMProvider.KIMI}
+    assert manager.router.get_stats()["outstanding"] == {}
+
+
+if __name__ == "__main__":
+    print("Testing LLM resilience layer...")
+    print("=" * 50)
+    test_retryable_errors_are_retried()
+    test_client_errors_are_not_retried()
+    test_bad_requests_do_not_fall_back()
+    test_failing_provider_falls_back_and_trips_breaker()
+    test_stream_retries_before_first_chunk()
+    test_hedged_call_returns_faster_duplicate()
+    test_hedge_policy_waits_for_enough_samples()
+    test_routing_picks_cheapest_model_under_latency_limit()
+    test_routing_skips_open_breaker()
+    test_routing_counts_the_candidate_that_serves_the_call()
+    test_routing_spreads_fan_out_across_providers()
+    print("\nAll resilience tests passed!")
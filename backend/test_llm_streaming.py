@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for token streaming from LLM providers to clients
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.api import llm_providers
+from app.llm.base_provider import LLMProvider, LLMMessage, LLMProviderError
+from app.llm.llm_manager import LLMManager
+from app.llm.response_cache import ResponseCache, MemoryCacheTier
+from fakes import FakeProvider, fake_manager
+
+
+def _manager(provider: FakeProvider) -> LLMManager:
+    return fake_manager(provider, cache=ResponseCache([MemoryCacheTier(max_entries=10)], ttl=60))
+
+
+def test_generate_streaming_forwards_deltas_and_caches():
+    provider = FakeProvider(tokens=["{", '"component"', ": ", '"div"', "}"])
+    manager = _manager(provider)
+    messages = [LLMMessage(role="user", content="make a div")]
+    deltas = []
+
+    async def on_token(delta: str):
+        deltas.append(delta)
+
+    async def run():
+        first = await manager.generate_streaming(messages, model="gpt-4o-mini", on_token=on_token)
+        second = await manager.generate_streaming(messages, model="gpt-4o-mini", on_token=on_token)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert deltas[:5] == provider.tokens
+    assert first.content == '{"component": "div"}' and first.provider == LLMProvider.OPENAI
+    # The repeat is a cache hit delivered as a single delta
+    assert second.cached and deltas[5] == first.content
+    assert provider.stream_calls == 1
+
+
+def test_raising_callback_stops_the_stream():
+    provider = FakeProvider(tokens=["not json"] + ["..."] * 100)
+    manager = _manager(provider)
+
+    async def on_token(delta: str):
+        raise ValueError("malformed output")
+
+    async def run():
+        await manager.generate_streaming([LLMMessage(role="user", content="hi")], model="gpt-4o-mini", on_token=on_token)
+
+    try:
+        asyncio.run(run())
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert provider.tokens_sent == 1 and provider.closed
+
+
+def test_streams_feed_latency_and_error_metrics():
+    provider = FakeProvider(tokens=["a", "b"])
+    manager = _manager(provider)
+    messages = [LLMMessage(role="user", content="measure me")]
+
+    async def on_token(delta: str):
+        pass
+
+    asyncio.run(manager.generate_streaming(messages, model="gpt-4o-mini", on_token=on_token, use_cache=False))
+    provider.fail_status = 400
+    try:
+        asyncio.run(manager.generate_streaming(messages, model="gpt-4o-mini", on_token=on_token, use_cache=False))
+        assert False, "expected LLMProviderError"
+    except LLMProviderError:
+        pass
+
+    stats = manager.metrics.get("openai", "gpt-4o-mini")
+    assert stats.sample_count() == 2 and stats.error_rate() == 0.5
+    assert stats.percentile(0.5) is not None
+
+
+def test_chat_endpoint_streams_server_sent_events():
+    provider = FakeProvider(tokens=["Hello", " there"])
+    manager = _manager(provider)
+    original_manager = llm_providers.llm_manager
+    llm_providers.llm_manager = manager
+
+    async def run():
+        request = llm_providers.ChatRequest(
+            messages=[{"role": "user", "content": "hi"}],
+            model="gpt-4o-mini",
+            stream=True,
+            use_cache=False
+        )
+        response = await llm_providers.chat_completion(request)
+        body = "".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    try:
+        response, body = asyncio.run(run())
+    finally:
+        llm_providers.llm_manager = original_manager
+
+    assert response.media_type == "text/event-stream"
+    events = []
+    for block in body.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+
+    assert events[:2] == [("token", {"delta": "Hello"}), ("token", {"delta": " there"})]
+    assert events[-1][0] == "done" and events[-1][1]["content"] == "Hello there"
+
+
+if __name__ == "__main__":
+    print("Testing LLM token streaming...")
+    print("=" * 50)
+    test_generate_streaming_forwards_deltas_and_caches()
+    test_raising_callback_stops_the_stream()
+    test_streams_feed_latency_and_error_metrics()
+    test_chat_endpoint_streams_server_sent_events()
+    print("\nAll streaming tests passed!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for cross-worker WebSocket delivery over the message bus
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.websocket.manager import ConnectionManager
+from app.websocket.message_bus import InProcessMessageBus, RedisMessageBus
+from fakes import FakeWebSocket
+
+
+def test_in_process_bus_delivers_locally():
+    async def run():
+        manager = ConnectionManager(InProcessMessageBus())
+        await manager.start()
+        socket = FakeWebSocket()
+        await manager.connect(socket, "s1")
+        await manager.send_json_message({"type": "prototype"}, "s1")
+        await manager.send_personal_message("hello", "s1")
+        # Unknown sessions are dropped, as before
+        await manager.send_json_message({"type": "lost"}, "nobody")
+        await manager.stop()
+        return socket.sent
+
+    assert asyncio.run(run()) == [{"type": "prototype"}, "hello"]
+
+
+def test_redis_bus_reaches_socket_on_another_worker():
+    import fakeredis
+
+    async def run():
+        server = fakeredis.FakeServer()
+        worker_a = ConnectionManager(RedisMessageBus(fakeredis.FakeAsyncRedis(server=server, decode_responses=True)))
+        worker_b = ConnectionManager(RedisMessageBus(fakeredis.FakeAsyncRedis(server=server, decode_responses=True)))
+        await worker_a.start()
+        await worker_b.start()
+
+        socket = FakeWebSocket()
+        await worker_b.connect(socket, "s1")
+
+        # A background job on worker A reports progress for a client on worker B
+        await worker_a.send_json_message({"type": "pipeline_progress", "data": {"status": "merging"}}, "s1")
+        await worker_a.send_personal_message("done", "s1")
+        for _ in range(50):
+            if len(socket.sent) == 2:
+                break
+            await asyncio.sleep(0.02)
+
+        stats = (worker_a.bus.published, worker_b.bus.delivered)
+        await worker_a.stop()
+        await worker_b.stop()
+        return socket.sent, stats
+
+    sent, (published, delivered) = asyncio.run(run())
+    assert sent == [{"type": "pipeline_progress", "data": {"status": "merging"}}, "done"]
+    assert published == 2 and delivered == 2
+
+
+if __name__ == "__main__":
+    print("Testing WebSocket message bus...")
+    print("=" * 50)
+    test_in_process_bus_delivers_locally()
+    test_redis_bus_reaches_socket_on_another_worker()
+    print("\nAll message bus tests passed!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for versioned prototype patches
+"""
+
+import copy
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.core.serialization import dumps
+from app.prototype.delta import PatchError, PrototypeVersions, apply_patch, diff
+from app.services.session_state import create_session, restore_session, serialize_session
+
+
+def _screen(name: str, fields: int = 20):
+    return {
+        "component": "form",
+        "props": {"className": "p-4 space-y-2", "data-screen": name},
+        "children": [
+            {"component": "input", "props": {"placeholder": f"{name} field {i}", "className": "border p-2"}}
+            for i in range(fields)
+        ]
+    }
+
+
+def _app(screens):
+    return {"component": "div", "props": {"className": "app"}, "children": [_screen(name) for name in screens]}
+
+
+def test_patch_round_trips():
+    old = _app(["login", "signup", "profile", "settings"])
+    cases = []
+
+    recolored = copy.deepcopy(old)
+    recolored["children"][2]["props"]["className"] = "p-4 bg-blue-50"
+    cases.append(recolored)
+
+    inserted = copy.deepcopy(old)
+    inserted["children"].insert(1, _screen("reset password"))
+    cases.append(inserted)
+
+    removed = copy.deepcopy(old)
+    del removed["children"][0]["children"][3:6]
+    removed["props"].pop("className")
+    removed["text"] = "Welcome ~/ back"
+    cases.append(removed)
+
+    cases.append({"component": "p", "text": "regenerated"})
+
+    for new in cases:
+        ops = diff(old, new)
+        assert apply_patch(old, ops) == new
+    assert old == _app(["login", "signup", "profile", "settings"])  # never edited in place
+
+
+def test_small_edit_costs_far_less_than_the_tree():
+    old = _app(["login", "signup", "profile", "settings", "billing", "reports"])
+    new = copy.deepcopy(old)
+    new["children"][4]["children"][7]["props"]["placeholder"] = "Card number"
+    ops = diff(old, new)
+    assert ops == [{"op": "replace", "path": "/children/4/children/7/props/placeholder", "value": "Card number"}]
+    assert len(dumps(ops)) * 50 < len(dumps(new))
+
+
+def test_bad_patch_is_rejected():
+    try:
+        apply_patch({"children": []}, [{"op": "replace", "path": "/children/3", "value": 1}])
+        assert False, "expected PatchError"
+    except PatchError:
+        pass
+
+
+def test_versions_send_patches_only_after_an_ack():
+    versions = PrototypeVersions()
+    v1 = _app(["login"])
+    versions.commit(v1)
+    first = versions.update_message()
+    assert first == {"type": "prototype", "data": v1, "version": 1}  # legacy clients keep working
+
+    assert versions.ack(1)
+    v2 = copy.deepcopy(v1)
+    v2["children"][0]["props"]["className"] = "p-8"
+    versions.commit(v2)
+    patch = versions.update_message()
+    assert patch["type"] == "prototype_patch"
+    assert patch["data"]["base_version"] == 1 and patch["data"]["version"] == 2
+    assert apply_patch(v1, patch["data"]["ops"]) == v2
+
+    # A wholesale regeneration is cheaper to send in full
+    versions.ack(2)
+    versions.commit({"component": "p", "text": "new"})
+    assert versions.update_message()["type"] == "prototype"
+
+    # Versions that fell out of the history force a resync
+    assert not versions.ack(99) and not versions.client_supports_patches
+
+
+def test_version_survives_session_restore():
+    session = create_session("s1")
+    session["prototype_versions"].commit({"component": "div"})
+    session["current_prototype"] = {"component": "div"}
+    restored = restore_session(serialize_session(session))
+    versions = restored["prototype_versions"]
+    assert versions.version == 1
+    # The restored client can acknowledge the version it already holds
+    assert versions.ack(1)
+    assert versions.full_message()["data"] == {"component": "div"}
+
+
+if __name__ == "__main__":
+    print("Testing prototype deltas...")
+    print("=" * 50)
+    test_patch_round_trips()
+    test_small_edit_costs_far_less_than_the_tree()
+    test_bad_patch_is_rejected()
+    test_versions_send_patches_only_after_an_ack()
+    test_version_survives_session_restore()
+    print("\nAll prototype delta tests passed!")
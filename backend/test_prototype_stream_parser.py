@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental prototype JSON parser
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.prototype.stream_parser import PrototypeStreamParser, PrototypeStreamError, parse_prototype
+
+PROTOTYPE = {
+    "component": "div",
+    "props": {"className": "p-6"},
+    "children": [
+        {"component": "h1", "props": {"className": "text-3xl"}, "text": "Title with {braces} and \"quotes\""},
+        {
+            "component": "form",
+            "props": {},
+            "children": [
+                {"component": "input", "props": {"placeholder": "Email", "required": True}},
+                {"component": "button", "props": {"type": "submit"}, "text": "Send"}
+            ]
+        }
+    ]
+}
+
+
+def _stream(text: str, size: int = 3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_completed_subtrees_are_emitted_in_order():
+    parser = PrototypeStreamParser()
+    response = "```json\n" + json.dumps(PROTOTYPE, indent=2) + "\n```"
+    events = []
+    for chunk in _stream(response):
+        events.extend(parser.feed(chunk))
+
+    assert [event["path"] for event in events] == [[0], [1, 0], [1, 1], [1]]
+    assert events[0]["node"] == PROTOTYPE["children"][0]
+    assert events[-1]["node"] == PROTOTYPE["children"][1]
+    assert parser.close() == PROTOTYPE
+
+
+def test_emit_depth_limits_nested_events():
+    parser = PrototypeStreamParser(emit_depth=1)
+    events = parser.feed(json.dumps(PROTOTYPE))
+    assert [event["path"] for event in events] == [[0], [1]]
+
+
+def test_malformed_output_is_rejected_early():
+    parser = PrototypeStreamParser()
+    parser.feed('{"component": "div", "children": [')
+    try:
+        parser.feed("{component: div}")
+        assert False, "expected PrototypeStreamError"
+    except PrototypeStreamError:
+        pass
+
+
+def test_prose_instead_of_json_is_rejected():
+    parser = PrototypeStreamParser(max_preamble=50)
+    try:
+        for chunk in _stream("I'm sorry, but I can't help with designing that interface. " * 3):
+            parser.feed(chunk)
+        assert False, "expected PrototypeStreamError"
+    except PrototypeStreamError:
+        pass
+
+
+def test_truncated_response_fails_on_close():
+    text = json.dumps(PROTOTYPE)
+    try:
+        parse_prototype(text[:len(text) // 2])
+        assert False, "expected PrototypeStreamError"
+    except PrototypeStreamError:
+        pass
+    assert parse_prototype("Here you go:\n" + text + "\nEnjoy!") == PROTOTYPE
+
+
+if __name__ == "__main__":
+    print("Testing prototype stream parser...")
+    print("=" * 50)
+    test_completed_subtrees_are_emitted_in_order()
+    test_emit_depth_limits_nested_events()
+    test_malformed_output_is_rejected_early()
+    test_prose_instead_of_json_is_rejected()
+    test_truncated_response_fails_on_close()
+    print("\nAll stream parser tests passed!")
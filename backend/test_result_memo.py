@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for memoized template agent results
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.llm.response_cache import DiskCacheTier, MemoryCacheTier
+from app.models.agent_templates import AgentExecutionResult
+from app.services.agent_template_service import agent_template_service
+from app.services.result_memo import ResultMemo
+from app.services.session_state import create_session
+from app.state import sessions
+from app.websocket import handlers
+from fakes import fake_template_executor, handler_session
+
+CHAIN = ["ui_designer_default", "ux_researcher_default", "synthesizer_default", "prd_creator_default"]
+
+
+def _answer(template_id, user_input, context):
+    # The answer depends on the template's prompt, like a real completion would
+    return f"{user_input}: {hash(agent_template_service.get_template(template_id).prompt)}"
+
+
+def _run(executor, user_input="a todo app", llm_settings=None):
+    return asyncio.run(executor.execute_multiple_templates(CHAIN, user_input, {}, llm_settings))
+
+
+def test_unchanged_graph_is_served_from_the_memo():
+    executor, calls = fake_template_executor(content=_answer)
+    first = _run(executor)
+    assert sorted(calls) == sorted(CHAIN) and not any(r.memoized for r in first)
+
+    calls.clear()
+    second = _run(executor)
+    assert calls == [] and all(r.memoized for r in second)
+    assert [r.content for r in second] == [r.content for r in first]
+
+    # Another input, or an explicit bypass, runs everything again
+    calls.clear()
+    _run(executor, user_input="a chat app")
+    assert len(calls) == 4
+    calls.clear()
+    _run(executor, llm_settings={"use_cache": False})
+    assert len(calls) == 4
+
+
+def test_editing_a_template_reruns_it_and_its_dependents_only():
+    executor, calls = fake_template_executor(content=_answer)
+    _run(executor)
+
+    synthesizer = agent_template_service.get_template("synthesizer_default")
+    original = synthesizer.prompt
+    synthesizer.prompt = original + "\nAlso rank the risks."
+    try:
+        calls.clear()
+        _run(executor)
+    finally:
+        synthesizer.prompt = original
+    assert calls == ["synthesizer_default", "prd_creator_default"]
+
+
+def test_failures_are_not_memoized_and_disk_entries_persist():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        memo = ResultMemo([MemoryCacheTier(), DiskCacheTier(cache_dir)])
+        template = agent_template_service.get_template("ui_designer_default")
+        failed = AgentExecutionResult(template_id=template.id, agent_name="UI", content="x", error="timeout")
+        key = ResultMemo.make_key(template, "a todo app", [])
+        memo.set(key, failed)
+        assert memo.get(key) is None
+
+        memo.set(key, AgentExecutionResult(template_id=template.id, agent_name="UI", content="fine"))
+        restarted = ResultMemo([MemoryCacheTier(), DiskCacheTier(cache_dir)])
+        assert restarted.get(key).content == "fine"
+        assert ResultMemo.make_key(template, "a todo app", [], {"stream": True}) == key
+        assert ResultMemo.make_key(template, "a todo app", [], {"model": "gpt-4o"}) != key
+
+
+def test_sessions_with_different_histories_do_not_share_results():
+    executor, calls = fake_template_executor(content=_answer)
+    sessions = [create_session("alice"), create_session("bob")]
+    sessions[0]["history"].append("make it dark")
+    sessions[1]["history"].append("make it playful")
+    contexts = [{"context_builder": session["context_builder"]} for session in sessions]
+
+    run = lambda context: asyncio.run(executor.execute_multiple_templates(["ui_designer_default"], "a todo app", context))
+    assert not run(contexts[0])[0].memoized
+    assert not run(contexts[1])[0].memoized
+    assert run(contexts[1])[0].memoized
+    assert calls == ["ui_designer_default"] * 2
+
+    # A new turn in a session's history is new context as well
+    sessions[0]["history"].append("add a footer")
+    assert not run(contexts[0])[0].memoized
+
+
+def test_repeating_an_input_through_the_handler_is_served_from_the_memo():
+    executor, calls = fake_template_executor()
+    message = {"data": {"template_ids": ["ui_designer_default"], "user_input": "a todo app"}}
+
+    async def scenario():
+        for _ in range(2):
+            await handlers.handle_execute_multiple_template_agents("repeat", message)
+
+    with handler_session("repeat", executor) as sent:
+        asyncio.run(scenario())
+        # The repeat is not a new turn, so the session context is unchanged
+        assert sessions["repeat"]["history"] == ["a todo app"]
+    assert calls == ["ui_designer_default"]
+    assert sent[-1]["data"]["results"][0].memoized
+
+
+if __name__ == "__main__":
+    print("Testing result memo...")
+    print("=" * 50)
+    test_unchanged_graph_is_served_from_the_memo()
+    test_editing_a_template_reruns_it_and_its_dependents_only()
+    test_failures_are_not_memoized_and_disk_entries_persist()
+    test_sessions_with_different_histories_do_not_share_results()
+    test_repeating_an_input_through_the_handler_is_served_from_the_memo()
+    print("\nAll result memo tests passed!")
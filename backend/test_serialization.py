@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared JSON serializer
+"""
+
+import importlib
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import PurePosixPath
+from uuid import UUID
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.core import serialization
+from app.models.agent_models import AgentResponse, AgentType
+
+
+def _payload():
+    return {
+        "type": "multi_agent_response",
+        "data": {
+            "agent_responses": [AgentResponse(agent_type=AgentType.UI_DESIGNER, content="Café layout ✓")],
+            "agent": AgentType.DEVELOPER,
+            "at": datetime(2024, 1, 2, 3, 4, 5),
+            "tags": {"a"},
+            "current_prototype": {"component": "form", "children": []}
+        }
+    }
+
+
+EXPECTED = {
+    "type": "multi_agent_response",
+    "data": {
+        "agent_responses": [{
+            "agent_type": "ui_designer", "content": "Café layout ✓", "suggestions": [],
+            "critique": None, "handoff_to": None, "prototype_update": None
+        }],
+        "agent": "developer",
+        "at": "2024-01-02T03:04:05",
+        "tags": ["a"],
+        "current_prototype": {"component": "form", "children": []}
+    }
+}
+
+
+def test_models_and_enums_encode_without_dumping_first():
+    assert json.loads(serialization.dumps(_payload())) == EXPECTED
+    assert serialization.loads(serialization.dumps_bytes(_payload())) == EXPECTED
+    assert serialization.dumps_pretty({"a": [1]}) == json.dumps({"a": [1]}, indent=2)
+
+
+def test_stdlib_fallback_matches():
+    saved = sys.modules.get("orjson")
+    sys.modules["orjson"] = None  # makes "import orjson" raise ImportError
+    try:
+        fallback = importlib.reload(serialization)
+        assert fallback.BACKEND == "json"
+        assert json.loads(fallback.dumps(_payload())) == EXPECTED
+        assert fallback.FastJSONResponse({"n": 2 ** 70}).body == b'{"n":1180591620717411303424}'
+    finally:
+        if saved is None:
+            del sys.modules["orjson"]
+        else:
+            sys.modules["orjson"] = saved
+        importlib.reload(serialization)
+
+
+def test_oversized_integers_fall_back_to_stdlib():
+    assert serialization.dumps({"n": 2 ** 70}) == '{"n":1180591620717411303424}'
+
+
+def test_unknown_types_are_rejected_instead_of_stringified():
+    assert json.loads(serialization.dumps({"id": UUID(int=1), "path": PurePosixPath("/a")})) == {
+        "id": "00000000-0000-0000-0000-000000000001", "path": "/a"
+    }
+    for dumps in (serialization.dumps, serialization.dumps_pretty):
+        try:
+            dumps({"socket": object()})
+            assert False, "expected TypeError"
+        except TypeError as e:
+            assert "object" in str(e)
+
+
+if __name__ == "__main__":
+    print("Testing serialization...")
+    print("=" * 50)
+    test_models_and_enums_encode_without_dumping_first()
+    test_stdlib_fallback_matches()
+    test_oversized_integers_fall_back_to_stdlib()
+    test_unknown_types_are_rejected_instead_of_stringified()
+    print("\nAll serialization tests passed!")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded WebSocket session store and its backends
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.models.agent_models import AgentResponse, AgentType
+from app.services.session_store import SessionStore
+from app.services.session_backends import FileSessionBackend, MemorySessionBackend, RedisSessionBackend
+from app.services.session_state import SessionWriter, create_session, save_session, load_session, session_size
+
+
+def test_capacity_evicts_least_recently_used():
+    evicted = []
+    store = SessionStore(max_sessions=2, on_evict=lambda sid, session, reason: evicted.append((sid, reason)))
+    store["a"] = {"n": 1}
+    store["b"] = {"n": 2}
+    store["a"]  # a is now more recent than b
+    store["c"] = {"n": 3}
+    assert evicted == [("b", "capacity")]
+    assert set(store) == {"a", "c"}
+
+
+def test_idle_sessions_are_swept_unless_pinned():
+    evicted = []
+    store = SessionStore(idle_ttl=0.05, on_evict=lambda sid, session, reason: evicted.append((sid, reason)))
+    store["idle"] = {}
+    store["connected"] = {}
+    store.pin("connected")
+    time.sleep(0.1)
+    assert store.sweep() == 1
+    assert evicted == [("idle", "idle")]
+    assert "connected" in store
+
+    store.unpin("connected")
+    assert store.sweep() == 0  # idle time restarts when the socket closes
+    time.sleep(0.1)
+    assert store.sweep() == 1 and "connected" not in store
+
+
+def test_memory_budget_evicts_until_under_limit():
+    store = SessionStore(max_total_bytes=150)
+    for name in ["a", "b", "c"]:
+        store[name] = {"history": ["x" * 100]}
+    store.sweep()
+    assert list(store) == ["c"]
+    stats = store.get_stats()
+    assert stats["evictions"]["memory"] == 2 and stats["total_bytes"] <= 150
+
+
+def test_only_changed_sessions_are_measured_again():
+    measured = []
+
+    def sizer(session):
+        measured.append(session["name"])
+        return len(session["history"])
+
+    store = SessionStore(sizer=sizer)
+    for name in ["a", "b", "c"]:
+        store[name] = {"name": name, "history": ["x"]}
+    assert store.get_stats()["total_bytes"] == 3 and sorted(measured) == ["a", "b", "c"]
+
+    measured.clear()
+    store["b"]["history"].append("y")
+    assert store.get_stats()["total_bytes"] == 3 and measured == []  # not marked yet
+    store.changed("b")
+    store.changed("gone")
+    assert store.get_stats()["total_bytes"] == 4 and measured == ["b"]
+    assert store.get_stats()["total_bytes"] == 4 and measured == ["b"]
+
+
+def _populated_session(session_id: str):
+    session = create_session(session_id)
+    session["history"].append("make a login form")
+    session["current_prototype"] = {"component": "form", "children": []}
+    session["memory"].preferences["color_preference"] = "blue"
+    session["multi_agent_workflow"].agent_responses.append(
+        AgentResponse(agent_type=AgentType.UI_DESIGNER, content="Looks good")
+    )
+    session["shared_memory"].cross_agent_insights.append({"insight": "users want SSO"})
+    return session
+
+
+def _assert_restored(restored, original):
+    assert restored["history"] == ["make a login form"]
+    assert restored["current_prototype"]["component"] == "form"
+    assert restored["memory"].preferences == {"color_preference": "blue"}
+    assert restored["multi_agent_workflow"].agent_responses[0].content == "Looks good"
+    assert restored["shared_memory"].cross_agent_insights == [{"insight": "users want SSO"}]
+    assert restored["handoff_coordinator"].shared_memory is restored["shared_memory"]
+    # Agents are stateless and shared rather than rebuilt per session
+    assert restored["agents"] is original["agents"]
+
+
+def test_evicted_session_round_trips_through_disk():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FileSessionBackend(tmp)
+        session = _populated_session("../etc/passwd")
+        assert session_size(session) > 0
+
+        store = SessionStore(max_sessions=1, on_evict=lambda sid, s, reason: save_session(backend, sid, s))
+        store["../etc/passwd"] = session
+        store["other"] = create_session("other")
+        assert "../etc/passwd" not in store
+        assert len(os.listdir(tmp)) == 1
+
+        restored = load_session(backend, "../etc/passwd")
+        assert load_session(backend, "../etc/passwd") is None  # local snapshots are consumed
+
+    _assert_restored(restored, session)
+
+
+def test_memory_backend_is_bounded():
+    backend = MemorySessionBackend(max_entries=2)
+    for name in ["a", "b", "c"]:
+        save_session(backend, name, create_session(name))
+    assert backend.load("a") is None and backend.load("c") is not None
+
+
+def test_redis_backend_shares_sessions_between_workers():
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    worker_a = RedisSessionBackend(fakeredis.FakeRedis(server=server, decode_responses=True), ttl=60)
+    worker_b = RedisSessionBackend(fakeredis.FakeRedis(server=server, decode_responses=True), ttl=60)
+
+    session = _populated_session("shared")
+    save_session(worker_a, "shared", session)
+
+    restored = load_session(worker_b, "shared")
+    _assert_restored(restored, session)
+    # Shared snapshots stay put for the next worker and expire on their own
+    assert load_session(worker_a, "shared") is not None
+    assert 0 < worker_b.client.ttl("ws_session:shared") <= 60
+
+
+def test_writer_debounces_shared_writes_off_the_event_loop():
+    import fakeredis
+
+    backend = RedisSessionBackend(fakeredis.FakeRedis(decode_responses=True), ttl=60)
+    writer = SessionWriter(backend, delay=0.05)
+    session = _populated_session("debounced")
+    writer_threads = []
+    save = backend.save
+
+    def recording_save(session_id, data):
+        writer_threads.append(threading.current_thread())
+        save(session_id, data)
+
+    backend.save = recording_save
+
+    async def run():
+        for _ in range(5):
+            writer.schedule("debounced", session)
+        assert backend.load("debounced") is None
+        await asyncio.sleep(0.1)
+        await writer.flush("debounced")  # waits for the write thread, however busy the pool
+        assert writer.writes == 1 and writer.coalesced == 4
+
+        # A reload does not wait for the debounce delay and sees the latest state
+        session["history"].append("one more request")
+        writer.schedule("debounced", session)
+        return await writer.load("debounced")
+
+    restored = asyncio.run(run())
+    assert restored["history"][-1] == "one more request"
+    assert writer.writes == 2
+    assert threading.main_thread() not in writer_threads
+
+
+def test_writer_saves_evicted_sessions_before_they_are_reloaded():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SessionWriter(FileSessionBackend(tmp))
+        store = SessionStore(max_sessions=1, on_evict=lambda sid, s, reason: writer.save(sid, s))
+        session = _populated_session("evicted")
+
+        async def run():
+            store["evicted"] = session
+            store["other"] = create_session("other")
+            return await writer.load("evicted")
+
+        restored = asyncio.run(run())
+    _assert_restored(restored, session)
+
+
+if __name__ == "__main__":
+    print("Testing session store...")
+    print("=" * 50)
+    test_capacity_evicts_least_recently_used()
+    test_idle_sessions_are_swept_unless_pinned()
+    test_memory_budget_evicts_until_under_limit()
+    test_only_changed_sessions_are_measured_again()
+    test_evicted_session_round_trips_through_disk()
+    test_memory_backend_is_bounded()
+    test_redis_backend_shares_sessions_between_workers()
+    test_writer_debounces_shared_writes_off_the_event_loop()
+    test_writer_saves_evicted_sessions_before_they_are_reloaded()
+    print("\nAll session store tests passed!")
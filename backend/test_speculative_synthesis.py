@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test script for speculative runs of the synthesizer after a fan-out
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.models.agent_templates import AgentExecutionResult
+from app.services.conversation_compactor import ConversationCompactor
+from app.services.speculative_runner import SpeculativeRunner
+from app.state import sessions
+from app.websocket import connection, handlers
+from fakes import FakeProvider, fake_template_executor, handler_session, using_providers
+
+FAN_OUT = ["ui_designer_default", "ux_researcher_default", "product_manager_default"]
+SYNTHESIZER = "synthesizer_default"
+
+
+def _runner(delay: float = 0.0, max_load: float = 0.5):
+    def answer(template_id, user_input, context):
+        return f"{template_id} on {user_input} ({len(context.get('dependency_results') or [])} analyses)"
+
+    executor, calls = fake_template_executor(delays={SYNTHESIZER: delay}, content=answer)
+    runner = SpeculativeRunner(executor, max_load=max_load, enabled=True)
+    runner.load = lambda: 0.0
+    return runner, calls
+
+
+def _sent_back(results):
+    # What the client holds after a round trip over the socket, in its own order
+    return [json.loads(json.dumps(result.model_dump(mode="json"))) for result in reversed(results)]
+
+
+async def _fan_out_then_synthesize(runner, wait: float):
+    executor = runner.executor
+    results = await executor.execute_multiple_templates(FAN_OUT, "a todo app", {})
+    started = runner.after_fan_out("s1", FAN_OUT, results, "a todo app", {}, {})
+    await asyncio.sleep(wait)
+    requested = await executor.execute_multiple_templates(
+        [SYNTHESIZER], "a todo app", {"dependency_results": _sent_back(results)}
+    )
+    return started, requested[0]
+
+
+def test_synthesizer_is_served_from_the_speculative_run():
+    runner, calls = _runner()
+    started, result = asyncio.run(_fan_out_then_synthesize(runner, wait=0.05))
+    assert started == [SYNTHESIZER]
+    assert result.memoized and result.content == "synthesizer_default on a todo app (3 analyses)"
+    assert calls.count(SYNTHESIZER) == 1
+    assert runner.get_stats()["completed"] == 1 and not runner.executor.speculative_runs
+
+
+def test_request_waits_for_a_run_in_progress():
+    runner, calls = _runner(delay=0.2)
+    _, result = asyncio.run(_fan_out_then_synthesize(runner, wait=0.0))
+    assert result.memoized and calls.count(SYNTHESIZER) == 1
+
+
+def test_handler_for_the_synthesizer_alone_is_served_from_the_speculative_run():
+    runner, calls = _runner()
+
+    async def scenario(sent):
+        fan_out = {"data": {"template_ids": FAN_OUT, "user_input": "a todo app"}}
+        await handlers.handle_execute_multiple_template_agents("speculate", fan_out)
+        await asyncio.sleep(0.05)
+        results = sent[-1]["data"]["results"]
+        await handlers.handle_execute_template_agent("speculate", {"data": {
+            "template_id": SYNTHESIZER, "user_input": "a todo app",
+            "context": {"dependency_results": _sent_back(results)}
+        }})
+
+    with handler_session("speculate", runner.executor, runner) as sent:
+        asyncio.run(scenario(sent))
+    assert sent[-1]["type"] == "template_agent_result"
+    assert sent[-1]["data"]["result"].memoized and calls.count(SYNTHESIZER) == 1
+
+
+def test_compaction_waits_for_the_speculative_run():
+    runner, calls = _runner(delay=0.1)
+    compactor = ConversationCompactor()
+    provider = FakeProvider(reply="Summary #{n}: a todo app")
+
+    async def scenario(sent):
+        sessions["speculate"]["history"].extend(f"request {i}" for i in range(15))
+        fan_out = {"data": {"template_ids": FAN_OUT, "user_input": "a todo app"}}
+        await handlers.handle_execute_multiple_template_agents("speculate", fan_out)
+        # The fan-out is done; its turn would make the session long enough to compact
+        connection._after_message("speculate")
+        assert runner.running("speculate") == 1 and not compactor.in_progress("speculate")
+        results = sent[-1]["data"]["results"]
+        await handlers.handle_execute_template_agent("speculate", {"data": {
+            "template_id": SYNTHESIZER, "user_input": "a todo app",
+            "context": {"dependency_results": _sent_back(results)}
+        }})
+        connection._after_message("speculate")
+        assert compactor.in_progress("speculate")
+        await asyncio.sleep(0.05)
+
+    saved = connection.speculative_runner, connection.conversation_compactor
+    connection.speculative_runner, connection.conversation_compactor = runner, compactor
+    connection.session_writer.schedule = lambda session_id, session: None
+    try:
+        with handler_session("speculate", runner.executor, runner) as sent, using_providers(provider):
+            asyncio.run(scenario(sent))
+    finally:
+        connection.speculative_runner, connection.conversation_compactor = saved
+        del connection.session_writer.schedule
+    assert sent[-1]["data"]["result"].memoized and calls.count(SYNTHESIZER) == 1
+    assert compactor.compactions == 1
+
+
+def test_slow_runs_are_bounded():
+    # The request stops waiting and runs the synthesizer itself
+    runner, calls = _runner(delay=0.3)
+    runner.executor.speculative_wait = 0.05
+    _, result = asyncio.run(_fan_out_then_synthesize(runner, wait=0.0))
+    assert not result.memoized and calls.count(SYNTHESIZER) == 2
+
+    # A speculative run past the node timeout is dropped without a result
+    runner, calls = _runner(delay=0.3)
+    runner.executor.node_timeout = 0.05
+    started, _ = asyncio.run(_fan_out_then_synthesize(runner, wait=0.1))
+    assert started == [SYNTHESIZER] and runner.get_stats()["completed"] == 0
+    assert not runner.executor.speculative_runs
+
+
+def test_new_input_cancels_speculation():
+    runner, calls = _runner(delay=0.2)
+
+    async def scenario():
+        results = await runner.executor.execute_multiple_templates(FAN_OUT, "a todo app", {})
+        runner.after_fan_out("s1", FAN_OUT, results, "a todo app", {}, {})
+        task = next(iter(runner.executor.speculative_runs.values()))
+        # The same input keeps it, another input does not
+        runner.cancel("s1", keep_input="a todo app")
+        assert runner.running("s1") == 1
+        runner.cancel("s1", keep_input="a chat app")
+        await asyncio.gather(task, return_exceptions=True)
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.cancelled() and runner.running("s1") == 0
+    assert not runner.executor.speculative_runs and runner.get_stats()["cancelled"] == 1
+
+
+def test_no_speculation_when_busy_failed_or_disabled():
+    runner, calls = _runner()
+
+    async def fan_out(results=None, template_ids=FAN_OUT, llm_settings=None):
+        results = results or await runner.executor.execute_multiple_templates(FAN_OUT, "a todo app", {})
+        return runner.after_fan_out("s1", template_ids, results, "a todo app", {}, llm_settings or {})
+
+    runner.load = lambda: 0.9
+    assert asyncio.run(fan_out()) == [] and runner.get_stats()["skipped_for_load"] == 1
+
+    runner.load = lambda: 0.0
+    failed = [AgentExecutionResult(template_id="ui_designer_default", agent_name="UI", content="x", error="timeout")]
+    assert asyncio.run(fan_out(failed)) == []
+    # Already part of the fan-out, or the client opted out of cached results
+    assert asyncio.run(fan_out(template_ids=FAN_OUT + [SYNTHESIZER])) == []
+    assert asyncio.run(fan_out(llm_settings={"use_cache": False})) == []
+
+    runner.enabled = False
+    assert asyncio.run(fan_out()) == []
+    assert SYNTHESIZER not in calls
+
+
+if __name__ == "__main__":
+    print("Testing speculative synthesis...")
+    print("=" * 50)
+    test_synthesizer_is_served_from_the_speculative_run()
+    test_request_waits_for_a_run_in_progress()
+    test_handler_for_the_synthesizer_alone_is_served_from_the_speculative_run()
+    test_compaction_waits_for_the_speculative_run()
+    test_slow_runs_are_bounded()
+    test_new_input_cancels_speculation()
+    test_no_speculation_when_busy_failed_or_disabled()
+    print("\nAll speculative synthesis tests passed!")
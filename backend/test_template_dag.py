@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for dependency-driven template execution
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.agent_template_service import agent_template_service
+from app.services.dag_scheduler import CONTINUE, SKIP_DEPENDENTS, execution_order, run_dag
+from fakes import fake_template_executor
+
+
+def _sleeper(durations, fail=(), seen=None):
+    async def run_node(node, dependency_results):
+        if seen is not None:
+            seen[node] = sorted(dependency_results)
+        await asyncio.sleep(durations.get(node, 0.01))
+        if node in fail:
+            raise RuntimeError(f"{node} broke")
+        return f"{node} done"
+    return run_node
+
+
+def test_nodes_start_when_their_own_dependencies_finish():
+    # slow and fast run together; after_fast only waits for fast
+    graph = {"slow": [], "fast": [], "after_fast": ["fast"], "after_both": ["slow", "after_fast"]}
+    durations = {"slow": 0.3, "fast": 0.05, "after_fast": 0.05, "after_both": 0.05}
+    results, report = asyncio.run(run_dag(graph, _sleeper(durations)))
+
+    assert set(results) == set(graph)
+    offsets = report.to_dict()["nodes"]
+    assert offsets["after_fast"]["start_offset"] < 0.2  # a stage barrier would hold it until slow is done
+    assert report.critical_path == ["slow", "after_both"]
+    assert report.wall_clock < 0.45
+
+
+def test_failure_policies():
+    graph = {"a": [], "b": ["a"], "c": ["b"], "d": []}
+    seen = {}
+    results, report = asyncio.run(run_dag(graph, _sleeper({}, fail={"a"}), failure_policy=SKIP_DEPENDENTS))
+    assert [report.nodes[n].status for n in "abcd"] == ["failed", "skipped", "skipped", "completed"]
+    assert report.nodes["a"].error == "a broke" and set(results) == {"d"}
+
+    results, report = asyncio.run(run_dag(graph, _sleeper({}, fail={"a"}, seen=seen), failure_policy=CONTINUE))
+    assert report.nodes["b"].status == "completed" and seen["b"] == []
+    assert seen["c"] == ["b"]
+
+
+def test_timeouts_and_cycles():
+    graph = {"stuck": [], "next": ["stuck"]}
+    results, report = asyncio.run(run_dag(graph, _sleeper({"stuck": 5}), timeout=0.05))
+    assert report.nodes["stuck"].status == "timeout" and report.nodes["next"].status == "skipped"
+    assert results == {}
+
+    try:
+        execution_order({"a": ["b"], "b": ["a"]})
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_executor_runs_template_chains_without_barriers():
+    executor, calls = fake_template_executor(
+        delays={"ui_designer_default": 0.3, "ux_researcher_default": 0.05},
+        errors={"prd_creator_default": "provider down"},
+        # Answer with the templates whose analyses were passed in
+        content=lambda template_id, user_input, context: ",".join(
+            r["template_id"] for r in context.get("dependency_results", [])
+        )
+    )
+    template_ids = [
+        "ui_designer_default", "ux_researcher_default", "synthesizer_default",
+        "prd_creator_default", "development_planner_default"
+    ]
+    assert agent_template_service.get_template("prd_creator_default").depends_on == ["synthesizer_default"]
+
+    results, report = asyncio.run(executor.execute_template_graph(template_ids, "a todo app"))
+    assert [r.template_id for r in results] == template_ids
+    assert results[2].content == "ui_designer_default,ux_researcher_default"
+    assert "development_planner_default" not in calls  # its dependency failed
+    assert results[-1].error and report.nodes["development_planner_default"].status == "skipped"
+    assert report.critical_path[0] == "ui_designer_default"
+
+
+def test_results_are_delivered_as_each_template_finishes():
+    executor, _ = fake_template_executor({"ui_designer_default": 0.3, "ux_researcher_default": 0.02})
+    template_ids = ["ui_designer_default", "ux_researcher_default", "synthesizer_default"]
+    arrivals = []
+
+    async def on_result(result):
+        arrivals.append((result.template_id, time.perf_counter()))
+
+    async def scenario():
+        start = time.perf_counter()
+        results = await executor.execute_multiple_templates(template_ids, "a todo app", on_result=on_result)
+        return start, results
+
+    start, results = asyncio.run(scenario())
+    assert [r.template_id for r in results] == template_ids  # the final list keeps request order
+    assert [template_id for template_id, _ in arrivals] == [
+        "ux_researcher_default", "ui_designer_default", "synthesizer_default"
+    ]
+    assert arrivals[0][1] - start < 0.2  # the fast agent is not held back by the slow one
+
+
+def test_iterator_yields_in_completion_order_and_cancels_on_exit():
+    executor, started = fake_template_executor({"ui_designer_default": 5, "ux_researcher_default": 0.02})
+    template_ids = ["ui_designer_default", "ux_researcher_default", "synthesizer_default"]
+
+    async def first_result():
+        async for result in executor.iter_multiple_templates(template_ids, "a todo app"):
+            return result.template_id
+
+    async def scenario():
+        start = time.perf_counter()
+        first = await first_result()
+        return first, time.perf_counter() - start
+
+    first, elapsed = asyncio.run(scenario())
+    assert first == "ux_researcher_default" and elapsed < 1
+    assert "synthesizer_default" not in started  # the slow dependency was cancelled
+
+
+if __name__ == "__main__":
+    print("Testing template DAG execution...")
+    print("=" * 50)
+    test_nodes_start_when_their_own_dependencies_finish()
+    test_failure_policies()
+    test_timeouts_and_cycles()
+    test_executor_runs_template_chains_without_barriers()
+    test_results_are_delivered_as_each_template_finishes()
+    test_iterator_yields_in_completion_order_and_cancels_on_exit()
+    print("\nAll template DAG tests passed!")
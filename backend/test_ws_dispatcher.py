@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Test script for per-session WebSocket task dispatch and cancellation
+"""
+
+import asyncio
+import os
+import sys
+from typing import List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.llm.base_provider import BaseLLMProvider, LLMProvider, LLMModel, LLMMessage, LLMResponse
+from app.llm.llm_manager import LLMManager
+from app.llm.scheduler import ProviderScheduler
+from app.websocket.dispatcher import SessionDispatcher
+
+
+class HangingProvider(BaseLLMProvider):
+    """Fake provider whose calls never finish on their own"""
+
+    def __init__(self):
+        super().__init__("test-key")
+        self.started = asyncio.Event()
+        self.aborted = False
+
+    async def generate(self, messages: List[LLMMessage], model: str, temperature: float = 0.7,
+                       max_tokens: Optional[int] = None, **kwargs) -> LLMResponse:
+        self.started.set()
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.aborted = True
+            raise
+        return LLMResponse(content="late", model_used=model, provider=LLMProvider.OPENAI)
+
+    async def stream_generate(self, messages, model, temperature=0.7, max_tokens=None, **kwargs):
+        yield ""
+
+    def get_available_models(self) -> List[LLMModel]:
+        return [LLMModel(id="gpt-4o-mini", name="gpt-4o-mini", provider=LLMProvider.OPENAI, context_length=4096)]
+
+    def get_provider_name(self) -> LLMProvider:
+        return LLMProvider.OPENAI
+
+
+def _dispatcher(handlers, max_concurrent: int = 2, on_done=None, max_pending: int = 16):
+    sent = []
+
+    async def send(data):
+        sent.append(data)
+
+    return SessionDispatcher(
+        "s1", handlers, send, max_concurrent=max_concurrent, on_done=on_done, max_pending=max_pending
+    ), sent
+
+
+def test_quick_messages_are_not_blocked_by_slow_tasks():
+    events = []
+
+    async def slow(session_id, message):
+        await asyncio.sleep(0.1)
+        events.append("slow done")
+
+    async def quick(session_id, message):
+        events.append("prompts")
+
+    async def run():
+        dispatcher, _ = _dispatcher({"execute_llm_agents": slow, "get_prompts": quick})
+        await dispatcher.dispatch({"type": "execute_llm_agents"})
+        await dispatcher.dispatch({"type": "get_prompts"})
+        assert dispatcher.get_stats()["in_flight"] == 1
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert events == ["prompts", "slow done"]
+
+
+def test_stateless_messages_do_not_trigger_a_save():
+    saved = []
+
+    async def noop(session_id, message):
+        pass
+
+    async def run():
+        dispatcher, _ = _dispatcher(
+            {"prototype_ack": noop, "get_prompts": noop, "switch_agent": noop, "direct_chat": noop},
+            on_done=saved.append
+        )
+        for message_type in ["prototype_ack", "get_prompts", "switch_agent", "direct_chat"]:
+            await dispatcher.dispatch({"type": message_type})
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert saved == ["s1", "s1"]  # switch_agent and direct_chat only
+
+
+def test_ordered_messages_run_in_arrival_order():
+    events = []
+
+    async def generate(session_id, message):
+        events.append(("start", message["text"]))
+        await asyncio.sleep(0.05 if message["text"] == "first" else 0)
+        events.append(("end", message["text"]))
+
+    async def run():
+        dispatcher, _ = _dispatcher({"generate_prototype": generate}, max_concurrent=4)
+        await dispatcher.dispatch({"type": "generate_prototype", "text": "first"})
+        await dispatcher.dispatch({"text": "second"})  # untyped text is a prototype request
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert events == [("start", "first"), ("end", "first"), ("start", "second"), ("end", "second")]
+
+
+def test_concurrency_is_bounded():
+    running = []
+    peak = []
+
+    async def work(session_id, message):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.pop()
+
+    async def run():
+        dispatcher, _ = _dispatcher({"direct_chat": work}, max_concurrent=2)
+        for _ in range(5):
+            await dispatcher.dispatch({"type": "direct_chat"})
+        await asyncio.sleep(0.2)
+        return dispatcher.completed
+
+    assert asyncio.run(run()) == 5
+    assert max(peak) == 2
+
+
+def test_cancel_aborts_the_provider_call():
+    provider = HangingProvider()
+    llm = LLMManager()
+    llm.providers = {LLMProvider.OPENAI: provider}
+    llm.response_cache = None
+    llm.fallback_chain = []
+
+    async def chat(session_id, message):
+        await llm.generate([LLMMessage(role="user", content="hi")], model="gpt-4o-mini")
+
+    async def run():
+        llm.schedulers = {LLMProvider.OPENAI: ProviderScheduler("openai", max_in_flight=1)}
+        dispatcher, sent = _dispatcher({"direct_chat": chat})
+        await dispatcher.dispatch({"type": "direct_chat", "request_id": "r1"})
+        await asyncio.wait_for(provider.started.wait(), 1)
+        await dispatcher.dispatch({"type": "cancel", "data": {"request_id": "r1"}})
+        await asyncio.sleep(0.05)
+        return dispatcher, sent
+
+    dispatcher, sent = asyncio.run(run())
+    assert provider.aborted
+    assert sent == [{"type": "cancelled", "data": {"request_ids": ["r1"]}}]
+    assert dispatcher.get_stats()["in_flight"] == 0 and dispatcher.cancelled == 1
+    # The scheduler slot was released along with the call
+    assert llm.schedulers[LLMProvider.OPENAI].pending() == 0
+
+
+def test_duplicate_request_ids_and_overflow_are_rejected():
+    async def slow(session_id, message):
+        await asyncio.sleep(3600)
+
+    async def run():
+        dispatcher, sent = _dispatcher({"direct_chat": slow}, max_concurrent=1, max_pending=3)
+        await dispatcher.dispatch({"type": "direct_chat", "request_id": "r1"})
+        await dispatcher.dispatch({"type": "direct_chat", "request_id": "r1"})
+        for i in range(2, 5):
+            await dispatcher.dispatch({"type": "direct_chat", "request_id": f"r{i}"})
+        await asyncio.sleep(0.01)
+        # The first r1 is still the one that can be cancelled
+        cancelled = dispatcher.cancel("r1")
+        await asyncio.sleep(0.01)
+        in_flight = dispatcher.in_flight()
+        await dispatcher.close()
+        return dispatcher, sent, cancelled, in_flight
+
+    dispatcher, sent, cancelled, in_flight = asyncio.run(run())
+    assert [message["request_id"] for message in sent] == ["r1", "r4"]
+    assert all(message["type"] == "error" for message in sent)
+    assert cancelled == ["r1"] and set(in_flight) == {"r2", "r3"}
+    assert dispatcher.get_stats()["rejected"] == 2
+
+
+def test_close_cancels_everything_in_flight():
+    async def slow(session_id, message):
+        await asyncio.sleep(3600)
+
+    async def run():
+        dispatcher, sent = _dispatcher({"execute_llm_agents": slow, "generate_prototype": slow})
+        await dispatcher.dispatch({"type": "execute_llm_agents"})
+        await dispatcher.dispatch({"type": "generate_prototype", "text": "a"})
+        await dispatcher.dispatch({"type": "generate_prototype", "text": "b"})
+        await asyncio.sleep(0.01)
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.in_flight() == {} and dispatcher.cancelled == 3
+
+
+if __name__ == "__main__":
+    print("Testing WebSocket dispatcher...")
+    print("=" * 50)
+    test_quick_messages_are_not_blocked_by_slow_tasks()
+    test_stateless_messages_do_not_trigger_a_save()
+    test_ordered_messages_run_in_arrival_order()
+    test_concurrency_is_bounded()
+    test_cancel_aborts_the_provider_call()
+    test_duplicate_request_ids_and_overflow_are_rejected()
+    test_close_cancels_everything_in_flight()
+    print("\nAll dispatcher tests passed!")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for per-connection outbound queues, coalescing and backpressure
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.websocket import codec as codec_module
+from app.websocket.codec import BinaryFrameCodec, FrameCodec, ZlibFrameCodec, create_frame_codec
+from app.websocket.manager import ConnectionManager
+from app.websocket.message_bus import InProcessMessageBus
+from fakes import FakeWebSocket
+
+
+def _token(stream_id, delta):
+    return {"type": "llm_token", "data": {"stream_id": stream_id, "source": "prototype", "delta": delta}}
+
+
+def _progress(pipeline_id, status):
+    return {"type": "pipeline_progress", "data": {"pipeline_id": pipeline_id, "status": status}}
+
+
+async def _connected(max_queue=256, send_timeout=10.0, codec=None):
+    manager = ConnectionManager(InProcessMessageBus(), max_queue=max_queue, send_timeout=send_timeout)
+    await manager.start()
+    socket = FakeWebSocket(gated=True)
+    await manager.connect(socket, "s1", codec)
+    return manager, socket
+
+
+def test_waiting_frames_are_merged_and_superseded():
+    async def run():
+        manager, socket = await _connected()
+        await manager.send_json_message({"type": "prototype", "data": {}}, "s1")
+        await asyncio.sleep(0.01)  # the writer is now blocked sending the first frame
+        for delta in ["Hel", "lo", " world"]:
+            await manager.send_json_message(_token("a", delta), "s1")
+        await manager.send_json_message(_progress("p1", "planning"), "s1")
+        await manager.send_json_message(_token("b", "other"), "s1")
+        await manager.send_json_message(_progress("p1", "merging"), "s1")
+        await manager.send_personal_message("done", "s1")
+        stats = manager.get_stats()
+        socket.gate.set()
+        await manager.stop()
+        return socket.sent, stats
+
+    sent, stats = asyncio.run(run())
+    assert sent == [
+        {"type": "prototype", "data": {}},
+        _token("a", "Hello world"),
+        _progress("p1", "merging"),
+        _token("b", "other"),
+        "done"
+    ]
+    assert stats["merged"] == 2 and stats["superseded"] == 1
+
+
+def test_full_queue_sheds_partial_frames_without_blocking():
+    async def run():
+        manager, socket = await _connected(max_queue=3)
+        await manager.send_json_message({"type": "prototype", "data": {}}, "s1")
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await manager.send_json_message({"type": "prototype_partial", "data": {"path": [0]}}, "s1")
+        await manager.send_json_message({"type": "template_agent_result", "data": {"id": 1}}, "s1")
+        await manager.send_json_message({"type": "template_agent_result", "data": {"id": 2}}, "s1")
+        # Full: the partial frame makes room for the result
+        await manager.send_json_message({"type": "template_agent_result", "data": {"id": 3}}, "s1")
+        # Full of results: a new partial frame is dropped rather than waited on
+        await manager.send_json_message({"type": "prototype_partial", "data": {"path": [1]}}, "s1")
+        elapsed = time.monotonic() - started
+        stats = manager.get_stats()
+        socket.gate.set()
+        await manager.stop()
+        return socket.sent, stats, elapsed
+
+    sent, stats, elapsed = asyncio.run(run())
+    assert [frame["type"] for frame in sent] == ["prototype"] + ["template_agent_result"] * 3
+    assert stats["dropped"] == 2 and stats["peak_depth"] == 3
+    assert elapsed < 0.5
+
+
+def test_stalled_client_is_disconnected_instead_of_blocking_senders():
+    async def run():
+        manager, socket = await _connected(max_queue=2, send_timeout=0.1)
+        started = time.monotonic()
+        for index in range(5):
+            await manager.send_json_message({"type": "template_agent_result", "data": {"id": index}}, "s1")
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0.01)
+        stats = manager.get_stats()
+        await manager.stop()
+        return socket, stats, elapsed
+
+    socket, stats, elapsed = asyncio.run(run())
+    assert elapsed < 1
+    assert stats["stalled_clients"] == 1 and stats["connections"] == 0
+    assert socket.close_code == 1013
+
+
+def test_large_frames_are_sent_compressed_when_the_client_opts_in():
+    import zlib
+
+    result = {"type": "multiple_template_agents_result", "data": {"results": ["analysis " * 500]}}
+
+    async def run():
+        manager, socket = await _connected(codec=ZlibFrameCodec(threshold=1024))
+        socket.gate.set()
+        await manager.send_json_message({"type": "prompt_saved"}, "s1")
+        await manager.send_json_message(result, "s1")
+        await manager.outbound["s1"].drain()
+        stats = manager.get_stats()
+        await manager.stop()
+        return socket.sent, stats
+
+    sent, stats = asyncio.run(run())
+    assert sent[0] == {"type": "prompt_saved"}
+    assert isinstance(sent[1], bytes) and len(sent[1]) < 1024
+    assert json.loads(zlib.decompress(sent[1])) == result
+    assert stats["binary_frames"] == 1
+
+
+def test_frame_codec_negotiation():
+    assert create_frame_codec(None).name == "json"
+    assert create_frame_codec("zlib", threshold=10).threshold == 10
+    # Unknown encodings fall back to JSON text
+    assert type(create_frame_codec("brotli")) is FrameCodec
+    try:
+        BinaryFrameCodec()
+        assert False, "expected TypeError"
+    except TypeError:
+        pass
+
+    import msgpack
+    codec = create_frame_codec("msgpack", threshold=64)
+    frame = {"type": "multiple_template_agents_result", "data": {"results": ["x" * 100]}}
+    assert codec.name == "msgpack" and msgpack.unpackb(codec.encode(frame)) == frame
+    assert codec.encode({"type": "ok"}) == '{"type":"ok"}'
+    # A large frame is packed once, without a JSON encoding to measure it
+    saved, json_encodes = codec_module.dumps_bytes, []
+    codec_module.dumps_bytes = lambda data: json_encodes.append(data) or saved(data)
+    try:
+        codec.encode(frame)
+    finally:
+        codec_module.dumps_bytes = saved
+    assert json_encodes == []
+
+
+if __name__ == "__main__":
+    print("Testing WebSocket outbound queues...")
+    print("=" * 50)
+    test_waiting_frames_are_merged_and_superseded()
+    test_full_queue_sheds_partial_frames_without_blocking()
+    test_stalled_client_is_disconnected_instead_of_blocking_senders()
+    test_large_frames_are_sent_compressed_when_the_client_opts_in()
+    test_frame_codec_negotiation()
+    print("\nAll outbound queue tests passed!")